@@ -366,6 +366,8 @@ _('Vote created');
 _('Vote updated');
 _('Vote deleted');
 _('Number set');
+_('Agenda sorted');
+_('Agenda numbered');
 _('OpenSlides is temporarily reset to following timestamp');
 _('Motion change recommendation created');
 _('Motion change recommendation updated');
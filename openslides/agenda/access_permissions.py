@@ -10,6 +10,7 @@ class ItemAccessPermissions(BaseAccessPermissions):
     """
 
     base_permission = "agenda.can_see"
+    user_specific_data = False
 
     # TODO: In the following method we use full_data['is_hidden'] and
     # full_data['is_internal'] but this can be out of date.
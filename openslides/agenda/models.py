@@ -1,5 +1,5 @@
 from collections import defaultdict
-from typing import Dict, List, Set
+from typing import Dict, List, Optional, Set
 
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
@@ -15,7 +15,7 @@ from openslides.utils.exceptions import OpenSlidesError
 from openslides.utils.models import RESTModelMixin
 from openslides.utils.utils import to_roman
 
-from ..utils.models import CASCADE_AND_AUTOUODATE, SET_NULL_AND_AUTOUPDATE
+from ..utils.models import CASCADE_AND_AUTOUODATE, SET_NULL_AND_AUTOUPDATE, bulk_update
 from .access_permissions import ItemAccessPermissions
 
 
@@ -131,6 +131,7 @@ class ItemManager(models.Manager):
                 yield from walk_items(element.get("children", []), element["id"])
 
         touched_items: Set[int] = set()
+        changed_items: List[Item] = []
         db_items = dict((item.pk, item) for item in Item.objects.all())
         for item_id, parent_id, weight in walk_items(tree):
             # Check that the item is only once in the tree to prevent invalid trees
@@ -143,20 +144,55 @@ class ItemManager(models.Manager):
             except KeyError:
                 raise ValueError(f"Item {item_id} is not in the database.")
 
-            # Check if the item has changed and update it
-            # Note: Do not use Item.objects.update, so that the items are sent
-            #       to the clients via autoupdate
+            # Check if the item has changed
             if db_item.parent_id != parent_id or db_item.weight != weight:
                 db_item.parent_id = parent_id
                 db_item.weight = weight
-                db_item.save()
+                changed_items.append(db_item)
+
+        self.save_changed_items(changed_items, ["parent", "weight"], ["Agenda sorted"])
+
+    def save_changed_items(
+        self,
+        items: List["Item"],
+        fields: List[str],
+        information: List[str] = None,
+        user_id: Optional[int] = None,
+    ) -> None:
+        """
+        Saves the fields of many items and sends them to the clients with one
+        autoupdate.
+
+        The items are not saved one by one, but with one query per 100 items.
+        Afterwards their full data is loaded with the prefetched related
+        objects.
+
+        The history needs the full data of each item, so every item gets its
+        own history entry. All entries get the same time, information and
+        user, so the client can show them as one change.
+        """
+        if not items:
+            return
+        bulk_update(items, fields)
+        inform_changed_data(
+            self.get_full_queryset().filter(pk__in=[item.pk for item in items]),
+            information=information,
+            user_id=user_id,
+        )
 
     @transaction.atomic
-    def number_all(self, numeral_system="arabic"):
+    def number_all(self, numeral_system="arabic", user_id=None):
         """
         Auto numbering of the agenda according to the numeral_system. Manually
         added item numbers will be overwritten.
         """
+        prefix = config["agenda_number_prefix"]
+        changed_items: List[Item] = []
+
+        def set_item_number(item: Item, item_number: str) -> None:
+            if item.item_number != item_number:
+                item.item_number = item_number
+                changed_items.append(item)
 
         def walk_tree(tree, number=None):
             for index, tree_element in enumerate(tree):
@@ -168,13 +204,12 @@ class ItemManager(models.Manager):
                     if number is not None:
                         item_number = ".".join((number, item_number))
                 # Add prefix.
-                if config["agenda_number_prefix"]:
-                    item_number_tmp = f"{config['agenda_number_prefix']} {item_number}"
+                if prefix:
+                    item_number_tmp = f"{prefix} {item_number}"
                 else:
                     item_number_tmp = item_number
-                # Save the new value and go down the tree.
-                tree_element["item"].item_number = item_number_tmp
-                tree_element["item"].save()
+                # Set the new value and go down the tree.
+                set_item_number(tree_element["item"], item_number_tmp)
                 walk_tree(tree_element["children"], item_number)
 
         # Start numbering visable agenda items.
@@ -182,8 +217,11 @@ class ItemManager(models.Manager):
 
         # Reset number of hidden items.
         for item in self.get_only_non_public_items():
-            item.item_number = ""
-            item.save()
+            set_item_number(item, "")
+
+        self.save_changed_items(
+            changed_items, ["item_number"], ["Agenda numbered"], user_id
+        )
 
 
 class Item(RESTModelMixin, models.Model):
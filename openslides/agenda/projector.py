@@ -5,6 +5,7 @@ from ..users.projector import get_user_name
 from ..utils.projector import (
     AllData,
     ProjectorElementException,
+    get_collection_index,
     get_config,
     register_projector_slide,
 )
@@ -16,17 +17,37 @@ from ..utils.projector import (
 #            to be fast!
 
 
-def get_sorted_agenda_items(all_data: AllData) -> List[Dict[str, Any]]:
+def sort_agenda_items(items: Dict[int, Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
-    Returns all sorted agenda items by id first and then weight, resulting in
-    ordered items, if some have the same weight.
+    Sorts agenda items by id first and then weight, resulting in ordered
+    items, if some have the same weight.
     """
     return sorted(
-        sorted(all_data["agenda/item"].values(), key=lambda item: item["id"]),
+        sorted(items.values(), key=lambda item: item["id"]),
         key=lambda item: item["weight"],
     )
 
 
+def build_children_index(items: Dict[int, Dict[str, Any]]) -> Dict[int, List[int]]:
+    """
+    Builds a dict from an item_id to the ids of all its children. Only normal
+    items are used. The root items are saved with the key 0.
+    """
+    children: Dict[int, List[int]] = defaultdict(list)
+    for item in sort_agenda_items(items):
+        if item["type"] == 1:  # only normal items
+            children[item["parent_id"] or 0].append(item["id"])
+    return children
+
+
+def get_sorted_agenda_items(all_data: AllData) -> List[Dict[str, Any]]:
+    """
+    Returns all sorted agenda items by id first and then weight, resulting in
+    ordered items, if some have the same weight.
+    """
+    return get_collection_index(all_data, "agenda/item", sort_agenda_items)
+
+
 def get_flat_tree(all_data: AllData, parent_id: int = 0) -> List[Dict[str, Any]]:
     """
     Build the item tree from all_data.
@@ -37,13 +58,7 @@ def get_flat_tree(all_data: AllData, parent_id: int = 0) -> List[Dict[str, Any]]
     and the second a List with children as two element tuples.
     """
 
-    # Build a dict from an item_id to all its children
-    children: Dict[int, List[int]] = defaultdict(list)
-    if "agenda/item" in all_data:
-        for item in get_sorted_agenda_items(all_data):
-            if item["type"] == 1:  # only normal items
-                children[item["parent_id"] or 0].append(item["id"])
-
+    children = get_collection_index(all_data, "agenda/item", build_children_index)
     tree = []
 
     def get_children(item_ids: List[int], depth: int) -> None:
@@ -60,9 +75,9 @@ def get_flat_tree(all_data: AllData, parent_id: int = 0) -> List[Dict[str, Any]]
                     "depth": depth,
                 }
             )
-            get_children(children[item_id], depth + 1)
+            get_children(children.get(item_id, []), depth + 1)
 
-    get_children(children[parent_id], 0)
+    get_children(children.get(parent_id, []), 0)
     return tree
 
 
@@ -249,15 +264,37 @@ def current_speaker_chyron_slide(
     return {"current_speaker": current_speaker}
 
 
+# The current item is searched in the elements of the reference projector.
+# These can be all collections with agenda items.
+current_item_dependencies = [
+    "core/projector",
+    "agenda/item",
+    "assignments/assignment",
+    "motions/motion",
+    "motions/motion-block",
+    "topics/topic",
+]
+
+
 def register_projector_slides() -> None:
-    register_projector_slide("agenda/item-list", item_list_slide)
-    register_projector_slide("agenda/list-of-speakers", list_of_speakers_slide)
+    register_projector_slide("agenda/item-list", item_list_slide, ["agenda/item"])
+    register_projector_slide(
+        "agenda/list-of-speakers",
+        list_of_speakers_slide,
+        ["agenda/item", "users/user", "core/config"],
+    )
     register_projector_slide(
-        "agenda/current-list-of-speakers", current_list_of_speakers_slide
+        "agenda/current-list-of-speakers",
+        current_list_of_speakers_slide,
+        current_item_dependencies + ["users/user", "core/config"],
     )
     register_projector_slide(
-        "agenda/current-list-of-speakers-overlay", current_list_of_speakers_slide
+        "agenda/current-list-of-speakers-overlay",
+        current_list_of_speakers_slide,
+        current_item_dependencies + ["users/user", "core/config"],
     )
     register_projector_slide(
-        "agenda/current-speaker-chyron", current_speaker_chyron_slide
+        "agenda/current-speaker-chyron",
+        current_speaker_chyron_slide,
+        current_item_dependencies + ["users/user"],
     )
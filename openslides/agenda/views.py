@@ -316,7 +316,9 @@ class ItemViewSet(ListModelMixin, RetrieveModelMixin, UpdateModelMixin, GenericV
                 {"detail": "Numbering of agenda items is deactivated."}
             )
 
-        Item.objects.number_all(numeral_system=config["agenda_numeral_system"])
+        Item.objects.number_all(
+            numeral_system=config["agenda_numeral_system"], user_id=request.user.pk
+        )
         return Response({"detail": "The agenda has been numbered."})
 
     @list_route(methods=["post"])
@@ -327,28 +329,38 @@ class ItemViewSet(ListModelMixin, RetrieveModelMixin, UpdateModelMixin, GenericV
         """
         nodes = request.data.get("nodes", [])
         parent_id = request.data.get("parent_id")
-        items = []
         with transaction.atomic():
+            db_items = Item.objects.in_bulk()
+            items = []
             for index, node in enumerate(nodes):
-                item = Item.objects.get(pk=node["id"])
+                try:
+                    item = db_items[node["id"]]
+                except KeyError:
+                    raise Item.DoesNotExist()
                 item.parent_id = parent_id
                 item.weight = index
-                item.save(skip_autoupdate=True)
                 items.append(item)
 
-                # Now check consistency. TODO: Try to use less DB queries.
-                item = Item.objects.get(pk=node["id"])
-                ancestor = item.parent
-                while ancestor is not None:
-                    if ancestor == item:
+            # Now check consistency. A loop can also be above the item, so the
+            # walk stops at every item that was seen before.
+            for item in items:
+                seen = {item.pk}
+                ancestor_id = item.parent_id
+                while ancestor_id is not None:
+                    if ancestor_id in seen:
                         raise ValidationError(
                             {
                                 "detail": "There must not be a hierarchical loop. Please reload the page."
                             }
                         )
-                    ancestor = ancestor.parent
+                    if ancestor_id not in db_items:
+                        raise ValidationError({"detail": "Invalid parent id."})
+                    seen.add(ancestor_id)
+                    ancestor_id = db_items[ancestor_id].parent_id
 
-        inform_changed_data(items)
+            Item.objects.save_changed_items(
+                items, ["parent", "weight"], ["Agenda sorted"], request.user.pk
+            )
         return Response({"detail": "The agenda has been sorted."})
 
     @list_route(methods=["post"])
@@ -10,6 +10,7 @@ class AssignmentAccessPermissions(BaseAccessPermissions):
     """
 
     base_permission = "assignments.can_see"
+    user_specific_data = False
 
     async def get_restricted_data(
         self, full_data: List[Dict[str, Any]], user_id: int
@@ -25,18 +26,25 @@ class AssignmentAccessPermissions(BaseAccessPermissions):
         ) and await async_has_perm(user_id, "assignments.can_manage"):
             data = full_data
         elif await async_has_perm(user_id, "assignments.can_see"):
-            # Exclude unpublished poll votes.
+            # Exclude unpublished poll votes. The full_data is shared with
+            # other users, so the changed polls and options are copied.
             data = []
             for full in full_data:
                 full_copy = full.copy()
-                polls = full_copy["polls"]
-                for poll in polls:
-                    if not poll["published"]:
-                        for option in poll["options"]:
-                            option["votes"] = []  # clear votes for not published polls
-                        poll[
-                            "has_votes"
-                        ] = False  # A user should see, if there are votes.
+                full_copy["polls"] = [
+                    poll
+                    if poll["published"]
+                    else {
+                        **poll,
+                        # clear votes for not published polls
+                        "options": [
+                            {**option, "votes": []} for option in poll["options"]
+                        ],
+                        # A user should see, if there are votes.
+                        "has_votes": False,
+                    }
+                    for poll in full["polls"]
+                ]
                 data.append(full_copy)
         else:
             data = []
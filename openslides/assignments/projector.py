@@ -20,4 +20,6 @@ def assignment_slide(
 
 
 def register_projector_slides() -> None:
-    register_projector_slide("assignments/assignment", assignment_slide)
+    register_projector_slide(
+        "assignments/assignment", assignment_slide, ["assignments/assignment"]
+    )
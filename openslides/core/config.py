@@ -1,11 +1,11 @@
-from typing import Any, Callable, Dict, Iterable, Optional, TypeVar, Union, cast
+from typing import Any, Callable, Dict, Iterable, List, Optional, TypeVar, Union, cast
 
 from asgiref.sync import async_to_sync
 from django.apps import apps
 from django.core.exceptions import ValidationError as DjangoValidationError
 from mypy_extensions import TypedDict
 
-from ..utils.cache import element_cache
+from ..utils.cache import LocalElementCache, element_cache
 from .exceptions import ConfigError, ConfigNotFound
 from .models import ConfigStore
 
@@ -28,7 +28,13 @@ class ConfigHandler:
     """
     A simple object class to wrap the config variables. It is a container
     object. To get a config variable use x = config[...], to set it use
-    config[...] = x.
+    config[...] = x. In async code use await config.async_get(...).
+
+    The values of all config variables are saved in the process as snapshot.
+    It is removed, when a config variable changes. The listeners of the local
+    element cache are used to find the changes. Before the snapshot is used,
+    the local element cache is checked for changes of other processes, so the
+    snapshot is as up to date as the local element cache.
     """
 
     def __init__(self) -> None:
@@ -39,6 +45,13 @@ class ConfigHandler:
         # Index to get the database id from a given config key
         self.key_to_id: Optional[Dict[str, int]] = None
 
+        # The values of all config variables. None, if they have to be loaded.
+        self.values: Optional[Dict[str, Any]] = None
+        self.local_cache: Optional[LocalElementCache] = None
+
+        # The generation is increased every time the values are removed.
+        self.generation = 0
+
     def __getitem__(self, key: str) -> Any:
         """
         Returns the value of the config variable.
@@ -46,9 +59,55 @@ class ConfigHandler:
         if not self.exists(key):
             raise ConfigNotFound(f"The config variable {key} was not found.")
 
-        return async_to_sync(element_cache.get_element_full_data)(
-            self.get_collection_string(), self.get_key_to_id()[key]
-        )["value"]
+        return async_to_sync(self.async_get)(key)
+
+    async def async_get(self, key: str) -> Any:
+        """
+        Like config[key], but async.
+        """
+        if not self.exists(key):
+            raise ConfigNotFound(f"The config variable {key} was not found.")
+
+        local_cache = element_cache.local_cache
+        if local_cache is not self.local_cache:
+            # This is the first call or the local element cache was replaced.
+            self.elements_changed(None)
+            self.local_cache = local_cache
+            local_cache.add_listener(self.elements_changed)
+
+        # Remove the values, if a config variable was changed by another
+        # process.
+        await element_cache.update_local_cache()
+        values = self.values
+        if values is None:
+            values = await self.build_values()
+        return values[key]
+
+    async def build_values(self) -> Dict[str, Any]:
+        """
+        Loads the values of all config variables and saves them, if no config
+        variable was changed in the meantime.
+        """
+        generation = self.generation
+        elements = await element_cache.get_collection_full_data(
+            self.get_collection_string()
+        )
+        values = {element["key"]: element["value"] for element in elements}
+        if generation == self.generation:
+            self.values = values
+        return values
+
+    def elements_changed(self, element_ids: Optional[List[str]]) -> None:
+        """
+        Listener for the local element cache. Removes the values if a config
+        variable has changed.
+        """
+        prefix = f"{self.get_collection_string()}:"
+        if element_ids is None or any(
+            element_id.startswith(prefix) for element_id in element_ids
+        ):
+            self.values = None
+            self.generation += 1
 
     def get_key_to_id(self) -> Dict[str, int]:
         """
@@ -68,8 +127,9 @@ class ConfigHandler:
         This uses the element_cache. It expects, that the config values are in the database
         before this is called.
         """
-        all_data = await element_cache.get_all_full_data()
-        elements = all_data[self.get_collection_string()]
+        elements = await element_cache.get_collection_full_data(
+            self.get_collection_string()
+        )
         self.key_to_id = {}
         for element in elements:
             self.key_to_id[element["key"]] = element["id"]
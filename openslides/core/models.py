@@ -1,6 +1,6 @@
 from asgiref.sync import async_to_sync
 from django.conf import settings
-from django.db import models, transaction
+from django.db import connections, models, transaction
 from django.utils.timezone import now
 from jsonfield import JSONField
 
@@ -285,18 +285,24 @@ class HistoryManager(models.Manager):
     def add_elements(self, elements):
         """
         Method to add elements to the history. This does not trigger autoupdate.
+
+        If the database returns the ids of bulk inserts, all elements are saved
+        with two queries.
         """
+        # Do not update history for history elements itself or if history is disabled.
+        elements = [
+            element
+            for element in elements
+            if not element.get("disable_history")
+            and element["collection_string"] != self.model.get_collection_string()
+        ]
+        if connections[self.db].features.can_return_ids_from_bulk_insert:
+            return self.bulk_add_elements(elements)
+
         with transaction.atomic():
             instances = []
             history_time = now()
             for element in elements:
-                if (
-                    element.get("disable_history")
-                    or element["collection_string"]
-                    == self.model.get_collection_string()
-                ):
-                    # Do not update history for history elements itself or if history is disabled.
-                    continue
                 # HistoryData is not a root rest element so there is no autoupdate and not history saving here.
                 data = HistoryData.objects.create(full_data=element["full_data"])
                 instance = self.model(
@@ -315,6 +321,30 @@ class HistoryManager(models.Manager):
                 instances.append(instance)
         return instances
 
+    def bulk_add_elements(self, elements):
+        """
+        Like add_elements, but uses one query for the HistoryData and one for
+        the History instances.
+        """
+        with transaction.atomic():
+            history_time = now()
+            data_instances = HistoryData.objects.bulk_create(
+                HistoryData(full_data=element["full_data"]) for element in elements
+            )
+            return self.bulk_create(
+                self.model(
+                    element_id=get_element_id(
+                        element["collection_string"], element["id"]
+                    ),
+                    now=history_time,
+                    information=element.get("information", []),
+                    restricted=element.get("restricted", False),
+                    user_id=element.get("user_id"),
+                    full_data=data,
+                )
+                for element, data in zip(elements, data_instances)
+            )
+
     def build_history(self):
         """
         Method to add all cachables to the history.
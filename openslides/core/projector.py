@@ -70,6 +70,10 @@ def clock_slide(
 
 
 def register_projector_slides() -> None:
-    register_projector_slide("core/countdown", countdown_slide)
-    register_projector_slide("core/projector-message", message_slide)
-    register_projector_slide("core/clock", clock_slide)
+    register_projector_slide(
+        "core/countdown", countdown_slide, ["core/countdown", "core/config"]
+    )
+    register_projector_slide(
+        "core/projector-message", message_slide, ["core/projector-message"]
+    )
+    register_projector_slide("core/clock", clock_slide, [])
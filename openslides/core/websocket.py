@@ -1,11 +1,12 @@
 from typing import Any
 
 from ..utils.constants import get_constants
-from ..utils.projector import get_projector_data
+from ..utils.projector import get_projector_data, get_projector_payload
 from ..utils.websocket import (
     BaseWebsocketClientMessage,
     ProtocollAsyncJsonWebsocketConsumer,
     get_element_data,
+    get_user_group_name,
 )
 
 
@@ -23,7 +24,7 @@ class NotifyWebsocketClientMessage(BaseWebsocketClientMessage):
         "properties": {
             "name": {"description": "The name of the notify message", "type": "string"},
             "content": {"description": "The actual content of this message."},
-            "reply_channels": {
+            "replyChannels": {
                 "description": "A list of channels to send this message to.",
                 "type": "array",
                 "items": {"type": "string"},
@@ -48,15 +49,39 @@ class NotifyWebsocketClientMessage(BaseWebsocketClientMessage):
     async def receive_content(
         self, consumer: "ProtocollAsyncJsonWebsocketConsumer", content: Any, id: str
     ) -> None:
-        await consumer.channel_layer.group_send(
-            "site",
-            {
-                "type": "send_notify",
-                "incomming": content,
-                "senderChannelName": consumer.channel_name,
-                "senderUserId": consumer.scope["user"]["id"],
-            },
-        )
+        """
+        Sends the message only to the channels of the recipients.
+
+        Messages to all users or without recipients are sent to the site
+        group. Else the message is sent to the group of each user and to each
+        reply channel.
+        """
+        event = {
+            "type": "send_notify",
+            "incomming": content,
+            "senderChannelName": consumer.channel_name,
+            "senderUserId": consumer.scope["user"]["id"],
+        }
+        users = content.get("users")
+        reply_channels = content.get("replyChannels")
+        if users is True or (users is None and reply_channels is None):
+            await consumer.channel_layer.group_send("site", event)
+            return
+
+        if isinstance(users, list):
+            for user_id in set(users):
+                await consumer.channel_layer.group_send(
+                    get_user_group_name(user_id), event
+                )
+        if isinstance(reply_channels, list):
+            # Channels of the users got the message already.
+            direct_event = dict(event, skipUsers=users or [])
+            for channel_name in set(reply_channels):
+                try:
+                    await consumer.channel_layer.send(channel_name, direct_event)
+                except TypeError:
+                    # The channel name is not valid. Skip it.
+                    pass
 
 
 class ConstantsWebsocketClientMessage(BaseWebsocketClientMessage):
@@ -169,7 +194,9 @@ class ListenToProjectors(BaseWebsocketClientMessage):
         if consumer.listen_projector_ids:
             projector_data = await get_projector_data(consumer.listen_projector_ids)
             for projector_id, data in projector_data.items():
-                consumer.projector_hash[projector_id] = hash(str(data))
+                consumer.projector_hash[projector_id] = get_projector_payload(data)[
+                    "hash"
+                ]
 
             await consumer.send_json(
                 type="projector", content=projector_data, in_response=id
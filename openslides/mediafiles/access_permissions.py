@@ -10,6 +10,7 @@ class MediafileAccessPermissions(BaseAccessPermissions):
     """
 
     base_permission = "mediafiles.can_see"
+    user_specific_data = False
 
     async def get_restricted_data(
         self, full_data: List[Dict[str, Any]], user_id: int
@@ -39,4 +39,6 @@ def mediafile_slide(
 
 
 def register_projector_slides() -> None:
-    register_projector_slide("mediafiles/mediafile", mediafile_slide)
+    register_projector_slide(
+        "mediafiles/mediafile", mediafile_slide, ["mediafiles/mediafile"]
+    )
@@ -22,8 +22,17 @@ class MotionAccessPermissions(BaseAccessPermissions):
         some unauthorized users. Ensures that a user can only see his own
         personal notes.
         """
+        from .models import State
+
         # Parse data.
         if await async_has_perm(user_id, "motions.can_see"):
+            # The permissions do not depend on the motion, so they are checked
+            # only once.
+            can_manage = await async_has_perm(user_id, "motions.can_manage")
+            can_manage_metadata = await async_has_perm(
+                user_id, "motions.can_manage_metadata"
+            )
+
             # TODO: Refactor this after personal_notes system is refactored.
             data = []
             for full in full_data:
@@ -37,11 +46,9 @@ class MotionAccessPermissions(BaseAccessPermissions):
                     is_submitter = False
 
                 # Check see permission for this motion.
-                from .models import State
-
-                if await async_has_perm(user_id, "motions.can_manage"):
+                if can_manage:
                     level = State.MANAGERS_ONLY
-                elif await async_has_perm(user_id, "motions.can_manage_metadata"):
+                elif can_manage_metadata:
                     level = State.EXTENDED_MANAGERS
                 elif is_submitter:
                     level = State.EXTENDED_MANAGERS_AND_SUBMITTER
@@ -70,6 +77,7 @@ class MotionChangeRecommendationAccessPermissions(BaseAccessPermissions):
     """
 
     base_permission = "motions.can_see"
+    user_specific_data = False
 
     async def get_restricted_data(
         self, full_data: List[Dict[str, Any]], user_id: int
@@ -98,6 +106,7 @@ class MotionCommentSectionAccessPermissions(BaseAccessPermissions):
     """
 
     base_permission = "motions.can_see"
+    user_specific_data = False
 
     async def get_restricted_data(
         self, full_data: List[Dict[str, Any]], user_id: int
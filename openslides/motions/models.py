@@ -1,4 +1,4 @@
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Set, Tuple
 
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
@@ -92,6 +92,88 @@ class MotionManager(models.Manager):
         )
 
 
+class IdentifierAllocator:
+    """
+    Finds free motion identifiers in memory.
+
+    The used identifiers are loaded with one query. If prefix is given, only
+    the identifiers with this prefix are loaded. Use one allocator for all
+    motions of a request, that get new identifiers.
+
+    The biggest identifier numbers are queried once per group of motions
+    that are counted together, see Motion.set_identifier().
+    """
+
+    def __init__(self, prefix: str = "") -> None:
+        queryset = Motion.objects.exclude(identifier=None)
+        if prefix:
+            queryset = queryset.filter(identifier__startswith=prefix)
+        self.identifiers: Dict[int, Optional[str]] = dict(
+            queryset.values_list("pk", "identifier")
+        )
+        self.used: Set[str] = set(
+            identifier for identifier in self.identifiers.values() if identifier
+        )
+        self.max_numbers: Dict[Tuple[str, Optional[int]], int] = {}
+
+    def get_max_identifier_number(
+        self, group: Tuple[str, Optional[int]], motions: models.QuerySet
+    ) -> int:
+        """
+        Returns the biggest identifier number of the motions of a group.
+        """
+        if group not in self.max_numbers:
+            self.max_numbers[group] = (
+                motions.aggregate(Max("identifier_number"))["identifier_number__max"]
+                or 0
+            )
+        return self.max_numbers[group]
+
+    def set_identifier_number(self, motion: "Motion", number: int) -> None:
+        """
+        Saves the new identifier number of a motion in all groups of the
+        motion.
+        """
+        groups = [("all", None), ("category", motion.category_id)]
+        if motion.parent_id is not None:
+            groups.append(("parent", motion.parent_id))
+        for group in groups:
+            if group in self.max_numbers:
+                self.max_numbers[group] = max(self.max_numbers[group], number)
+
+    def set_identifier(self, pk: Optional[int], identifier: Optional[str]) -> None:
+        """
+        Saves the new identifier of a motion. The old one is free afterwards.
+
+        pk is None for a motion, that is not saved yet.
+        """
+        if pk is None:
+            if identifier:
+                self.used.add(identifier)
+            return
+        old_identifier = self.identifiers.get(pk)
+        if old_identifier:
+            self.used.discard(old_identifier)
+        self.identifiers[pk] = identifier
+        if identifier:
+            self.used.add(identifier)
+
+    def get_free_identifier(
+        self, motion: "Motion", number: int, prefix: str, initial_increment: bool
+    ) -> Tuple[int, str]:
+        """
+        Increments the number until a free identifier is found. Returns the
+        number and the identifier.
+        """
+        if initial_increment:
+            number += 1
+        identifier = f"{prefix}{motion.extend_identifier_number(number)}"
+        while identifier in self.used:
+            number += 1
+            identifier = f"{prefix}{motion.extend_identifier_number(number)}"
+        return number, identifier
+
+
 class Motion(RESTModelMixin, models.Model):
     """
     Model for motions.
@@ -322,10 +404,13 @@ class Motion(RESTModelMixin, models.Model):
         if not skip_autoupdate:
             inform_changed_data(self)
 
-    def set_identifier(self):
+    def set_identifier(self, allocator=None):
         """
         Sets the motion identifier automaticly according to the config value if
         it is not set yet.
+
+        If an IdentifierAllocator is given, the free identifier is searched
+        with it and the new identifier is saved in it.
         """
         # The identifier is already set or should be set manually.
         if config["motions_identifier"] == "manually" or self.identifier:
@@ -363,33 +448,55 @@ class Motion(RESTModelMixin, models.Model):
             # Find all motions that should be included in the calculations.
             if self.is_amendment():
                 motions = self.parent.amendments.all()
+                group = ("parent", self.parent_id)
             # The motions should be counted per category.
             elif config["motions_identifier"] == "per_category":
                 motions = Motion.objects.filter(category=self.category)
+                group = ("category", self.category_id)
             # The motions should be counted over all.
             else:
                 motions = Motion.objects.all()
+                group = ("all", None)
 
-            number = (
-                motions.aggregate(Max("identifier_number"))["identifier_number__max"]
-                or 0
-            )
+            if allocator is not None:
+                number = allocator.get_max_identifier_number(group, motions)
+            else:
+                number = (
+                    motions.aggregate(Max("identifier_number"))[
+                        "identifier_number__max"
+                    ]
+                    or 0
+                )
             initial_increment = True
 
         # Calculate new identifier.
         number, identifier = self.increment_identifier_number(
-            number, prefix, initial_increment=initial_increment
+            number, prefix, initial_increment=initial_increment, allocator=allocator
         )
 
         # Set identifier and identifier_number.
         self.identifier = identifier
         self.identifier_number = number
+        if allocator is not None:
+            allocator.set_identifier(self.pk, identifier)
+            allocator.set_identifier_number(self, number)
 
-    def increment_identifier_number(self, number, prefix, initial_increment=True):
+    def increment_identifier_number(
+        self, number, prefix, initial_increment=True, allocator=None
+    ):
         """
         Helper method. It increments the number until a free identifier
         number is found. Returns new number and identifier.
+
+        Without an IdentifierAllocator, each identifier is checked with one
+        query. This is faster for one motion, because usually the first
+        identifier is free.
         """
+        if allocator is not None:
+            return allocator.get_free_identifier(
+                self, number, prefix, initial_increment
+            )
+
         if initial_increment:
             number += 1
         identifier = f"{prefix}{self.extend_identifier_number(number)}"
@@ -429,7 +536,7 @@ class Motion(RESTModelMixin, models.Model):
         """
         Returns True if user is a supporter of this motion, else False.
         """
-        return user in self.supporters.all()
+        return self.supporters.filter(pk=user.pk).exists()
 
     def create_poll(self, skip_autoupdate=False):
         """
@@ -454,17 +561,18 @@ class Motion(RESTModelMixin, models.Model):
         """
         return self.state.workflow.pk
 
-    def set_state(self, state):
+    def set_state(self, state, allocator=None):
         """
         Set the state of the motion.
 
-        'state' can be the id of a state object or a state object.
+        'state' can be the id of a state object or a state object. allocator
+        is passed to set_identifier().
         """
         if isinstance(state, int):
             state = State.objects.get(pk=state)
 
         if not state.dont_set_identifier:
-            self.set_identifier()
+            self.set_identifier(allocator)
         self.state = state
 
     def reset_state(self, workflow=None):
@@ -502,12 +610,12 @@ class Motion(RESTModelMixin, models.Model):
             recommendation = State.objects.get(pk=recommendation)
         self.recommendation = recommendation
 
-    def follow_recommendation(self):
+    def follow_recommendation(self, allocator=None):
         """
         Set the state of this motion to its recommendation.
         """
         if self.recommendation is not None:
-            self.set_state(self.recommendation)
+            self.set_state(self.recommendation, allocator)
             if (
                 self.recommendation_extension is not None
                 and self.state.show_state_extension_field
@@ -541,7 +649,7 @@ class Motion(RESTModelMixin, models.Model):
 
     def write_log(self, message_list, person=None, skip_autoupdate=False):
         """
-        Write a log message.
+        Write a log message and return it.
 
         The message should be in English.
         """
@@ -549,6 +657,27 @@ class Motion(RESTModelMixin, models.Model):
             person = None
         motion_log = MotionLog(motion=self, message_list=message_list, person=person)
         motion_log.save(skip_autoupdate=skip_autoupdate)
+        return motion_log
+
+    def get_supporters_patch(self, motion_log):
+        """
+        Returns a patch for inform_patched_data(), that sets the supporters
+        and adds the log message to the full_data of this motion.
+
+        Only the supporters and the log message are serialized. The other
+        fields are taken from the old full_data.
+        """
+        supporters = self.get_full_data_fields(["supporters_id"])
+        log_message = motion_log.get_full_data()
+
+        def patch(full_data):
+            return {
+                **full_data,
+                **supporters,
+                "log_messages": [log_message] + full_data["log_messages"],
+            }
+
+        return patch
 
     def is_amendment(self):
         """
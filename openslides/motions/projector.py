@@ -1,10 +1,12 @@
 import re
-from typing import Any, Dict
+from collections import defaultdict
+from typing import Any, Dict, List
 
 from ..users.projector import get_user_name
 from ..utils.projector import (
     AllData,
     ProjectorElementException,
+    get_collection_index,
     get_config,
     register_projector_slide,
 )
@@ -18,6 +20,44 @@ motion_placeholder_regex = re.compile(r"\[motion:(\d+)\]")
 #            to be fast!
 
 
+def build_states_index(
+    workflows: Dict[int, Dict[str, Any]]
+) -> Dict[int, Dict[int, Dict[str, Any]]]:
+    """
+    Builds a dict from a workflow_id to the states of the workflow by their id.
+    """
+    return {
+        workflow_id: {state["id"]: state for state in workflow["states"]}
+        for workflow_id, workflow in workflows.items()
+    }
+
+
+def build_amendments_index(
+    motions: Dict[int, Dict[str, Any]]
+) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Builds a dict from a motion_id to all amendments of the motion.
+    """
+    amendments: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+    for motion in motions.values():
+        if motion["parent_id"] is not None:
+            amendments[motion["parent_id"]].append(motion)
+    return amendments
+
+
+def build_motion_block_index(
+    motions: Dict[int, Dict[str, Any]]
+) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Builds a dict from a motion_block_id to all motions in the motion block.
+    """
+    motion_blocks: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+    for motion in motions.values():
+        if motion["motion_block_id"] is not None:
+            motion_blocks[motion["motion_block_id"]].append(motion)
+    return motion_blocks
+
+
 def get_state(
     all_data: AllData, motion: Dict[str, Any], state_id: int
 ) -> Dict[str, Any]:
@@ -26,13 +66,13 @@ def get_state(
 
     Returns an error if the state_id does not exist for the workflow in the motion.
     """
-    states = all_data["motions/workflow"][motion["workflow_id"]]["states"]
-    for state in states:
-        if state["id"] == state_id:
-            return state
-    raise ProjectorElementException(
-        f"motion {motion['id']} can not be on the state with id {state_id}"
-    )
+    states = get_collection_index(all_data, "motions/workflow", build_states_index)
+    try:
+        return states[motion["workflow_id"]][state_id]
+    except KeyError:
+        raise ProjectorElementException(
+            f"motion {motion['id']} can not be on the state with id {state_id}"
+        )
 
 
 def get_amendment_merge_into_motion_diff(all_data, motion, amendment):
@@ -73,24 +113,26 @@ def get_amendment_merge_into_motion_final(all_data, motion, amendment):
 
 def get_amendments_for_motion(motion, all_data):
     amendment_data = []
-    for amendment_id, amendment in all_data["motions/motion"].items():
-        if amendment["parent_id"] == motion["id"]:
-            merge_amendment_into_final = get_amendment_merge_into_motion_final(
-                all_data, motion, amendment
-            )
-            merge_amendment_into_diff = get_amendment_merge_into_motion_diff(
-                all_data, motion, amendment
-            )
-            amendment_data.append(
-                {
-                    "id": amendment["id"],
-                    "identifier": amendment["identifier"],
-                    "title": amendment["title"],
-                    "amendment_paragraphs": amendment["amendment_paragraphs"],
-                    "merge_amendment_into_diff": merge_amendment_into_diff,
-                    "merge_amendment_into_final": merge_amendment_into_final,
-                }
-            )
+    amendments = get_collection_index(
+        all_data, "motions/motion", build_amendments_index
+    )
+    for amendment in amendments.get(motion["id"], []):
+        merge_amendment_into_final = get_amendment_merge_into_motion_final(
+            all_data, motion, amendment
+        )
+        merge_amendment_into_diff = get_amendment_merge_into_motion_diff(
+            all_data, motion, amendment
+        )
+        amendment_data.append(
+            {
+                "id": amendment["id"],
+                "identifier": amendment["identifier"],
+                "title": amendment["title"],
+                "amendment_paragraphs": amendment["amendment_paragraphs"],
+                "merge_amendment_into_diff": merge_amendment_into_diff,
+                "merge_amendment_into_final": merge_amendment_into_final,
+            }
+        )
     return amendment_data
 
 
@@ -280,31 +322,27 @@ def motion_block_slide(
     # All title information for referenced motions in the recommendation
     referenced_motions: Dict[int, Dict[str, str]] = {}
 
-    # Search motions.
-    for motion in all_data["motions/motion"].values():
-        if motion["motion_block_id"] == motion_block_id:
-            motion_object = {
-                "title": motion["title"],
-                "identifier": motion["identifier"],
+    motion_blocks = get_collection_index(
+        all_data, "motions/motion", build_motion_block_index
+    )
+    for motion in motion_blocks.get(motion_block_id, []):
+        motion_object = {"title": motion["title"], "identifier": motion["identifier"]}
+
+        recommendation_id = motion["recommendation_id"]
+        if recommendation_id is not None:
+            recommendation = get_state(all_data, motion, motion["recommendation_id"])
+            motion_object["recommendation"] = {
+                "name": recommendation["recommendation_label"],
+                "css_class": recommendation["css_class"],
             }
-
-            recommendation_id = motion["recommendation_id"]
-            if recommendation_id is not None:
-                recommendation = get_state(
-                    all_data, motion, motion["recommendation_id"]
+            if recommendation["show_recommendation_extension_field"]:
+                recommendation_extension = motion["recommendation_extension"]
+                extend_reference_motion_dict(
+                    all_data, recommendation_extension, referenced_motions
                 )
-                motion_object["recommendation"] = {
-                    "name": recommendation["recommendation_label"],
-                    "css_class": recommendation["css_class"],
-                }
-                if recommendation["show_recommendation_extension_field"]:
-                    recommendation_extension = motion["recommendation_extension"]
-                    extend_reference_motion_dict(
-                        all_data, recommendation_extension, referenced_motions
-                    )
-                    motion_object["recommendation_extension"] = recommendation_extension
-
-            motions.append(motion_object)
+                motion_object["recommendation_extension"] = recommendation_extension
+
+        motions.append(motion_object)
 
     return {
         "title": motion_block["title"],
@@ -314,5 +352,19 @@ def motion_block_slide(
 
 
 def register_projector_slides() -> None:
-    register_projector_slide("motions/motion", motion_slide)
-    register_projector_slide("motions/motion-block", motion_block_slide)
+    register_projector_slide(
+        "motions/motion",
+        motion_slide,
+        [
+            "motions/motion",
+            "motions/workflow",
+            "motions/statute-paragraph",
+            "users/user",
+            "core/config",
+        ],
+    )
+    register_projector_slide(
+        "motions/motion-block",
+        motion_block_slide,
+        ["motions/motion-block", "motions/motion", "motions/workflow"],
+    )
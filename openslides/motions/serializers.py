@@ -42,6 +42,16 @@ def validate_workflow_field(value):
         raise ValidationError({"detail": f"Workflow {value} does not exist."})
 
 
+def validate_changed_html(html, stored_html):
+    """
+    Like validate_html(), but returns html unchanged, if it is the same as the
+    value in the database. This value was already validated, when it was saved.
+    """
+    if html == stored_html:
+        return html
+    return validate_html(html)
+
+
 class StatuteParagraphSerializer(ModelSerializer):
     """
     Serializer for motion.models.StatuteParagraph objects.
@@ -448,26 +458,28 @@ class MotionSerializer(ModelSerializer):
         )  # Some other fields are also read_only. See definitions above.
 
     def validate(self, data):
-        if "text" in data:
-            data["text"] = validate_html(data["text"])
-
-        if "modified_final_version" in data:
-            data["modified_final_version"] = validate_html(
-                data["modified_final_version"]
-            )
-
-        if "reason" in data:
-            data["reason"] = validate_html(data["reason"])
+        # On updates, the fields that did not change are not validated again.
+        for field_name in ("text", "modified_final_version", "reason"):
+            if field_name in data:
+                data[field_name] = validate_changed_html(
+                    data[field_name], getattr(self.instance, field_name, None)
+                )
 
         if "amendment_paragraphs" in data:
-            data["amendment_paragraphs"] = list(
-                map(
-                    lambda entry: validate_html(entry)
-                    if isinstance(entry, str)
+            stored_paragraphs = (
+                getattr(self.instance, "amendment_paragraphs", None) or []
+            )
+            data["amendment_paragraphs"] = [
+                validate_changed_html(
+                    entry,
+                    stored_paragraphs[index]
+                    if index < len(stored_paragraphs)
                     else None,
-                    data["amendment_paragraphs"],
                 )
-            )
+                if isinstance(entry, str)
+                else None
+                for index, entry in enumerate(data["amendment_paragraphs"])
+            ]
             data["text"] = ""
         else:
             if "text" in data and not data["text"]:
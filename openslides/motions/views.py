@@ -1,19 +1,28 @@
-import re
-from typing import List
+import itertools
+from collections import defaultdict
+from typing import Dict, Iterator, List, Set
 
 import jsonschema
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db import IntegrityError, transaction
 from django.db.models.deletion import ProtectedError
 from django.http.request import QueryDict
+from django.utils import timezone
 from rest_framework import status
 
+from ..agenda.models import Item
 from ..core.config import config
 from ..core.models import Tag
 from ..utils.auth import has_perm, in_some_groups
-from ..utils.autoupdate import inform_changed_data, inform_deleted_data
+from ..utils.autoupdate import (
+    inform_changed_data,
+    inform_deleted_data,
+    inform_patched_data,
+)
+from ..utils.models import bulk_update
 from ..utils.rest_api import (
     CreateModelMixin,
     DestroyModelMixin,
@@ -38,6 +47,7 @@ from .access_permissions import (
 from .exceptions import WorkflowError
 from .models import (
     Category,
+    IdentifierAllocator,
     Motion,
     MotionBlock,
     MotionChangeRecommendation,
@@ -529,7 +539,9 @@ class MotionViewSet(ModelViewSet):
             ):
                 raise ValidationError({"detail": "You can not support this motion."})
             motion.supporters.add(request.user)
-            motion.write_log(["Motion supported"], request.user)
+            motion_log = motion.write_log(
+                ["Motion supported"], request.user, skip_autoupdate=True
+            )
             # Send new supporter via autoupdate because users without permission
             # to see users may not have it but can get it now.
             # TODO: Skip history.
@@ -541,12 +553,18 @@ class MotionViewSet(ModelViewSet):
             if not motion.state.allow_support or not motion.is_supporter(request.user):
                 raise ValidationError({"detail": "You can not unsupport this motion."})
             motion.supporters.remove(request.user)
-            motion.write_log(["Motion unsupported"], request.user)
+            motion_log = motion.write_log(
+                ["Motion unsupported"], request.user, skip_autoupdate=True
+            )
             message = "You have unsupported this motion successfully."
 
         # Fire autoupdate again to save information to OpenSlides history.
-        inform_changed_data(
-            motion, information=["Supporters changed"], user_id=request.user.pk
+        # Only the supporters and the new log message are serialized.
+        inform_patched_data(
+            motion,
+            motion.get_supporters_patch(motion_log),
+            information=["Supporters changed"],
+            user_id=request.user.pk,
         )
 
         # Initiate response.
@@ -649,35 +667,59 @@ class MotionViewSet(ModelViewSet):
         except jsonschema.ValidationError as err:
             raise ValidationError({"detail": str(err)})
 
+        # Load all motions and states at once. The identifiers are searched
+        # in memory, if more than one motion gets a new state.
+        db_motions = Motion.objects.select_related(
+            "state", "category", "parent"
+        ).in_bulk([item["id"] for item in motions])
+        states = State.objects.in_bulk([item["state"] for item in motions])
+        allocator = IdentifierAllocator() if len(motions) > 1 else None
+        last_modified = timezone.now()
+
         motion_result = []
         for item in motions:
             # Get motion.
             try:
-                motion = Motion.objects.get(pk=item["id"])
-            except Motion.DoesNotExist:
+                motion = db_motions[item["id"]]
+            except KeyError:
                 raise ValidationError({"detail": f"Motion {item['id']} does not exist"})
 
             # Set or reset state.
             state_id = item["state"]
-            valid_states = State.objects.filter(workflow=motion.workflow_id)
-            if state_id not in [item.id for item in valid_states]:
+            state = states.get(state_id)
+            if state is None or state.workflow_id != motion.state.workflow_id:
                 # States of different workflows are not allowed.
                 raise ValidationError(
                     {"detail": f"You can not set the state to {state_id}."}
                 )
-            motion.set_state(state_id)
+            motion.set_state(state, allocator)
+            motion.last_modified = last_modified
+            motion_result.append(motion)
 
-            # Save motion.
-            motion.save(
-                update_fields=[
-                    "state",
-                    "identifier",
-                    "identifier_number",
-                    "last_modified",
-                ],
-                skip_autoupdate=True,
+        # Save all motions.
+        try:
+            with transaction.atomic():
+                bulk_update(
+                    motion_result,
+                    ["state", "identifier", "identifier_number", "last_modified"],
+                )
+        except IntegrityError:
+            # Another request has used one of the identifiers in the meantime.
+            # Save the motions one by one. Motion.save() searches a free
+            # identifier again.
+            for motion in motion_result:
+                motion.save(skip_autoupdate=True)
+
+        # The agenda items show the identifiers of the motions. bulk_update()
+        # sends no signals, so they are informed here.
+        inform_changed_data(
+            Item.objects.get_full_queryset().filter(
+                content_type=ContentType.objects.get_for_model(Motion),
+                object_id__in=[motion.pk for motion in motion_result],
             )
+        )
 
+        for motion in motion_result:
             # Write the log message.
             motion.write_log(
                 message_list=["State set to", " ", motion.state.name],
@@ -692,9 +734,6 @@ class MotionViewSet(ModelViewSet):
                 user_id=request.user.pk,
             )
 
-            # Finish motion.
-            motion_result.append(motion)
-
         # Send response.
         return Response(
             {"detail": f"State of {len(motion_result)} motions successfully set."}
@@ -1232,7 +1271,10 @@ class CategoryViewSet(ModelViewSet):
         """
         category = self.get_object()
         number = 0
-        instances = []
+        integrity_error_message = (
+            "Error: At least one identifier of this category does already "
+            "exist in another category."
+        )
 
         # If MOTION_IDENTIFIER_WITHOUT_BLANKS is set, don't use blanks when building identifier.
         without_blank = (
@@ -1247,7 +1289,7 @@ class CategoryViewSet(ModelViewSet):
             prefix = category.prefix
         else:
             prefix = f"{category.prefix} "
-        motions = category.motion_set.all()
+        motions = category.motion_set.select_related("parent")
         motion_list = request.data.get("motions")
         if motion_list:
             motion_dict = {}
@@ -1255,83 +1297,119 @@ class CategoryViewSet(ModelViewSet):
                 motion_dict[motion.pk] = motion
             motions = [motion_dict[pk] for pk in motion_list]
 
-        # Change identifiers.
-        error_message = None
-        try:
-            with transaction.atomic():
-                # Collect old and new identifiers.
-                motions_to_be_sorted = []
-                for motion in motions:
-                    if motion.is_amendment():
-                        parent_identifier = motion.parent.identifier or ""
-                        if without_blank:
-                            prefix = f"{parent_identifier}{config['motions_amendments_prefix']}"
-                        else:
-                            prefix = f"{parent_identifier} {config['motions_amendments_prefix']} "
-                    number += 1
-                    new_identifier = (
-                        f"{prefix}{motion.extend_identifier_number(number)}"
-                    )
-                    motions_to_be_sorted.append(
-                        {
-                            "motion": motion,
-                            "old_identifier": motion.identifier,
-                            "new_identifier": new_identifier,
-                            "number": number,
-                        }
+        # Collect old and new identifiers.
+        motions_to_be_sorted = []
+        for motion in motions:
+            if motion.is_amendment():
+                parent_identifier = motion.parent.identifier or ""
+                if without_blank:
+                    prefix = f"{parent_identifier}{config['motions_amendments_prefix']}"
+                else:
+                    prefix = (
+                        f"{parent_identifier} {config['motions_amendments_prefix']} "
                     )
+            number += 1
+            new_identifier = f"{prefix}{motion.extend_identifier_number(number)}"
+            motions_to_be_sorted.append(
+                {
+                    "motion": motion,
+                    "old_identifier": motion.identifier,
+                    "new_identifier": new_identifier,
+                    "number": number,
+                }
+            )
+
+        # Load all identifiers and amendments once and change the identifiers
+        # in memory.
+        allocator = IdentifierAllocator()
+        amendments: Dict[int, List[int]] = defaultdict(list)
+        for pk, parent_id in Motion.objects.exclude(parent=None).values_list(
+            "pk", "parent_id"
+        ):
+            amendments[parent_id].append(pk)
+
+        def get_amendments_deep(pk: int) -> Iterator[int]:
+            for amendment_pk in amendments[pk]:
+                yield amendment_pk
+                yield from get_amendments_deep(amendment_pk)
+
+        # Remove old identifiers.
+        for obj in motions_to_be_sorted:
+            allocator.set_identifier(obj["motion"].pk, None)
+
+        # Set new identifers and change identifiers of amendments.
+        identifier_numbers: Dict[int, int] = {}
+        changed_amendments: Set[int] = set()
+        for obj in motions_to_be_sorted:
+            new_identifier = obj["new_identifier"]
+            if new_identifier in allocator.used:
+                return Response(
+                    {
+                        "detail": f'Numbering aborted because the motion identifier "{new_identifier}" '
+                        "already exists outside of this category."
+                    },
+                    status=400,
+                )
+            allocator.set_identifier(obj["motion"].pk, new_identifier)
+            identifier_numbers[obj["motion"].pk] = obj["number"]
 
-                # Remove old identifiers
-                for motion in motions:
-                    motion.identifier = None
-                    # This line is to skip agenda item autoupdate. See agenda/signals.py.
-                    motion.agenda_item_update_information["skip_autoupdate"] = True
-                    motion.save(skip_autoupdate=True)
-
-                # Set new identifers and change identifiers of amendments.
-                for obj in motions_to_be_sorted:
-                    if Motion.objects.filter(identifier=obj["new_identifier"]).exists():
-                        # Set the error message and let the code run into an IntegrityError
-                        new_identifier = obj["new_identifier"]
-                        error_message = (
-                            f'Numbering aborted because the motion identifier "{new_identifier}" '
-                            "already exists outside of this category."
+            old_identifier = obj["old_identifier"]
+            if not old_identifier:
+                continue
+            for child_pk in get_amendments_deep(obj["motion"].pk):
+                child_identifier = allocator.identifiers.get(child_pk)
+                if child_identifier and child_identifier.startswith(old_identifier):
+                    child_identifier = (
+                        new_identifier
+                        + child_identifier[len(old_identifier) :]  # noqa: E203
+                    )
+                    if child_identifier in allocator.used:
+                        return Response({"detail": integrity_error_message}, status=400)
+                    allocator.set_identifier(child_pk, child_identifier)
+                    changed_amendments.add(child_pk)
+
+        # Save all identifiers. The old identifiers are removed first, so that
+        # the identifiers can be swapped.
+        changed_pks = set(identifier_numbers.keys()) | changed_amendments
+        try:
+            with transaction.atomic():
+                Motion.objects.filter(pk__in=changed_pks).update(
+                    identifier=None, last_modified=timezone.now()
+                )
+                bulk_update(
+                    (
+                        Motion(
+                            pk=pk,
+                            identifier=allocator.identifiers[pk],
+                            identifier_number=identifier_number,
                         )
-                    motion = obj["motion"]
-                    motion.identifier = obj["new_identifier"]
-                    motion.identifier_number = obj["number"]
-                    motion.save(skip_autoupdate=True)
-                    instances.append(motion)
-                    instances.append(motion.agenda_item)
-                    # Change identifiers of amendments.
-                    for child in motion.get_amendments_deep():
-                        if child.identifier and child.identifier.startswith(
-                            obj["old_identifier"]
-                        ):
-                            child.identifier = re.sub(
-                                obj["old_identifier"],
-                                obj["new_identifier"],
-                                child.identifier,
-                                count=1,
-                            )
-                            # This line is to skip agenda item autoupdate. See agenda/signals.py.
-                            child.agenda_item_update_information[
-                                "skip_autoupdate"
-                            ] = True
-                            child.save(skip_autoupdate=True)
-                            instances.append(child)
-                            instances.append(child.agenda_item)
+                        for pk, identifier_number in identifier_numbers.items()
+                    ),
+                    ["identifier", "identifier_number"],
+                )
+                bulk_update(
+                    (
+                        Motion(pk=pk, identifier=allocator.identifiers[pk])
+                        for pk in changed_amendments - identifier_numbers.keys()
+                    ),
+                    ["identifier"],
+                )
         except IntegrityError:
-            if error_message is None:
-                error_message = "Error: At least one identifier of this category does already exist in another category."
-            response = Response({"detail": error_message}, status=400)
-        else:
-            inform_changed_data(
-                instances, information=["Number set"], user_id=request.user.pk
-            )
-            message = f"All motions in category {category} numbered " "successfully."
-            response = Response({"detail": message})
-        return response
+            return Response({"detail": integrity_error_message}, status=400)
+
+        inform_changed_data(
+            itertools.chain(
+                Motion.objects.get_full_queryset().filter(pk__in=changed_pks),
+                Item.objects.get_full_queryset().filter(
+                    content_type=ContentType.objects.get_for_model(Motion),
+                    object_id__in=changed_pks,
+                ),
+            ),
+            information=["Number set"],
+            user_id=request.user.pk,
+        )
+        message = f"All motions in category {category} numbered " "successfully."
+        return Response({"detail": message})
 
 
 class MotionBlockViewSet(ModelViewSet):
@@ -1374,10 +1452,14 @@ class MotionBlockViewSet(ModelViewSet):
         its recommendation. It is a POST request without any data.
         """
         motion_block = self.get_object()
+        motions = list(motion_block.motion_set.all())
+        # Search the identifiers in memory, if more than one motion can get
+        # a new identifier.
+        allocator = IdentifierAllocator() if len(motions) > 1 else None
         with transaction.atomic():
-            for motion in motion_block.motion_set.all():
+            for motion in motions:
                 # Follow recommendation.
-                motion.follow_recommendation()
+                motion.follow_recommendation(allocator)
                 motion.save(skip_autoupdate=True)
                 # Write the log message.
                 motion.write_log(
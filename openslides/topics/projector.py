@@ -47,4 +47,6 @@ def topic_slide(
 
 
 def register_projector_slides() -> None:
-    register_projector_slide("topics/topic", topic_slide)
+    register_projector_slide(
+        "topics/topic", topic_slide, ["topics/topic", "agenda/item"]
+    )
@@ -78,9 +78,12 @@ class UserManager(BaseUserManager):
         admin.groups.add(GROUP_ADMIN_PK)
         return created
 
-    def generate_username(self, first_name, last_name):
+    def generate_username(self, first_name, last_name, used_usernames=None):
         """
         Generates a username from first name and last name.
+
+        If used_usernames is given, it is used instead of the database to find
+        a free username.
         """
         first_name = first_name.strip()
         last_name = last_name.strip()
@@ -94,19 +97,68 @@ class UserManager(BaseUserManager):
                     "Either 'first_name' or 'last_name' must not be " "empty."
                 )
 
-        if not self.filter(username=base_name).exists():
+        def is_used(username):
+            if used_usernames is not None:
+                return username in used_usernames
+            return self.filter(username=username).exists()
+
+        if not is_used(base_name):
             generated_username = base_name
         else:
             counter = 0
             while True:
                 counter += 1
                 test_name = f"{base_name} {counter}"
-                if not self.filter(username=test_name).exists():
+                if not is_used(test_name):
                     generated_username = test_name
                     break
 
         return generated_username
 
+    def bulk_create_users(self, users_data, executor=None):
+        """
+        Creates many users with one query for the users and one for their
+        groups. Returns the ids of the new users.
+
+        users_data is a list of validated data from the UserImportSerializer.
+        The passwords are hashed in the processes of the executor, if one is
+        given.
+        """
+        for data in users_data:
+            if not data.get("default_password"):
+                data["default_password"] = self.generate_password()
+        passwords = [data["default_password"] for data in users_data]
+        if executor is None:
+            hashed_passwords = [make_password(password) for password in passwords]
+        else:
+            hashed_passwords = list(executor.map(make_password, passwords))
+
+        users = []
+        groups = []
+        for data, hashed_password in zip(users_data, hashed_passwords):
+            data = dict(data)
+            groups.append(data.pop("groups", []))
+            users.append(self.model(password=hashed_password, **data))
+        users = self.bulk_create(users)
+
+        if any(user.pk is None for user in users):
+            # Only some databases return the ids of the created rows.
+            user_ids = dict(
+                self.filter(username__in=[user.username for user in users]).values_list(
+                    "username", "pk"
+                )
+            )
+            for user in users:
+                user.pk = user_ids[user.username]
+
+        membership = self.model.groups.through
+        membership.objects.bulk_create(
+            membership(user_id=user.pk, group_id=group.pk)
+            for user, user_groups in zip(users, groups)
+            for group in user_groups
+        )
+        return [user.pk for user in users]
+
     def generate_password(self):
         """
         Generates a random passwort. Do not use l, o, I, O, 1 or 0.
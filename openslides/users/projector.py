@@ -51,4 +51,4 @@ def get_user_name(all_data: AllData, user_id: int) -> str:
 
 
 def register_projector_slides() -> None:
-    register_projector_slide("users/user", user_slide)
+    register_projector_slide("users/user", user_slide, ["users/user"])
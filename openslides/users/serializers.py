@@ -3,6 +3,7 @@ from django.contrib.auth.models import Permission
 
 from ..utils.autoupdate import inform_changed_data
 from ..utils.rest_api import (
+    CharField,
     IdPrimaryKeyRelatedField,
     JSONField,
     ModelSerializer,
@@ -112,6 +113,64 @@ class UserFullSerializer(ModelSerializer):
         return user
 
 
+class ImportGroupRelatedField(IdPrimaryKeyRelatedField):
+    """
+    Field for the groups of an imported user. The groups are taken from the
+    serializer context instead of the database.
+    """
+
+    def to_internal_value(self, data):
+        try:
+            return self.context["groups"][int(data)]
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        except KeyError:
+            self.fail("does_not_exist", pk_value=data)
+
+
+class UserImportSerializer(UserFullSerializer):
+    """
+    Serializer for the mass import of users.
+
+    The context has to contain the groups as dict from their id and the set
+    of used usernames. So a user can be validated without database queries.
+    The usernames of valid users are added to the set.
+    """
+
+    # The full data of users is built with the UserFullSerializer.
+    register_serializer = False
+
+    groups = ImportGroupRelatedField(
+        many=True, required=False, queryset=Group.objects.exclude(pk=1)
+    )
+    # Without the unique validator. The usernames are checked in validate().
+    username = CharField(allow_blank=True, max_length=255, required=False)
+
+    def validate(self, data):
+        """
+        Checks if the given data is empty. Generates the username if it is
+        empty or checks that it is not used.
+        """
+        if not (
+            data.get("username") or data.get("first_name") or data.get("last_name")
+        ):
+            raise ValidationError(
+                {"detail": "Username, given name and surname can not all be empty."}
+            )
+
+        usernames = self.context["usernames"]
+        if not data.get("username"):
+            data["username"] = User.objects.generate_username(
+                data.get("first_name", ""), data.get("last_name", ""), usernames
+            )
+        elif data["username"] in usernames:
+            raise ValidationError(
+                {"username": ["A user with this username already exists."]}
+            )
+        usernames.add(data["username"])
+        return data
+
+
 class PermissionRelatedField(RelatedField):
     """
     A custom field to use for the permission relationship.
@@ -1,6 +1,10 @@
+import logging
+import multiprocessing
 import smtplib
 import textwrap
-from typing import List, Set
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from typing import Any, List, Set
 
 from asgiref.sync import async_to_sync
 from django.conf import settings
@@ -15,7 +19,7 @@ from django.contrib.auth.tokens import default_token_generator
 from django.contrib.sites.shortcuts import get_current_site
 from django.core import mail
 from django.core.exceptions import ValidationError as DjangoValidationError
-from django.db import transaction
+from django.db import IntegrityError, transaction
 from django.http.request import QueryDict
 from django.utils.encoding import force_bytes, force_text
 from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
@@ -40,15 +44,21 @@ from ..utils.rest_api import (
     status,
 )
 from ..utils.views import APIView
+from ..utils.websocket import notify_user
 from .access_permissions import (
     GroupAccessPermissions,
     PersonalNoteAccessPermissions,
     UserAccessPermissions,
 )
 from .models import Group, PersonalNote, User
-from .serializers import GroupSerializer, PermissionRelatedField
+from .serializers import GroupSerializer, PermissionRelatedField, UserImportSerializer
 
 
+logger = logging.getLogger(__name__)
+
+# Number of users, that are validated and saved together by the mass import.
+user_import_batch_size = 500
+
 # Viewsets for the REST API
 
 
@@ -174,39 +184,113 @@ class UserViewSet(ModelViewSet):
         API endpoint to create multiple users at once.
 
         Example: {"users": [{"first_name": "Max"}, {"first_name": "Maxi"}]}
+
+        The users are validated and saved in batches. The groups and usernames
+        are loaded once for all users. Invalid users are skipped and returned
+        in the list "errors" with their index and importTrackId. If a batch can
+        not be saved, because another request created one of the usernames in
+        the meantime, all users of the batch are returned as errors.
+
+        After each batch, the notify message userImportProgress is sent to the
+        requesting user.
         """
         users = request.data.get("users")
         if not isinstance(users, list):
             raise ValidationError({"detail": "Users has to be a list."})
 
-        created_users = []
+        context = self.get_serializer_context()
+        context["groups"] = Group.objects.exclude(pk=1).in_bulk()
+        context["usernames"] = set(User.objects.values_list("username", flat=True))
+
+        created_user_ids: List[int] = []
         # List of all track ids of all imported users. The track ids are just used in the client.
-        imported_track_ids = []
+        imported_track_ids: List[Any] = []
+        errors = []
+
+        processes = getattr(settings, "USER_IMPORT_PROCESSES", 0)
+        with ExitStack() as stack:
+            executor = None
+            if processes > 1 and len(users) >= user_import_batch_size:
+                # Hash the passwords in other processes. Use new processes
+                # instead of forks of this multithreaded worker.
+                executor = stack.enter_context(
+                    ProcessPoolExecutor(  # type: ignore
+                        processes, mp_context=multiprocessing.get_context("spawn")
+                    )
+                )
+
+            for index in range(0, len(users), user_import_batch_size):
+                users_data = []
+                # Rows and track ids of the valid users of this batch.
+                batch_rows = []
+                for row, user in enumerate(
+                    users[index : index + user_import_batch_size],  # noqa: E203
+                    start=index,
+                ):
+                    serializer = UserImportSerializer(data=user, context=context)
+                    track_id = (
+                        user.get("importTrackId") if isinstance(user, dict) else None
+                    )
+                    if not serializer.is_valid():
+                        # Skip invalid users.
+                        errors.append(
+                            {
+                                "index": row,
+                                "importTrackId": track_id,
+                                "detail": serializer.errors,
+                            }
+                        )
+                        continue
+                    users_data.append(serializer.validated_data)
+                    batch_rows.append((row, track_id))
+
+                try:
+                    # Use a savepoint, so that the other batches are kept.
+                    with transaction.atomic():
+                        user_ids = User.objects.bulk_create_users(users_data, executor)
+                except IntegrityError:
+                    errors.extend(
+                        {
+                            "index": row,
+                            "importTrackId": track_id,
+                            "detail": "Another user with the same username was "
+                            "created at the same time. Please import the user again.",
+                        }
+                        for row, track_id in batch_rows
+                    )
+                else:
+                    created_user_ids.extend(user_ids)
+                    imported_track_ids.extend(
+                        track_id for _, track_id in batch_rows if track_id is not None
+                    )
+
+                    # Inside a request, the autoupdate bundle collects all users,
+                    # so the cache and the history are updated once.
+                    inform_changed_data(
+                        User.objects.get_full_queryset().filter(pk__in=user_ids)
+                    )
+
+                processed = min(index + user_import_batch_size, len(users))
+                logger.info(
+                    f"User import: {processed} of {len(users)} users processed, "
+                    f"{len(errors)} invalid."
+                )
+                async_to_sync(notify_user)(
+                    request.user.pk,
+                    "userImportProgress",
+                    {
+                        "processed": processed,
+                        "total": len(users),
+                        "imported": len(created_user_ids),
+                        "errors": len(errors),
+                    },
+                )
 
-        for user in users:
-            serializer = self.get_serializer(data=user)
-            try:
-                serializer.is_valid(raise_exception=True)
-            except ValidationError:
-                # Skip invalid users.
-                continue
-            data = serializer.prepare_password(serializer.data)
-            groups = data["groups_id"]
-            del data["groups_id"]
-
-            db_user = User(**data)
-            db_user.save(skip_autoupdate=True)
-            db_user.groups.add(*groups)
-            created_users.append(db_user)
-            if "importTrackId" in user:
-                imported_track_ids.append(user["importTrackId"])
-
-        # Now infom all clients and send a response
-        inform_changed_data(created_users)
         return Response(
             {
-                "detail": f"{len(created_users)} users successfully imported.",
+                "detail": f"{len(created_user_ids)} users successfully imported.",
                 "importedTrackIds": imported_track_ids,
+                "errors": errors,
             }
         )
 
@@ -371,12 +455,11 @@ class GroupViewSet(ModelViewSet):
                 signal_results = permission_change.send(
                     None, permissions=new_permissions, action="added"
                 )
-                all_full_data = async_to_sync(element_cache.get_all_full_data)()
                 for __, signal_collections in signal_results:
                     for cachable in signal_collections:
-                        for full_data in all_full_data.get(
-                            cachable.get_collection_string(), {}
-                        ):
+                        for full_data in async_to_sync(
+                            element_cache.get_collection_full_data
+                        )(cachable.get_collection_string()):
                             elements.append(
                                 Element(
                                     id=full_data["id"],
@@ -492,9 +575,12 @@ class WhoAmIDataView(APIView):
 
         # collect all permissions
         permissions: Set[str] = set()
-        group_all_data = async_to_sync(element_cache.get_all_full_data_ordered)()[
-            "users/group"
-        ]
+        group_all_data = {
+            group["id"]: group
+            for group in async_to_sync(element_cache.get_collection_full_data)(
+                "users/group"
+            )
+        }
         for group_id in group_ids:
             permissions.update(group_all_data[group_id]["permissions"])
 
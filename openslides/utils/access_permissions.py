@@ -1,4 +1,4 @@
-from typing import Any, Callable, Dict, List, Set
+from typing import Any, Callable, Dict, List, Optional, Set
 
 from asgiref.sync import async_to_sync
 
@@ -21,6 +21,28 @@ class BaseAccessPermissions:
     If this string is empty, all users can see it.
     """
 
+    user_specific_data: Optional[bool] = None
+    """
+    Set to False, if the restricted data only depends on the permissions and
+    the groups of the user. Users with the same groups can share the
+    restricted data in this case.
+
+    If this is None, it is assumed, that the restricted data is user specific,
+    when get_restricted_data() is overridden.
+    """
+
+    def has_user_specific_data(self) -> bool:
+        """
+        Returns True, if two users with the same groups can get different
+        restricted data.
+        """
+        if self.user_specific_data is not None:
+            return self.user_specific_data
+        return (
+            type(self).get_restricted_data
+            is not BaseAccessPermissions.get_restricted_data
+        )
+
     def check_permissions(self, user_id: int) -> bool:
         """
         Returns True if the user has read access to model instances.
@@ -85,15 +107,15 @@ class RequiredUsers:
         """
         user_ids: Set[int] = set()
 
-        all_full_data = await element_cache.get_all_full_data()
         for collection_string in collection_strings:
             # Get the callable for the collection_string
             get_user_ids = self.callables.get(collection_string)
-            elements = all_full_data.get(collection_string, {})
-            if not (get_user_ids and elements):
-                # if the collection_string is unknown or it has no data, do nothing
+            if not get_user_ids:
+                # if the collection_string is unknown, do nothing
                 continue
 
+            elements = await element_cache.get_collection_full_data(collection_string)
+
             for element in elements:
                 user_ids.update(get_user_ids(element))
 
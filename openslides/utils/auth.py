@@ -1,4 +1,4 @@
-from typing import Dict, List, Union, cast
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Set, Union
 
 from asgiref.sync import async_to_sync
 from django.apps import apps
@@ -8,7 +8,8 @@ from django.contrib.auth.models import AnonymousUser
 from django.core.exceptions import ImproperlyConfigured
 from django.db.models import Model
 
-from .cache import element_cache
+from .cache import LocalElementCache, element_cache
+from .utils import get_element_id, split_element_id
 
 
 GROUP_DEFAULT_PK = 1  # This is the hard coded pk for the default group.
@@ -55,41 +56,9 @@ async def async_has_perm(user_id: int, perm: str) -> bool:
     """
     if not user_id and not await async_anonymous_is_enabled():
         has_perm = False
-    elif not user_id:
-        # Use the permissions from the default group.
-        default_group = await element_cache.get_element_full_data(
-            group_collection_string, GROUP_DEFAULT_PK
-        )
-        if default_group is None:
-            raise RuntimeError("Default Group does not exist.")
-        has_perm = perm in default_group["permissions"]
     else:
-        user_data = await element_cache.get_element_full_data(
-            user_collection_string, user_id
-        )
-        if user_data is None:
-            raise RuntimeError(f"User with id {user_id} does not exist.")
-        if GROUP_ADMIN_PK in user_data["groups_id"]:
-            # User in admin group (pk 2) grants all permissions.
-            has_perm = True
-        else:
-            # Get all groups of the user and then see, if one group has the required
-            # permission. If the user has no groups, then use the default group.
-            group_ids = user_data["groups_id"] or [GROUP_DEFAULT_PK]
-            for group_id in group_ids:
-                group = await element_cache.get_element_full_data(
-                    group_collection_string, group_id
-                )
-                if group is None:
-                    raise RuntimeError(
-                        f"User is in non existing group with id {group_id}."
-                    )
-
-                if perm in group["permissions"]:
-                    has_perm = True
-                    break
-            else:
-                has_perm = False
+        user_permissions = await permission_cache.get_user_permissions(user_id)
+        has_perm = user_permissions.is_admin or perm in user_permissions.permissions
     return has_perm
 
 
@@ -117,31 +86,167 @@ async def async_in_some_groups(user_id: int, groups: List[int]) -> bool:
     """
     if not user_id and not await async_anonymous_is_enabled():
         in_some_groups = False
-    elif not user_id:
-        # Use the permissions from the default group.
-        in_some_groups = GROUP_DEFAULT_PK in groups
     else:
-        user_data = await element_cache.get_element_full_data(
-            user_collection_string, user_id
+        user_permissions = await permission_cache.get_user_permissions(user_id)
+        in_some_groups = (
+            user_permissions.is_admin
+            or not user_permissions.group_ids.isdisjoint(groups)
         )
-        if user_data is None:
-            raise RuntimeError(f"User with id {user_id} does not exist.")
-        if GROUP_ADMIN_PK in user_data["groups_id"]:
-            # User in admin group (pk 2) grants all permissions.
-            in_some_groups = True
-        else:
-            # Get all groups of the user and then see, if one group has the required
-            # permission. If the user has no groups, then use the default group.
-            group_ids = user_data["groups_id"] or [GROUP_DEFAULT_PK]
-            for group_id in group_ids:
-                if group_id in groups:
-                    in_some_groups = True
-                    break
-            else:
-                in_some_groups = False
     return in_some_groups
 
 
+class UserPermissions(NamedTuple):
+    """
+    The effective permissions of one user.
+    """
+
+    is_admin: bool
+    permissions: FrozenSet[str]
+    group_ids: FrozenSet[int]
+
+
+async def calculate_user_permissions(user_id: int) -> UserPermissions:
+    """
+    Calculates the effective permissions of an user from the user and its
+    groups.
+
+    user_id 0 means anonymous user. The anonymous user gets the permissions of
+    the default group.
+    """
+    if not user_id:
+        # Use the permissions from the default group.
+        default_group = await element_cache.get_element_full_data(
+            group_collection_string, GROUP_DEFAULT_PK
+        )
+        if default_group is None:
+            raise RuntimeError("Default Group does not exist.")
+        return UserPermissions(
+            is_admin=False,
+            permissions=frozenset(default_group["permissions"]),
+            group_ids=frozenset([GROUP_DEFAULT_PK]),
+        )
+
+    user_data = await element_cache.get_element_full_data(
+        user_collection_string, user_id
+    )
+    if user_data is None:
+        raise RuntimeError(f"User with id {user_id} does not exist.")
+
+    # Get all groups of the user. If the user has no groups, then use the
+    # default group.
+    group_ids = user_data["groups_id"] or [GROUP_DEFAULT_PK]
+    if GROUP_ADMIN_PK in group_ids:
+        # User in admin group (pk 2) grants all permissions.
+        return UserPermissions(
+            is_admin=True, permissions=frozenset(), group_ids=frozenset(group_ids)
+        )
+
+    groups = await element_cache.get_elements_full_data(
+        get_element_id(group_collection_string, group_id) for group_id in group_ids
+    )
+    permissions: Set[str] = set()
+    for group_id in group_ids:
+        group = groups[get_element_id(group_collection_string, group_id)]
+        if group is None:
+            raise RuntimeError(f"User is in non existing group with id {group_id}.")
+        permissions.update(group["permissions"])
+    return UserPermissions(
+        is_admin=False,
+        permissions=frozenset(permissions),
+        group_ids=frozenset(group_ids),
+    )
+
+
+async def get_permission_fingerprint(user_id: int) -> str:
+    """
+    Returns a string, that is the same for all users with the same groups.
+
+    Two users with the same fingerprint have the same permissions and are in
+    the same groups. The anonymous user and all users in the admin group have
+    their own fingerprints.
+    """
+    if not user_id:
+        return "anonymous"
+    user_permissions = await permission_cache.get_user_permissions(user_id)
+    if user_permissions.is_admin:
+        return "admin"
+    return "groups:" + ",".join(
+        str(group_id) for group_id in sorted(user_permissions.group_ids)
+    )
+
+
+class PermissionCache:
+    """
+    Process local cache for the effective permissions of users.
+
+    The permissions of an user are removed, when the user changes. All
+    permissions are removed, when a group changes.
+
+    The listeners of the local element cache are used to find changed users
+    and groups. They are also informed, if the local element cache keeps no
+    elements.
+    """
+
+    def __init__(self) -> None:
+        self.local_cache: Optional[LocalElementCache] = None
+        self.users: Dict[int, UserPermissions] = {}
+
+        # The generation is increased every time permissions are removed.
+        self.generation = 0
+
+    def clear(self) -> None:
+        self.users = {}
+        self.generation += 1
+
+    def elements_changed(self, element_ids: Optional[List[str]]) -> None:
+        """
+        Listener for the local element cache.
+        """
+        if element_ids is None:
+            self.clear()
+            return
+
+        for element_id in element_ids:
+            collection_string, id = split_element_id(element_id)
+            if collection_string == group_collection_string:
+                self.clear()
+                return
+            if collection_string == user_collection_string:
+                self.users.pop(id, None)
+                self.generation += 1
+
+    async def get_user_permissions(self, user_id: int) -> UserPermissions:
+        """
+        Returns the effective permissions of an user.
+
+        user_id 0 means anonymous user.
+        """
+        local_cache = element_cache.local_cache
+        if local_cache is not self.local_cache:
+            # This is the first call or the local element cache was replaced.
+            self.clear()
+            self.local_cache = local_cache
+            local_cache.add_listener(self.elements_changed)
+
+        # Remove changed users and groups.
+        await element_cache.update_local_cache()
+        try:
+            return self.users[user_id]
+        except KeyError:
+            pass
+
+        generation = self.generation
+        user_permissions = await calculate_user_permissions(user_id)
+        if generation == self.generation:
+            # Only save the permissions if no user or group has changed while
+            # they were calculated.
+            self.users[user_id] = user_permissions
+        return user_permissions
+
+
+permission_cache = PermissionCache()
+
+
 def anonymous_is_enabled() -> bool:
     """
     Returns True if the anonymous user is enabled in the settings.
@@ -157,14 +262,11 @@ async def async_anonymous_is_enabled() -> bool:
     """
     from ..core.config import config
 
-    if config.key_to_id is None:
-        await config.build_key_to_id()
-        config.key_to_id = cast(Dict[str, int], config.key_to_id)
-    element = await element_cache.get_element_full_data(
-        config.get_collection_string(),
-        config.key_to_id["general_system_enable_anonymous"],
-    )
-    return False if element is None else element["value"]
+    try:
+        return await config.async_get("general_system_enable_anonymous")
+    except KeyError:
+        # The config variable is not in the cache.
+        return False
 
 
 AnyUser = Union[Model, int, AnonymousUser, None]
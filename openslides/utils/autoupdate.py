@@ -1,14 +1,17 @@
+import atexit
 import itertools
 import threading
-from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
 
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
+from django.conf import settings
 from django.db.models import Model
 from mypy_extensions import TypedDict
 
 from .cache import element_cache, get_element_id
-from .projector import get_projector_data
+from .projector import get_projector_data, get_projector_payloads
 from .utils import get_model_from_collection_string
 
 
@@ -29,6 +32,9 @@ class Element(ElementBase, total=False):
     if full_data is None, it means, that the element was deleted. If reload is
     True, full_data is ignored and reloaded from the database later in the
     process.
+
+    If patched_change_id is set, full_data is a patch of the full_data of this
+    change_id. If the element was changed after it, it is reloaded.
     """
 
     information: List[str]
@@ -36,6 +42,7 @@ class Element(ElementBase, total=False):
     user_id: Optional[int]
     disable_history: bool
     reload: bool
+    patched_change_id: int
 
 
 AutoupdateFormat = TypedDict(
@@ -98,6 +105,77 @@ def inform_changed_data(
         handle_changed_elements(elements.values())
 
 
+def inform_patched_data(
+    instance: Model,
+    patch: Callable[[Dict[str, Any]], Dict[str, Any]],
+    information: Optional[List[str]] = None,
+    user_id: Optional[int] = None,
+    restricted: bool = False,
+) -> None:
+    """
+    Like inform_changed_data() for one instance, but for changes that touch
+    only a small part of the full_data of the root rest element.
+
+    patch is called with the current full_data and has to return the new
+    full_data. It must not change its argument. The current full_data is
+    taken from the autoupdate bundle or from the element cache. If it is in
+    neither, the full_data is built from the database.
+
+    The patched full_data is only used, if the element was not changed by
+    someone else since it was read from the element cache. Otherwise the
+    full_data is built from the database, like with inform_changed_data().
+    """
+    root_instance = instance.get_root_rest_element()  # type: ignore
+    collection_string = root_instance.get_collection_string()
+    id = root_instance.get_rest_pk()
+    key = collection_string + str(id)
+
+    async def get_full_data() -> Tuple[int, Optional[Dict[str, Any]]]:
+        """
+        Returns the current change_id and the full_data from the element
+        cache. The change_id is read first, so the full_data is at least as
+        new as the change_id.
+        """
+        change_id = await element_cache.get_current_change_id()
+        return (
+            change_id,
+            await element_cache.get_element_full_data(collection_string, id),
+        )
+
+    bundle = autoupdate_bundle.get(threading.get_ident())
+    full_data: Optional[Dict[str, Any]]
+    patched_change_id: Optional[int] = None
+    if bundle is not None and key in bundle:
+        bundle_element = bundle[key]
+        full_data = (
+            None if bundle_element.get("reload") else bundle_element["full_data"]
+        )
+        patched_change_id = bundle_element.get("patched_change_id")
+    else:
+        patched_change_id, full_data = async_to_sync(get_full_data)()
+
+    if full_data is None:
+        inform_changed_data(
+            root_instance,
+            information=information,
+            user_id=user_id,
+            restricted=restricted,
+        )
+        return
+
+    element = Element(
+        id=id,
+        collection_string=collection_string,
+        full_data=patch(full_data),
+        information=information or [],
+        restricted=restricted,
+        user_id=user_id,
+    )
+    if patched_change_id is not None:
+        element["patched_change_id"] = patched_change_id
+    inform_changed_elements([element])
+
+
 def inform_deleted_data(
     deleted_elements: Iterable[Tuple[str, int]],
     information: List[str] = None,
@@ -189,37 +267,38 @@ def handle_changed_elements(elements: Iterable[Element]) -> None:
     Does nothing if elements is empty.
     """
 
-    async def update_cache(elements: Iterable[Element]) -> int:
+    async def update_cache(elements: Iterable[Element]) -> Tuple[int, List[str]]:
         """
         Async helper function to update the cache.
 
-        Returns the change_id
+        Returns the change_id and the element_ids of the patched elements, that
+        were changed by someone else.
         """
         cache_elements: Dict[str, Optional[Dict[str, Any]]] = {}
+        patched_change_ids: Dict[str, int] = {}
         for element in elements:
             element_id = get_element_id(element["collection_string"], element["id"])
             cache_elements[element_id] = element["full_data"]
-        return await element_cache.change_elements(cache_elements)
+            if "patched_change_id" in element:
+                patched_change_ids[element_id] = element["patched_change_id"]
+        return await element_cache.change_elements(cache_elements, patched_change_ids)
 
-    async def async_handle_collection_elements(elements: Iterable[Element]) -> None:
+    async def async_handle_collection_elements(
+        elements: Iterable[Element]
+    ) -> List[str]:
         """
         Async helper function to update cache and send autoupdate.
+
+        Returns the element_ids of the patched elements, that were changed by
+        someone else.
         """
         # Update cache
-        change_id = await update_cache(elements)
+        change_id, conflicts = await update_cache(elements)
 
         # Send autoupdate
-        channel_layer = get_channel_layer()
-        await channel_layer.group_send(
-            "autoupdate", {"type": "send_data", "change_id": change_id}
-        )
-
-        projector_data = await get_projector_data()
-        # Send projector
-        channel_layer = get_channel_layer()
-        await channel_layer.group_send(
-            "projector", {"type": "projector_changed", "data": projector_data}
-        )
+        if not autoupdate_coalescer.add(change_id):
+            await send_autoupdate(change_id, change_id)
+        return conflicts
 
     if elements:
         for element in elements:
@@ -252,10 +331,145 @@ def handle_changed_elements(elements: Iterable[Element]) -> None:
         itertools.chain(elements, history_elements)
 
         # Update cache and send autoupdate using async code.
-        async_to_sync(async_handle_collection_elements)(
+        conflicts = async_to_sync(async_handle_collection_elements)(
             itertools.chain(elements, history_elements)
         )
 
+        if conflicts:
+            # The patches were made on old data. Load the elements from the
+            # database and write them again.
+            handle_changed_elements(
+                [
+                    Element(
+                        id=element["id"],
+                        collection_string=element["collection_string"],
+                        full_data=None,
+                        information=element.get("information", []),
+                        restricted=element.get("restricted", False),
+                        user_id=element.get("user_id"),
+                        reload=True,
+                    )
+                    for element in elements
+                    if get_element_id(element["collection_string"], element["id"])
+                    in conflicts
+                ]
+            )
+
+
+async def send_autoupdate(from_change_id: int, to_change_id: int) -> None:
+    """
+    Informs the consumers about all changes from from_change_id to
+    to_change_id (including) and sends the new projector data.
+    """
+    channel_layer = get_channel_layer()
+    await channel_layer.group_send(
+        "autoupdate",
+        {
+            "type": "send_data",
+            "from_change_id": from_change_id,
+            "change_id": to_change_id,
+        },
+    )
+
+    projector_data = await get_projector_data()
+    # Send projector
+    channel_layer = get_channel_layer()
+    await channel_layer.group_send(
+        "projector",
+        {"type": "projector_changed", "data": get_projector_payloads(projector_data)},
+    )
+
+
+class AutoupdateCoalescer:
+    """
+    Merges the autoupdates of a worker, that happen within a short time.
+
+    The first change_id starts a timer. All change_ids until the timer runs
+    out are sent as one autoupdate with one projector update. If the delay is
+    0, every change_id is sent directly.
+
+    The added latency and the number of saved messages are counted.
+    """
+
+    def __init__(self, delay: float) -> None:
+        """
+        The delay is given in seconds.
+        """
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.from_change_id: Optional[int] = None
+        self.to_change_id = 0
+        self.first_change = 0.0
+        self.timer: Optional[threading.Timer] = None
+
+        self.messages_sent = 0
+        self.messages_saved = 0
+        self.added_latency = 0.0
+        self.max_added_latency = 0.0
+
+    def add(self, change_id: int) -> bool:
+        """
+        Schedules the autoupdate for the change_id.
+
+        Returns False, if the autoupdate has to be sent directly by the caller.
+        """
+        if self.delay <= 0:
+            self.messages_sent += 1
+            return False
+
+        with self.lock:
+            if self.from_change_id is None:
+                self.from_change_id = self.to_change_id = change_id
+                self.first_change = time.monotonic()
+                self.timer = threading.Timer(self.delay, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+            else:
+                self.from_change_id = min(self.from_change_id, change_id)
+                self.to_change_id = max(self.to_change_id, change_id)
+                self.messages_saved += 1
+        return True
+
+    def flush(self) -> None:
+        """
+        Sends the scheduled autoupdate. Does nothing, if there is none.
+        """
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            from_change_id = self.from_change_id
+            to_change_id = self.to_change_id
+            self.from_change_id = None
+            if from_change_id is None:
+                return
+            latency = time.monotonic() - self.first_change
+            self.messages_sent += 1
+            self.added_latency += latency
+            self.max_added_latency = max(self.max_added_latency, latency)
+
+        async_to_sync(send_autoupdate)(from_change_id, to_change_id)
+
+    def get_statistics(self) -> Dict[str, Union[int, float]]:
+        """
+        Returns the counters of the coalescer.
+        """
+        return {
+            "messages_sent": self.messages_sent,
+            "messages_saved": self.messages_saved,
+            "added_latency": self.added_latency,
+            "max_added_latency": self.max_added_latency,
+        }
+
+
+autoupdate_coalescer = AutoupdateCoalescer(
+    getattr(settings, "AUTOUPDATE_DELAY", 0) / 1000
+)
+
+# The timer thread is a daemon, so send the scheduled autoupdate before the
+# process ends.
+atexit.register(autoupdate_coalescer.flush)
+
 
 def save_history(elements: Iterable[Element]) -> Iterable:
     # TODO: Try to write Iterable[History] here
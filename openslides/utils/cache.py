@@ -1,24 +1,146 @@
 import asyncio
-import json
-from collections import defaultdict
+import logging
+import threading
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from time import sleep
-from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+from time import monotonic
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+)
 
 from asgiref.sync import async_to_sync
 from django.conf import settings
+from django.db import connections
 
 from .cache_providers import (
     Cachable,
     ElementCacheProvider,
+    LockLostError,
     MemmoryCacheProvider,
     RedisCacheProvider,
+    RedisCollectionCacheProvider,
     get_all_cachables,
 )
+from .json_codec import json_dumps, json_loads
 from .redis import use_redis
 from .utils import get_element_id, split_element_id
 
 
+logger = logging.getLogger(__name__)
+
+
+class LocalElementCache:
+    """
+    Process local cache for decoded elements of the full_data cache.
+
+    The elements are saved as python objects, so they do not have to be loaded
+    from the cache provider and decoded again. The elements must not be
+    changed by the caller.
+
+    The size of the cache is limited. If it is full, the least recently used
+    element is removed. With a size of 0, no elements are saved, but the
+    changes are still detected and the listeners are informed.
+
+    The local cache knows the change_id it is valid for. ElementCache uses the
+    change_id sorted set to find out, which elements have changed since then
+    and removes them.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.listeners: List[Callable[[Optional[List[str]]], None]] = []
+        self.clear()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def clear(self) -> None:
+        """
+        Removes all elements. The change_id is unknown afterwards.
+        """
+        with self.lock:
+            self.elements: "OrderedDict[str, Optional[Dict[str, Any]]]" = OrderedDict()
+            self.change_id: Optional[int] = None
+
+            # The generation is increased every time elements are removed. It is
+            # used to prevent saving elements that were loaded before they were
+            # changed.
+            self.generation = getattr(self, "generation", 0) + 1
+        self.inform_listeners(None)
+
+    def get_many(
+        self, element_ids: List[str]
+    ) -> Tuple[Dict[str, Optional[Dict[str, Any]]], List[str]]:
+        """
+        Returns the known elements as dict and a list of the missing element_ids.
+        """
+        found: Dict[str, Optional[Dict[str, Any]]] = {}
+        missing: List[str] = []
+        with self.lock:
+            for element_id in element_ids:
+                try:
+                    found[element_id] = self.elements[element_id]
+                except KeyError:
+                    missing.append(element_id)
+                else:
+                    self.elements.move_to_end(element_id)
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def set_many(
+        self, elements: Dict[str, Optional[Dict[str, Any]]], generation: int
+    ) -> None:
+        """
+        Saves elements.
+
+        generation has to be the value of self.generation before the elements
+        were loaded. If elements were removed in the meantime, nothing is saved.
+        """
+        with self.lock:
+            if generation != self.generation:
+                return
+            self.elements.update(elements)
+            while len(self.elements) > self.max_size:
+                self.elements.popitem(last=False)
+
+    def invalidate(self, element_ids: List[str]) -> None:
+        """
+        Removes some elements.
+        """
+        with self.lock:
+            self.generation += 1
+            for element_id in element_ids:
+                if self.elements.pop(element_id, None) is not None:
+                    self.invalidations += 1
+        self.inform_listeners(element_ids)
+
+    def add_listener(self, listener: Callable[[Optional[List[str]]], None]) -> None:
+        """
+        Adds a callable that is called every time elements are removed.
+
+        It is called with the list of the removed element_ids or with None, if
+        all elements are removed. It can be used to invalidate other data, that
+        was calculated from the elements.
+        """
+        self.listeners.append(listener)
+
+    def inform_listeners(self, element_ids: Optional[List[str]]) -> None:
+        for listener in self.listeners:
+            listener(element_ids)
+
+
 class ElementCache:
     """
     Cache for the elements.
@@ -50,14 +172,39 @@ class ElementCache:
         cache_provider_class: Type[ElementCacheProvider] = RedisCacheProvider,
         cachable_provider: Callable[[], List[Cachable]] = get_all_cachables,
         start_time: int = None,
+        local_cache_size: int = 0,
+        chunk_size: int = 1000,
+        build_threads: int = 0,
+        lock_ttl: float = 30,
+        max_changed_elements: int = 0,
     ) -> None:
         """
         Initializes the cache.
 
         When restricted_data_cache is false, no restricted data is saved.
+
+        When local_cache_size is greater then 0, up to this number of decoded
+        elements of the full_data are kept in the memory of this process. The
+        local cache is used to detect changes in any case.
+
+        chunk_size is the number of elements, that are loaded and written
+        together when the cache is built. If build_threads is greater then 1,
+        up to this number of collections are loaded at the same time.
+
+        lock_ttl is the number of seconds after that a lock of a crashed worker
+        expires.
+
+        max_changed_elements is the number of changed elements, that are saved
+        with their change_id. Clients with an older change_id get all data. 0
+        saves all changes.
         """
         self.use_restricted_data_cache = use_restricted_data_cache
+        self.chunk_size = chunk_size
+        self.build_threads = build_threads
+        self.lock_ttl = lock_ttl
+        self.max_changed_elements = max_changed_elements
         self.cache_provider = cache_provider_class()
+        self.local_cache = LocalElementCache(local_cache_size)
         self.cachable_provider = cachable_provider
         self._cachables: Optional[Dict[str, Cachable]] = None
 
@@ -72,6 +219,13 @@ class ElementCache:
         # Tells if self.ensure_cache was called.
         self.ensured = False
 
+        # Restricted data that is shared between users with the same groups.
+        # See restrict_collection().
+        self.restricted_data_memo: Dict[
+            Tuple[str, str, int], Tuple[Dict[str, str], List[str]]
+        ] = {}
+        self.restricted_data_memo_change_id: Optional[int] = None
+
     @property
     def cachables(self) -> Dict[str, Cachable]:
         """
@@ -96,39 +250,196 @@ class ElementCache:
         cache_exists = async_to_sync(self.cache_provider.data_exists)()
 
         if reset or not cache_exists:
-            lock_name = "ensure_cache"
-            # Set a lock so only one process builds the cache
-            if async_to_sync(self.cache_provider.set_lock)(lock_name):
-                try:
-                    mapping = {}
-                    for collection_string, cachable in self.cachables.items():
-                        for element in cachable.get_elements():
-                            mapping.update(
-                                {
-                                    get_element_id(
-                                        collection_string, element["id"]
-                                    ): json.dumps(element)
-                                }
-                            )
-                    async_to_sync(self.cache_provider.reset_full_cache)(mapping)
-                finally:
-                    async_to_sync(self.cache_provider.del_lock)(lock_name)
-            else:
-                while async_to_sync(self.cache_provider.get_lock)(lock_name):
-                    sleep(0.01)
+            # Only one process builds the cache
+            built = async_to_sync(self.run_locked)(
+                "ensure_cache", self.build_full_cache
+            )
+            if built:
+                self.local_cache.clear()
 
         self.ensured = True
 
+    async def run_locked(
+        self,
+        lock_name: str,
+        func: Callable[[int], Awaitable[None]],
+        retry: bool = False,
+    ) -> bool:
+        """
+        Calls func with the token of the lock lock_name while holding the lock.
+
+        The lock expires after lock_ttl seconds, so a crashed worker does not
+        hold it forever. While func is running, the lock is renewed. func has
+        to pass the token to the write methods of the cache provider. They
+        raise LockLostError, if the lock expired and someone else holds it.
+
+        If the lock is hold by someone else, this method waits until the lock
+        is released. Then func is not called, if retry is False. If retry is
+        True, the lock is set again and func is called afterwards. Use it, if
+        func finds out itself, what is left to do. This is also done, if the
+        lock was lost while func was running.
+
+        Returns True, if func was called and finished with the lock.
+        """
+        while True:
+            token = await self.cache_provider.set_lock(lock_name, self.lock_ttl)
+            if not token:
+                await self.cache_provider.wait_for_lock(lock_name)
+                if not retry:
+                    return False
+                continue
+
+            renewal = asyncio.ensure_future(self.renew_lock(lock_name, token))
+            try:
+                await func(token)
+                return True
+            except LockLostError:
+                logger.warning(
+                    f"The lock {lock_name} was lost. The changes were not written."
+                )
+                if not retry:
+                    return False
+            finally:
+                renewal.cancel()
+                await self.cache_provider.del_lock(lock_name, token)
+
+    async def renew_lock(self, lock_name: str, token: int) -> None:
+        """
+        Renews the lock until the task is canceled.
+        """
+        while True:
+            await asyncio.sleep(self.lock_ttl / 3)
+            if not await self.cache_provider.renew_lock(
+                lock_name, token, self.lock_ttl
+            ):
+                logger.warning(f"The lock {lock_name} expired while it was used.")
+                return
+
+    async def build_full_cache(self, token: int = 0) -> None:
+        """
+        Loads all elements from the cachables and replaces the full_data cache.
+
+        The elements are loaded, encoded and written in chunks. So the memory
+        usage does not depend on the number of elements. The old data is
+        replaced, when all elements are written.
+
+        If build_threads is greater then 1, the collections are loaded in a
+        thread pool, each thread with its own database connection. Otherwise
+        the cachables are read in the thread of the event loop. Only call this
+        method from ensure_cache(). The data is only written, if the lock
+        ensure_cache is hold with the token.
+        """
+        start = monotonic()
+        await self.cache_provider.begin_full_cache_reset("ensure_cache", token)
+        if self.build_threads > 1:
+            loop = asyncio.get_event_loop()
+            with ThreadPoolExecutor(max_workers=self.build_threads) as executor:
+                timings = await asyncio.gather(
+                    *(
+                        loop.run_in_executor(
+                            executor,
+                            self.build_collection_in_thread,
+                            loop,
+                            collection_string,
+                            cachable,
+                            token,
+                        )
+                        for collection_string, cachable in self.cachables.items()
+                    )
+                )
+        else:
+            timings = []
+            for collection_string, cachable in self.cachables.items():
+                collection_start = monotonic()
+                element_count = 0
+                for chunk in self.get_encoded_chunks(collection_string, cachable):
+                    await self.cache_provider.add_full_cache_chunk(
+                        chunk, "ensure_cache", token
+                    )
+                    element_count += len(chunk)
+                timings.append(
+                    (collection_string, element_count, monotonic() - collection_start)
+                )
+        await self.cache_provider.finish_full_cache_reset("ensure_cache", token)
+
+        for collection_string, element_count, seconds in sorted(
+            timings, key=lambda timing: timing[2], reverse=True
+        ):
+            logger.info(
+                f"Build cache: {element_count} elements of {collection_string} "
+                f"in {seconds:.1f} seconds"
+            )
+        logger.info(
+            f"Build cache: Done with {sum(timing[1] for timing in timings)} elements "
+            f"in {monotonic() - start:.1f} seconds"
+        )
+
+    def get_encoded_chunks(
+        self, collection_string: str, cachable: Cachable
+    ) -> Iterator[Dict[str, str]]:
+        """
+        Returns the encoded elements of a cachable in chunks. The keys of each
+        chunk are the element_ids.
+        """
+        element_count = 0
+        for elements in get_element_chunks(cachable, self.chunk_size):
+            element_count += len(elements)
+            logger.debug(
+                f"Build cache: {element_count} elements of {collection_string}"
+            )
+            yield {
+                get_element_id(collection_string, element["id"]): json_dumps(element)
+                for element in elements
+            }
+
+    def build_collection_in_thread(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        collection_string: str,
+        cachable: Cachable,
+        token: int = 0,
+    ) -> Tuple[str, int, float]:
+        """
+        Loads the elements of one cachable and writes them to the cache using
+        the event loop.
+
+        Is called in a thread of the thread pool of build_full_cache(). Returns
+        the collection_string, the number of elements and the needed seconds.
+        """
+        start = monotonic()
+        element_count = 0
+        try:
+            for chunk in self.get_encoded_chunks(collection_string, cachable):
+                asyncio.run_coroutine_threadsafe(
+                    self.cache_provider.add_full_cache_chunk(
+                        chunk, "ensure_cache", token
+                    ),
+                    loop,
+                ).result()
+                element_count += len(chunk)
+        finally:
+            # Close the database connection of this thread.
+            connections.close_all()
+        return collection_string, element_count, monotonic() - start
+
     async def change_elements(
-        self, elements: Dict[str, Optional[Dict[str, Any]]]
-    ) -> int:
+        self,
+        elements: Dict[str, Optional[Dict[str, Any]]],
+        patched_change_ids: Optional[Dict[str, int]] = None,
+    ) -> Tuple[int, List[str]]:
         """
         Changes elements in the cache.
 
         elements is a list of the changed elements as dict. When the value is None,
         it is interpreded as deleted. The key has to be an element_id.
 
-        Returns the new generated change_id.
+        patched_change_ids is a dict from element_ids to the change_ids of the
+        full_data the elements were patched on. See inform_patched_data().
+
+        Returns the new generated change_id and the element_ids of the patched
+        elements, that were changed after their change_id by someone else.
+        Their data is written anyway. The caller has to write them again with
+        data from the database.
         """
         if not self.ensured:
             raise RuntimeError(
@@ -141,7 +452,7 @@ class ElementCache:
             if data:
                 # The arguments for redis.hset is pairs of key value
                 changed_elements.append(element_id)
-                changed_elements.append(json.dumps(data))
+                changed_elements.append(json_dumps(data))
             else:
                 deleted_elements.append(element_id)
 
@@ -150,9 +461,16 @@ class ElementCache:
         if deleted_elements:
             await self.cache_provider.del_elements(deleted_elements)
 
-        return await self.cache_provider.add_changed_elements(
-            self.start_time + 1, elements.keys()
+        change_id, conflicts = await self.cache_provider.add_changed_elements(
+            self.start_time + 1,
+            elements.keys(),
+            self.max_changed_elements,
+            patched_change_ids,
         )
+        # Remove the elements in this process directly. Other processes
+        # remove them when they update their local cache.
+        self.local_cache.invalidate(list(elements.keys()))
+        return change_id, conflicts
 
     async def get_all_full_data(self) -> Dict[str, List[Dict[str, Any]]]:
         """
@@ -177,9 +495,18 @@ class ElementCache:
         full_data = await self.cache_provider.get_all_data()
         for element_id, data in full_data.items():
             collection_string, id = split_element_id(element_id)
-            out[collection_string][id] = json.loads(data.decode())
+            out[collection_string][id] = json_loads(data)
         return dict(out)
 
+    async def get_collection_full_data(
+        self, collection_string: str
+    ) -> List[Dict[str, Any]]:
+        """
+        Returns the full_data of all elements of one collection.
+        """
+        full_data = await self.cache_provider.get_collection_data(collection_string)
+        return [json_loads(element) for element in full_data.values()]
+
     async def get_full_data(
         self, change_id: int = 0, max_change_id: int = -1
     ) -> Tuple[Dict[str, List[Dict[str, Any]]], List[str]]:
@@ -218,7 +545,7 @@ class ElementCache:
         )
         return (
             {
-                collection_string: [json.loads(value.decode()) for value in value_list]
+                collection_string: [json_loads(value) for value in value_list]
                 for collection_string, value_list in raw_changed_elements.items()
             },
             deleted_elements,
@@ -232,13 +559,74 @@ class ElementCache:
 
         Returns None if the element does not exist.
         """
-        element = await self.cache_provider.get_element(
-            get_element_id(collection_string, id)
-        )
+        element_id = get_element_id(collection_string, id)
+        if self.local_cache.max_size:
+            return (await self.get_elements_full_data([element_id]))[element_id]
+
+        element = await self.cache_provider.get_element(element_id)
 
         if element is None:
             return None
-        return json.loads(element.decode())
+        return json_loads(element)
+
+    async def get_elements_full_data(
+        self, element_ids: Iterable[str]
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Returns many elements as full data with only one request to the cache.
+
+        element_ids has to be an iterable of element_ids. The returned value is a
+        dict from the element_id to the full_data. The value is None, if the
+        element does not exist.
+        """
+        element_ids = list(element_ids)
+        if not self.local_cache.max_size:
+            missing_element_ids = element_ids
+            out: Dict[str, Optional[Dict[str, Any]]] = {}
+        else:
+            await self.update_local_cache()
+            out, missing_element_ids = self.local_cache.get_many(element_ids)
+            generation = self.local_cache.generation
+
+        if missing_element_ids:
+            elements = await self.cache_provider.get_elements(missing_element_ids)
+            loaded = {
+                element_id: None if element is None else json_loads(element)
+                for element_id, element in zip(missing_element_ids, elements)
+            }
+            if self.local_cache.max_size:
+                self.local_cache.set_many(loaded, generation)
+            out.update(loaded)
+        return out
+
+    async def update_local_cache(self) -> None:
+        """
+        Removes all elements from the local cache, that have changed since the
+        local cache was updated the last time.
+
+        If the changes can not be detected, for example because the change_ids
+        were reset, the whole local cache is cleared.
+        """
+        local_change_id = self.local_cache.change_id
+        (
+            current_change_id,
+            lowest_change_id,
+            element_ids,
+        ) = await self.cache_provider.get_changed_element_ids(local_change_id or 0)
+        current_change_id = current_change_id or 0
+
+        if local_change_id is None:
+            # The local cache is empty or was cleared.
+            self.local_cache.change_id = current_change_id
+        elif current_change_id < local_change_id or (
+            lowest_change_id is not None and lowest_change_id > local_change_id + 1
+        ):
+            # The change_ids are reset or some change_ids are unknown.
+            self.local_cache.clear()
+            self.local_cache.change_id = current_change_id
+        elif current_change_id > local_change_id:
+            self.local_cache.invalidate(element_ids)
+            self.local_cache.change_id = current_change_id
 
     async def exists_restricted_data(self, user_id: int) -> bool:
         """
@@ -272,63 +660,120 @@ class ElementCache:
                 "Call element_cache.ensure_cache before updating restricted data."
             )
 
-        # Try to write a special key.
-        # If this succeeds, there is noone else currently updating the cache.
-        # TODO: Make a timeout. Else this could block forever
+        # Only one worker updates the restricted data of an user. The others
+        # wait until it is done and then write the changes, that are still
+        # missing. The other worker could have started before the last change.
+        await self.run_locked(
+            f"restricted_data_{user_id}",
+            lambda token: self.write_restricted_data(user_id, token),
+            retry=True,
+        )
+
+    async def write_restricted_data(self, user_id: int, token: int = 0) -> None:
+        """
+        Writes the restricted data for an user, that changed since the last
+        update.
+
+        Has to be called with the lock restricted_data_{user_id}. The data is
+        only written, if the lock is hold with the token.
+        """
         lock_name = f"restricted_data_{user_id}"
-        if await self.cache_provider.set_lock(lock_name):
-            # Get change_id for this user
-            value = await self.cache_provider.get_change_id_user(user_id)
-            # If the change id is not in the cache yet, use -1 to get all data since 0
-            user_change_id = int(value) if value else -1
-            change_id = await self.get_current_change_id()
-            if change_id > user_change_id:
-                try:
-                    full_data_elements, deleted_elements = await self.get_full_data(
-                        user_change_id + 1
-                    )
-                except RuntimeError:
-                    # The user_change_id is lower then the lowest change_id in the cache.
-                    # The whole restricted_data for that user has to be recreated.
-                    full_data_elements = await self.get_all_full_data()
-                    deleted_elements = []
-                    await self.cache_provider.del_restricted_data(user_id)
-
-                mapping = {}
-                for collection_string, full_data in full_data_elements.items():
-                    restricter = self.cachables[collection_string].restrict_elements
-                    restricted_elements = await restricter(user_id, full_data)
-
-                    # find all elements the user can not see at all
-                    full_data_ids = set(element["id"] for element in full_data)
-                    restricted_data_ids = set(
-                        element["id"] for element in restricted_elements
-                    )
-                    for item_id in full_data_ids - restricted_data_ids:
-                        deleted_elements.append(
-                            get_element_id(collection_string, item_id)
-                        )
+        # Get change_id for this user
+        value = await self.cache_provider.get_change_id_user(user_id)
+        # If the change id is not in the cache yet, use -1 to get all data since 0
+        user_change_id = int(value) if value else -1
+        change_id = await self.get_current_change_id()
+        if change_id > user_change_id:
+            from_change_id = user_change_id + 1
+            try:
+                full_data_elements, deleted_elements = await self.get_full_data(
+                    from_change_id
+                )
+            except RuntimeError:
+                # The user_change_id is lower then the lowest change_id in the cache.
+                # The whole restricted_data for that user has to be recreated.
+                full_data_elements = await self.get_all_full_data()
+                deleted_elements = []
+                from_change_id = 0
+                await self.cache_provider.del_restricted_data(user_id, lock_name, token)
+
+            mapping = {}
+            for collection_string, full_data in full_data_elements.items():
+                (
+                    collection_mapping,
+                    collection_deleted_elements,
+                ) = await self.restrict_collection(
+                    user_id, collection_string, full_data, from_change_id, change_id
+                )
+                mapping.update(collection_mapping)
+                deleted_elements.extend(collection_deleted_elements)
+            # Remove deleted elements first. The change_id is written last, so
+            # the next worker starts again, if the lock is lost in between.
+            if deleted_elements:
+                await self.cache_provider.del_elements(
+                    deleted_elements, user_id, lock_name, token
+                )
+            mapping["_config:change_id"] = str(change_id)
+            await self.cache_provider.update_restricted_data(
+                user_id, mapping, lock_name, token
+            )
 
-                    for element in restricted_elements:
-                        # The user can see the element
-                        mapping.update(
-                            {
-                                get_element_id(
-                                    collection_string, element["id"]
-                                ): json.dumps(element)
-                            }
-                        )
-                mapping["_config:change_id"] = str(change_id)
-                await self.cache_provider.update_restricted_data(user_id, mapping)
-                # Remove deleted elements
-                if deleted_elements:
-                    await self.cache_provider.del_elements(deleted_elements, user_id)
-            # Unset the lock
-            await self.cache_provider.del_lock(lock_name)
-        else:
-            # Wait until the update if finshed
-            while await self.cache_provider.get_lock(lock_name):
-                await asyncio.sleep(0.01)
+    async def restrict_collection(
+        self,
+        user_id: int,
+        collection_string: str,
+        full_data: List[Dict[str, Any]],
+        from_change_id: int,
+        change_id: int,
+    ) -> Tuple[Dict[str, str], List[str]]:
+        """
+        Restricts the changed elements of one collection for an user.
+
+        Returns a dict from element_ids to the encoded restricted elements and a
+        list of element_ids the user can not see.
+
+        If the restricted data of the collection only depends on the groups of
+        the user, the result is shared between all users with the same groups
+        and the same change_ids.
+        """
+        from .auth import get_permission_fingerprint
+
+        cachable = self.cachables[collection_string]
+        memo_key: Optional[Tuple[str, str, int]] = None
+        if not has_user_specific_restricted_data(cachable):
+            if self.restricted_data_memo_change_id != change_id:
+                # Only keep the results for the newest change_id.
+                self.restricted_data_memo = {}
+                self.restricted_data_memo_change_id = change_id
+            memo_key = (
+                await get_permission_fingerprint(user_id),
+                collection_string,
+                from_change_id,
+            )
+            try:
+                return self.restricted_data_memo[memo_key]
+            except KeyError:
+                pass
+
+        restricted_elements = await cachable.restrict_elements(user_id, full_data)
+
+        # find all elements the user can not see at all
+        full_data_ids = set(element["id"] for element in full_data)
+        restricted_data_ids = set(element["id"] for element in restricted_elements)
+        deleted_elements = [
+            get_element_id(collection_string, item_id)
+            for item_id in full_data_ids - restricted_data_ids
+        ]
+
+        # The user can see the elements
+        mapping = {
+            get_element_id(collection_string, element["id"]): json_dumps(element)
+            for element in restricted_elements
+        }
+
+        if memo_key is not None and self.restricted_data_memo_change_id == change_id:
+            self.restricted_data_memo[memo_key] = (mapping, deleted_elements)
+        return mapping, deleted_elements
 
     async def get_all_restricted_data(
         self, user_id: int
@@ -354,9 +799,29 @@ class ElementCache:
             if element_id.decode().startswith("_config"):
                 continue
             collection_string, __ = split_element_id(element_id)
-            out[collection_string].append(json.loads(data.decode()))
+            out[collection_string].append(json_loads(data))
         return dict(out)
 
+    async def get_collection_restricted_data(
+        self, user_id: int, collection_string: str
+    ) -> List[Dict[str, Any]]:
+        """
+        Like get_collection_full_data but with restricted_data for an user.
+
+        Only the elements of the collection are loaded and decoded.
+        """
+        if not self.use_restricted_data_cache:
+            full_data = await self.get_collection_full_data(collection_string)
+            restricter = self.cachables[collection_string].restrict_elements
+            return await restricter(user_id, full_data)
+
+        await self.update_restricted_data(user_id)
+
+        restricted_data = await self.cache_provider.get_collection_data(
+            collection_string, user_id
+        )
+        return [json_loads(element) for element in restricted_data.values()]
+
     async def get_restricted_data(
         self, user_id: int, change_id: int = 0, max_change_id: int = -1
     ) -> Tuple[Dict[str, List[Dict[str, Any]]], List[str]]:
@@ -396,7 +861,7 @@ class ElementCache:
         )
         return (
             {
-                collection_string: [json.loads(value.decode()) for value in value_list]
+                collection_string: [json_loads(value) for value in value_list]
                 for collection_string, value_list in raw_changed_elements.items()
             },
             deleted_elements,
@@ -423,7 +888,7 @@ class ElementCache:
         out = await self.cache_provider.get_element(
             get_element_id(collection_string, id), user_id
         )
-        return json.loads(out.decode()) if out else None
+        return json_loads(out) if out else None
 
     async def get_current_change_id(self) -> int:
         """
@@ -450,18 +915,59 @@ class ElementCache:
         return value
 
 
+def has_user_specific_restricted_data(cachable: Cachable) -> bool:
+    """
+    Returns True, if two users with the same groups can get different restricted
+    data from the cachable.
+
+    Cachables that do not implement has_user_specific_restricted_data() are
+    treated as user specific.
+    """
+    try:
+        method = cachable.has_user_specific_restricted_data  # type: ignore
+    except AttributeError:
+        return True
+    return method()
+
+
+def get_element_chunks(
+    cachable: Cachable, chunk_size: int
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Returns the elements of a cachable in lists of up to chunk_size elements.
+
+    Uses the method get_elements_chunked() of the cachable, if it exists.
+    Otherwise all elements are loaded with get_elements() and then split.
+    """
+    try:
+        get_elements_chunked = cachable.get_elements_chunked  # type: ignore
+    except AttributeError:
+        elements = cachable.get_elements()
+        for index in range(0, len(elements), chunk_size):
+            yield elements[index : index + chunk_size]  # noqa: E203
+    else:
+        yield from get_elements_chunked(chunk_size)
+
+
 def load_element_cache(restricted_data: bool = True) -> ElementCache:
     """
     Generates an element cache instance.
     """
     if use_redis:
-        cache_provider_class: Type[ElementCacheProvider] = RedisCacheProvider
+        cache_provider_class: Type[ElementCacheProvider] = RedisCollectionCacheProvider
+        if not getattr(settings, "REDIS_CACHE_PER_COLLECTION", True):
+            cache_provider_class = RedisCacheProvider
     else:
         cache_provider_class = MemmoryCacheProvider
 
     return ElementCache(
         cache_provider_class=cache_provider_class,
         use_restricted_data_cache=restricted_data,
+        local_cache_size=getattr(settings, "LOCAL_ELEMENT_CACHE_SIZE", 10000),
+        build_threads=getattr(settings, "ELEMENT_CACHE_BUILD_THREADS", 0),
+        max_changed_elements=getattr(
+            settings, "ELEMENT_CACHE_MAX_CHANGED_ELEMENTS", 100_000
+        ),
     )
 
 
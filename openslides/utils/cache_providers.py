@@ -1,4 +1,7 @@
+import asyncio
+from bisect import bisect_left, bisect_right, insort
 from collections import defaultdict
+from time import monotonic
 from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
 from django.apps import apps
@@ -9,7 +12,17 @@ from .utils import split_element_id, str_dict_to_bytes
 
 
 if use_redis:
-    from .redis import get_connection, aioredis
+    from .redis import ChannelListener, get_connection, aioredis
+
+
+class LockLostError(Exception):
+    """
+    Raised by the write methods of the cache providers, when the lock that
+    was given with its token is not hold with this token anymore.
+
+    The token is used as a fencing token. A worker whose lock expired can not
+    overwrite the data of the worker that holds the lock now.
+    """
 
 
 class ElementCacheProvider(Protocol):
@@ -25,6 +38,19 @@ class ElementCacheProvider(Protocol):
     async def reset_full_cache(self, data: Dict[str, str]) -> None:
         ...
 
+    async def begin_full_cache_reset(self, lock_name: str = "", token: int = 0) -> None:
+        ...
+
+    async def add_full_cache_chunk(
+        self, data: Dict[str, str], lock_name: str = "", token: int = 0
+    ) -> None:
+        ...
+
+    async def finish_full_cache_reset(
+        self, lock_name: str = "", token: int = 0
+    ) -> None:
+        ...
+
     async def data_exists(self, user_id: Optional[int] = None) -> bool:
         ...
 
@@ -32,18 +58,31 @@ class ElementCacheProvider(Protocol):
         ...
 
     async def del_elements(
-        self, elements: List[str], user_id: Optional[int] = None
+        self,
+        elements: List[str],
+        user_id: Optional[int] = None,
+        lock_name: str = "",
+        token: int = 0,
     ) -> None:
         ...
 
     async def add_changed_elements(
-        self, default_change_id: int, element_ids: Iterable[str]
-    ) -> int:
+        self,
+        default_change_id: int,
+        element_ids: Iterable[str],
+        max_changed_elements: int = 0,
+        patched_change_ids: Optional[Dict[str, int]] = None,
+    ) -> Tuple[int, List[str]]:
         ...
 
     async def get_all_data(self, user_id: Optional[int] = None) -> Dict[bytes, bytes]:
         ...
 
+    async def get_collection_data(
+        self, collection_string: str, user_id: Optional[int] = None
+    ) -> Dict[bytes, bytes]:
+        ...
+
     async def get_data_since(
         self, change_id: int, user_id: Optional[int] = None, max_change_id: int = -1
     ) -> Tuple[Dict[str, List[bytes]], List[str]]:
@@ -54,22 +93,42 @@ class ElementCacheProvider(Protocol):
     ) -> Optional[bytes]:
         ...
 
-    async def del_restricted_data(self, user_id: int) -> None:
+    async def get_elements(
+        self, element_ids: List[str], user_id: Optional[int] = None
+    ) -> List[Optional[bytes]]:
+        ...
+
+    async def get_changed_element_ids(
+        self, change_id: int
+    ) -> Tuple[Optional[int], Optional[int], List[str]]:
+        ...
+
+    async def del_restricted_data(
+        self, user_id: int, lock_name: str = "", token: int = 0
+    ) -> None:
         ...
 
-    async def set_lock(self, lock_name: str) -> bool:
+    async def set_lock(self, lock_name: str, ttl: float = 30) -> int:
         ...
 
     async def get_lock(self, lock_name: str) -> bool:
         ...
 
-    async def del_lock(self, lock_name: str) -> None:
+    async def renew_lock(self, lock_name: str, token: int, ttl: float = 30) -> bool:
+        ...
+
+    async def del_lock(self, lock_name: str, token: int = 0) -> None:
+        ...
+
+    async def wait_for_lock(self, lock_name: str) -> None:
         ...
 
     async def get_change_id_user(self, user_id: int) -> Optional[int]:
         ...
 
-    async def update_restricted_data(self, user_id: int, data: Dict[str, str]) -> None:
+    async def update_restricted_data(
+        self, user_id: int, data: Dict[str, str], lock_name: str = "", token: int = 0
+    ) -> None:
         ...
 
     async def get_current_change_id(self) -> List[Tuple[str, int]]:
@@ -92,14 +151,39 @@ class RedisCacheProvider:
     def get_full_data_cache_key(self) -> str:
         return "".join((self.prefix, self.full_data_cache_key))
 
+    def get_tmp_full_data_cache_key(self) -> str:
+        return "".join((self.prefix, "tmp_", self.full_data_cache_key))
+
     def get_restricted_data_cache_key(self, user_id: int) -> str:
         return "".join(
             (self.prefix, self.restricted_user_cache_key.format(user_id=user_id))
         )
 
+    def get_restricted_data_cache_key_pattern(self) -> str:
+        """
+        Returns the pattern of the keys of the restricted_data of all users.
+        """
+        return "".join(
+            (self.prefix, self.restricted_user_cache_key.format(user_id="*"))
+        )
+
     def get_change_id_cache_key(self) -> str:
         return "".join((self.prefix, self.change_id_cache_key))
 
+    def get_lock_key(self, lock_name: str) -> str:
+        return f"{self.prefix}lock_{lock_name}"
+
+    def get_lock_listener(self) -> "ChannelListener":
+        """
+        Returns the listener for the channel, where released locks are
+        published.
+        """
+        listener = lock_listeners.get(self.prefix)
+        if listener is None:
+            listener = ChannelListener(f"{self.prefix}lock_released")
+            lock_listeners[self.prefix] = listener
+        return listener
+
     async def clear_cache(self) -> None:
         """
         Deleted all cache entries created with this element cache.
@@ -117,18 +201,113 @@ class RedisCacheProvider:
 
         Also deletes the restricted_data_cache and the change_id_cache.
         """
+        await self.begin_full_cache_reset()
+        await self.add_full_cache_chunk(data)
+        await self.finish_full_cache_reset()
+
+    async def eval_fenced(
+        self,
+        script: str,
+        keys: List[str],
+        args: List[Any],
+        lock_name: str = "",
+        token: int = 0,
+    ) -> None:
+        """
+        Runs a lua script that starts with lua_fence.
+
+        The script only writes, if the lock lock_name is hold with the token.
+        Raises LockLostError otherwise. With the token 0, the lock is not
+        checked.
+        """
         async with get_connection() as redis:
-            tr = redis.multi_exec()
-            # like clear_cache but does not delete a lock
-            tr.eval(
-                "return redis.call('del', 'fake_key', unpack(redis.call('keys', ARGV[1])))",
-                keys=[],
-                args=[f"{self.prefix}{self.restricted_user_cache_key}*"],
+            written = await redis.eval(
+                script, keys=[*keys, self.get_lock_key(lock_name)], args=[*args, token]
             )
-            tr.delete(self.get_change_id_cache_key())
-            tr.delete(self.get_full_data_cache_key())
-            tr.hmset_dict(self.get_full_data_cache_key(), data)
-            await tr.execute()
+        if not written:
+            raise LockLostError(f"The lock {lock_name} is not hold anymore.")
+
+    async def write_fenced(
+        self,
+        commands: List[Tuple[str, str, List[str]]],
+        lock_name: str = "",
+        token: int = 0,
+    ) -> None:
+        """
+        Runs redis commands in one step, if the lock lock_name is hold with
+        the token. See eval_fenced().
+
+        commands is a list of tuples with the name of the command, the key and
+        the arguments.
+        """
+        args: List[Any] = []
+        for command, key, command_args in commands:
+            args.extend((command, key, len(command_args), *command_args))
+        await self.eval_fenced(lua_script_fenced_write, [], args, lock_name, token)
+
+    async def begin_full_cache_reset(self, lock_name: str = "", token: int = 0) -> None:
+        """
+        Starts to build new full_data. The data is written to a temporary key
+        with add_full_cache_chunk(). The old data is used until
+        finish_full_cache_reset() is called.
+
+        The methods for the new full_data only write, if the lock lock_name is
+        hold with the token. See eval_fenced().
+        """
+        await self.eval_fenced(
+            lua_script_begin_full_cache_reset,
+            [],
+            [f"{self.get_tmp_full_data_cache_key()}*"],
+            lock_name,
+            token,
+        )
+
+    async def add_full_cache_chunk(
+        self, data: Dict[str, str], lock_name: str = "", token: int = 0
+    ) -> None:
+        """
+        Adds elements to the new full_data.
+
+        data has to be a dict where the key is an element_id and the value the
+        (json-) encoded element.
+        """
+        if not data:
+            return
+        await self.write_fenced(
+            [
+                (
+                    "hmset",
+                    self.get_tmp_full_data_cache_key(),
+                    [value for item in data.items() for value in item],
+                )
+            ],
+            lock_name,
+            token,
+        )
+
+    async def finish_full_cache_reset(
+        self, lock_name: str = "", token: int = 0
+    ) -> None:
+        """
+        Replaces the full_data with the new full_data in one step.
+
+        Also deletes the restricted_data_cache and the change_id_cache. The
+        keys of the RedisCollectionCacheProvider are also deleted.
+        """
+        await self.eval_fenced(
+            lua_script_finish_full_cache_reset,
+            [
+                self.get_tmp_full_data_cache_key(),
+                self.get_full_data_cache_key(),
+                self.get_change_id_cache_key(),
+            ],
+            [
+                self.get_restricted_data_cache_key_pattern(),
+                f"{self.get_full_data_cache_key()}*",
+            ],
+            lock_name,
+            token,
+        )
 
     async def data_exists(self, user_id: Optional[int] = None) -> bool:
         """
@@ -155,7 +334,11 @@ class RedisCacheProvider:
             await redis.hmset(self.get_full_data_cache_key(), *elements)
 
     async def del_elements(
-        self, elements: List[str], user_id: Optional[int] = None
+        self,
+        elements: List[str],
+        user_id: Optional[int] = None,
+        lock_name: str = "",
+        token: int = 0,
     ) -> None:
         """
         Deletes elements from the cache.
@@ -164,30 +347,57 @@ class RedisCacheProvider:
 
         If user_id is None, the elements are deleted from the full_data cache. If user_id is an
         int, the elements are deleted one restricted_data_cache. 0 is for anonymous.
+
+        If a token is given, the elements are only deleted, if the lock
+        lock_name is hold with it. See eval_fenced().
         """
-        async with get_connection() as redis:
-            if user_id is None:
-                cache_key = self.get_full_data_cache_key()
-            else:
-                cache_key = self.get_restricted_data_cache_key(user_id)
-            await redis.hdel(cache_key, *elements)
+        if not elements:
+            return
+        if user_id is None:
+            cache_key = self.get_full_data_cache_key()
+        else:
+            cache_key = self.get_restricted_data_cache_key(user_id)
+        await self.write_fenced([("hdel", cache_key, elements)], lock_name, token)
 
     async def add_changed_elements(
-        self, default_change_id: int, element_ids: Iterable[str]
-    ) -> int:
+        self,
+        default_change_id: int,
+        element_ids: Iterable[str],
+        max_changed_elements: int = 0,
+        patched_change_ids: Optional[Dict[str, int]] = None,
+    ) -> Tuple[int, List[str]]:
         """
         Saves which elements are change with a change_id.
 
-        Generates and returns the change_id.
+        Only the last change_id of each element is saved. If max_changed_elements
+        is greater then 0, the elements with the oldest change_ids are removed
+        until there are at most max_changed_elements. The lowest change_id is
+        raised accordingly. The elements of the new change_id are never
+        removed.
+
+        patched_change_ids is a dict from element_ids to the change_ids of the
+        data the elements were patched on. In the same step, the elements are
+        checked, that were changed after this change_id by someone else.
+
+        Generates and returns the change_id and the element_ids of these
+        elements.
         """
+        patched_args: List[Any] = []
+        for element_id, change_id in (patched_change_ids or {}).items():
+            patched_args.extend((element_id, change_id))
         async with get_connection() as redis:
-            return int(
-                await redis.eval(
-                    lua_script_change_data,
-                    keys=[self.get_change_id_cache_key()],
-                    args=[default_change_id, *element_ids],
-                )
+            change_id, conflicts = await redis.eval(
+                lua_script_change_data,
+                keys=[self.get_change_id_cache_key()],
+                args=[
+                    default_change_id,
+                    max_changed_elements,
+                    len(patched_args) // 2,
+                    *patched_args,
+                    *element_ids,
+                ],
             )
+        return int(change_id), [element_id.decode() for element_id in conflicts]
 
     async def get_all_data(self, user_id: Optional[int] = None) -> Dict[bytes, bytes]:
         """
@@ -204,6 +414,32 @@ class RedisCacheProvider:
         async with get_connection() as redis:
             return await redis.hgetall(cache_key)
 
+    async def get_collection_data(
+        self, collection_string: str, user_id: Optional[int] = None
+    ) -> Dict[bytes, bytes]:
+        """
+        Returns all elements of one collection from a cache.
+
+        The elements are found with HSCAN, so only the elements of the
+        collection are sent from redis. But redis still walks through the
+        whole hash. The RedisCollectionCacheProvider reads only the hash of the
+        collection.
+
+        user_id is used like in get_all_data.
+        """
+        if user_id is None:
+            cache_key = self.get_full_data_cache_key()
+        else:
+            cache_key = self.get_restricted_data_cache_key(user_id)
+
+        out: Dict[bytes, bytes] = {}
+        async with get_connection() as redis:
+            async for element_id, element in redis.ihscan(
+                cache_key, match=f"{collection_string}:*", count=1000
+            ):
+                out[element_id] = element
+        return out
+
     async def get_element(
         self, element_id: str, user_id: Optional[int] = None
     ) -> Optional[bytes]:
@@ -220,6 +456,26 @@ class RedisCacheProvider:
         async with get_connection() as redis:
             return await redis.hget(cache_key, element_id)
 
+    async def get_elements(
+        self, element_ids: List[str], user_id: Optional[int] = None
+    ) -> List[Optional[bytes]]:
+        """
+        Returns many elements from the cache with one request.
+
+        The returned list has the same order as element_ids. For elements, that
+        do not exist, the list contains None.
+        """
+        if not element_ids:
+            return []
+
+        if user_id is None:
+            cache_key = self.get_full_data_cache_key()
+        else:
+            cache_key = self.get_restricted_data_cache_key(user_id)
+
+        async with get_connection() as redis:
+            return await redis.hmget(cache_key, *element_ids)
+
     async def get_data_since(
         self, change_id: int, user_id: Optional[int] = None, max_change_id: int = -1
     ) -> Tuple[Dict[str, List[bytes]], List[str]]:
@@ -235,20 +491,46 @@ class RedisCacheProvider:
         """
         changed_elements: Dict[str, List[bytes]] = defaultdict(list)
         deleted_elements: List[str] = []
+
+        # Convert max_change_id to a string. If its negative, use the string '+inf'
+        redis_max_change_id = "+inf" if max_change_id < 0 else str(max_change_id)
+        elements = await self.get_elements_since(
+            change_id, redis_max_change_id, user_id
+        )
+
+        for element_id, element_json in elements.items():
+            if element_id.startswith(b"_config"):
+                # Ignore config values from the change_id cache key
+                continue
+            if element_json is None:
+                # The element is not in the cache. It has to be deleted.
+                deleted_elements.append(element_id.decode())
+            else:
+                collection_string, id = split_element_id(element_id)
+                changed_elements[collection_string].append(element_json)
+        return changed_elements, deleted_elements
+
+    async def get_elements_since(
+        self, change_id: int, max_change_id: str, user_id: Optional[int] = None
+    ) -> Dict[bytes, Optional[bytes]]:
+        """
+        Returns all element_ids with a change_id between change_id and
+        max_change_id (including) together with the elements.
+
+        The elements are None, if they do not exist in the cache.
+        """
         if user_id is None:
             cache_key = self.get_full_data_cache_key()
         else:
             cache_key = self.get_restricted_data_cache_key(user_id)
 
-        # Convert max_change_id to a string. If its negative, use the string '+inf'
-        redis_max_change_id = "+inf" if max_change_id < 0 else str(max_change_id)
         async with get_connection() as redis:
             # lua script that returns gets all element_ids from change_id_cache_key
             # and then uses each element_id on full_data or restricted_data.
             # It returns a list where the odd values are the change_id and the
             # even values the element as json. The function wait_make_dict creates
             # a python dict from the returned list.
-            elements: Dict[bytes, Optional[bytes]] = await aioredis.util.wait_make_dict(
+            return await aioredis.util.wait_make_dict(
                 redis.eval(
                     """
                 -- Get change ids of changed elements
@@ -263,55 +545,122 @@ class RedisCacheProvider:
                 return elements
                 """,
                     keys=[self.get_change_id_cache_key(), cache_key],
-                    args=[change_id, redis_max_change_id],
+                    args=[change_id, max_change_id],
                 )
             )
 
-        for element_id, element_json in elements.items():
-            if element_id.startswith(b"_config"):
-                # Ignore config values from the change_id cache key
-                continue
-            if element_json is None:
-                # The element is not in the cache. It has to be deleted.
-                deleted_elements.append(element_id.decode())
-            else:
-                collection_string, id = split_element_id(element_id)
-                changed_elements[collection_string].append(element_json)
-        return changed_elements, deleted_elements
+    async def get_changed_element_ids(
+        self, change_id: int
+    ) -> Tuple[Optional[int], Optional[int], List[str]]:
+        """
+        Returns the element_ids, that were changed after change_id.
+
+        The returned value is a tuple with three values: The current change_id,
+        the lowest change_id and the list of element_ids. The change_ids are
+        None if there are no changes in the cache.
+        """
+        async with get_connection() as redis:
+            current_change_id, lowest_change_id, element_ids = await redis.eval(
+                lua_script_changed_element_ids,
+                keys=[self.get_change_id_cache_key()],
+                args=[change_id],
+            )
+        return (
+            None if current_change_id is None else int(current_change_id),
+            None if lowest_change_id is None else int(lowest_change_id),
+            [
+                element_id.decode()
+                for element_id in element_ids
+                if not element_id.startswith(b"_config")
+            ],
+        )
 
-    async def del_restricted_data(self, user_id: int) -> None:
+    async def del_restricted_data(
+        self, user_id: int, lock_name: str = "", token: int = 0
+    ) -> None:
         """
         Deletes all restricted_data for an user. 0 is for the anonymous user.
+
+        If a token is given, the data is only deleted, if the lock lock_name
+        is hold with it. See eval_fenced().
         """
-        async with get_connection() as redis:
-            await redis.delete(self.get_restricted_data_cache_key(user_id))
+        await self.write_fenced(
+            [("del", self.get_restricted_data_cache_key(user_id), [])], lock_name, token
+        )
 
-    async def set_lock(self, lock_name: str) -> bool:
+    async def set_lock(self, lock_name: str, ttl: float = 30) -> int:
         """
-        Tries to sets a lock.
+        Tries to sets a lock that expires after ttl seconds.
 
-        Returns True when the lock could be set.
+        Returns a token when the lock could be set. The tokens are increasing
+        numbers, so they can be used as fencing tokens. The token is needed to
+        renew or delete the lock.
 
-        Returns False when the lock was already set.
+        Returns 0 when the lock was already set.
         """
-        # TODO: Improve lock. See: https://redis.io/topics/distlock
         async with get_connection() as redis:
-            return await redis.setnx(f"{self.prefix}lock_{lock_name}", 1)
+            return await redis.eval(
+                lua_script_set_lock,
+                keys=[self.get_lock_key(lock_name), f"{self.prefix}lock_token"],
+                args=[int(ttl * 1000)],
+            )
 
     async def get_lock(self, lock_name: str) -> bool:
         """
-        Returns True, when the lock for the restricted_data of an user is set. Else False.
+        Returns True, when the lock is set. Else False.
         """
         async with get_connection() as redis:
-            return await redis.get(f"{self.prefix}lock_{lock_name}")
+            return bool(await redis.exists(self.get_lock_key(lock_name)))
 
-    async def del_lock(self, lock_name: str) -> None:
+    async def renew_lock(self, lock_name: str, token: int, ttl: float = 30) -> bool:
         """
-        Deletes the lock for the restricted_data of an user. Does nothing when the
-        lock is not set.
+        Sets the expiry of the lock to ttl seconds.
+
+        Returns False, if the lock is not hold with the token anymore.
         """
         async with get_connection() as redis:
-            await redis.delete(f"{self.prefix}lock_{lock_name}")
+            return bool(
+                await redis.eval(
+                    lua_script_renew_lock,
+                    keys=[self.get_lock_key(lock_name)],
+                    args=[token, int(ttl * 1000)],
+                )
+            )
+
+    async def del_lock(self, lock_name: str, token: int = 0) -> None:
+        """
+        Deletes the lock and wakes up the waiters.
+
+        If a token is given, the lock is only deleted, if it is still hold with
+        this token. Does nothing when the lock is not set.
+        """
+        async with get_connection() as redis:
+            await redis.eval(
+                lua_script_del_lock,
+                keys=[self.get_lock_key(lock_name)],
+                args=[token, f"{self.prefix}lock_released", lock_name],
+            )
+
+    async def wait_for_lock(self, lock_name: str) -> None:
+        """
+        Waits until the lock is released or expired.
+
+        Does not poll redis, but waits for the message on the lock_released
+        channel. The expiry of the lock is checked, because an expired lock
+        does not send a message.
+        """
+        lock_key = self.get_lock_key(lock_name)
+
+        async def check() -> float:
+            async with get_connection() as redis:
+                ttl = await redis.pttl(lock_key)
+            if ttl == -2:
+                # The lock does not exist.
+                return 0
+            # Check again after the lock expires, but at least every second.
+            return min(ttl / 1000, 1) if ttl > 0 else 1
+
+        await self.get_lock_listener().wait(lock_name, check)
 
     async def get_change_id_user(self, user_id: int) -> Optional[int]:
         """
@@ -324,15 +673,31 @@ class RedisCacheProvider:
                 self.get_restricted_data_cache_key(user_id), "_config:change_id"
             )
 
-    async def update_restricted_data(self, user_id: int, data: Dict[str, str]) -> None:
+    async def update_restricted_data(
+        self, user_id: int, data: Dict[str, str], lock_name: str = "", token: int = 0
+    ) -> None:
         """
         Updates the restricted_data for an user.
 
         data has to be a dict where the key is an element_id and the value the (json-) encoded
         element.
+
+        If a token is given, the data is only written, if the lock lock_name
+        is hold with it. See eval_fenced().
         """
-        async with get_connection() as redis:
-            await redis.hmset_dict(self.get_restricted_data_cache_key(user_id), data)
+        if not data:
+            return
+        await self.write_fenced(
+            [
+                (
+                    "hmset",
+                    self.get_restricted_data_cache_key(user_id),
+                    [value for item in data.items() for value in item],
+                )
+            ],
+            lock_name,
+            token,
+        )
 
     async def get_current_change_id(self) -> List[Tuple[str, int]]:
         """
@@ -355,6 +720,305 @@ class RedisCacheProvider:
             )
 
 
+class RedisCollectionCacheProvider(RedisCacheProvider):
+    """
+    Cache provider that saves the full_data of each collection in its own redis
+    hash.
+
+    The collection_strings of all collections are saved in a set, the
+    collection registry. A collection is read without loading the other
+    collections. The change_ids are saved like in the RedisCacheProvider.
+
+    The restricted_data of each user is also saved in one hash for each
+    collection. The hash of the RedisCacheProvider only contains the change_id
+    of the user.
+
+    If redis contains the full_data in the layout of the RedisCacheProvider, it
+    is converted, when data_exists() is called the first time. The old
+    restricted_data is deleted then.
+    """
+
+    collections_cache_key: str = "full_data_collections"
+
+    def get_collections_cache_key(self) -> str:
+        return "".join((self.prefix, self.collections_cache_key))
+
+    def get_collection_cache_key(self, collection_string: str) -> str:
+        return "".join((self.get_full_data_cache_key(), ":", collection_string))
+
+    def get_tmp_collection_cache_key(self, collection_string: str) -> str:
+        return "".join((self.get_tmp_full_data_cache_key(), ":", collection_string))
+
+    def get_tmp_collections_cache_key(self) -> str:
+        return "".join((self.prefix, "tmp_", self.collections_cache_key))
+
+    def get_collection_cache_key_prefix(self, user_id: Optional[int] = None) -> str:
+        """
+        Returns the prefix of the hashes of the collections. If user_id is
+        given, the hashes of the restricted_data of the user are used.
+        """
+        if user_id is None:
+            return f"{self.get_full_data_cache_key()}:"
+        return f"{self.get_restricted_data_cache_key(user_id)}:"
+
+    def get_element_collections(
+        self, element_ids: Iterable[str]
+    ) -> Dict[str, List[str]]:
+        """
+        Returns the element_ids grouped by their collection_strings.
+        """
+        collections: Dict[str, List[str]] = defaultdict(list)
+        for element_id in element_ids:
+            collection_string, __ = split_element_id(element_id)
+            collections[collection_string].append(element_id)
+        return collections
+
+    async def add_full_cache_chunk(
+        self, data: Dict[str, str], lock_name: str = "", token: int = 0
+    ) -> None:
+        """
+        Adds elements to the new full_data.
+
+        The elements are written to temporary hashes for each collection.
+        """
+        collections: Dict[str, List[str]] = defaultdict(list)
+        for element_id, element in data.items():
+            collection_string, __ = split_element_id(element_id)
+            collections[collection_string].extend((element_id, element))
+
+        await self.write_fenced(
+            [
+                ("hmset", self.get_tmp_collection_cache_key(collection_string), args)
+                for collection_string, args in collections.items()
+            ]
+            + [("sadd", self.get_tmp_collections_cache_key(), ["", *collections])],
+            lock_name,
+            token,
+        )
+
+    async def finish_full_cache_reset(
+        self, lock_name: str = "", token: int = 0
+    ) -> None:
+        """
+        Replaces the full_data with the new full_data in one step.
+        """
+        await self.eval_fenced(
+            lua_script_finish_collection_cache_reset,
+            [
+                self.get_tmp_collections_cache_key(),
+                self.get_collections_cache_key(),
+                self.get_change_id_cache_key(),
+            ],
+            [
+                self.get_restricted_data_cache_key_pattern(),
+                f"{self.get_full_data_cache_key()}*",
+                f"{self.get_tmp_full_data_cache_key()}:",
+                f"{self.get_full_data_cache_key()}:",
+            ],
+            lock_name,
+            token,
+        )
+
+    async def data_exists(self, user_id: Optional[int] = None) -> bool:
+        """
+        Returns True, when there is data in the cache.
+
+        Converts the full_data from the layout of the RedisCacheProvider, if
+        it exists.
+        """
+        if user_id is not None:
+            return await super().data_exists(user_id)
+
+        async with get_connection() as redis:
+            return bool(
+                await redis.eval(
+                    lua_script_migrate_to_collections,
+                    keys=[
+                        self.get_collections_cache_key(),
+                        self.get_full_data_cache_key(),
+                    ],
+                    args=[
+                        self.get_collection_cache_key_prefix(),
+                        self.get_restricted_data_cache_key_pattern(),
+                    ],
+                )
+            )
+
+    async def add_elements(self, elements: List[str]) -> None:
+        """
+        Add or change elements to the cache.
+
+        All collections are changed in one transaction.
+        """
+        collections: Dict[str, List[str]] = defaultdict(list)
+        for i in range(0, len(elements), 2):
+            collection_string, __ = split_element_id(elements[i])
+            collections[collection_string].extend((elements[i], elements[i + 1]))
+        if not collections:
+            return
+
+        async with get_connection() as redis:
+            tr = redis.multi_exec()
+            for collection_string, collection_elements in collections.items():
+                tr.hmset(
+                    self.get_collection_cache_key(collection_string),
+                    *collection_elements,
+                )
+            tr.sadd(self.get_collections_cache_key(), *collections.keys())
+            await tr.execute()
+
+    async def del_elements(
+        self,
+        elements: List[str],
+        user_id: Optional[int] = None,
+        lock_name: str = "",
+        token: int = 0,
+    ) -> None:
+        """
+        Deletes elements from the cache.
+
+        All collections are changed in one step.
+        """
+        prefix = self.get_collection_cache_key_prefix(user_id)
+        await self.write_fenced(
+            [
+                ("hdel", f"{prefix}{collection_string}", element_ids)
+                for collection_string, element_ids in self.get_element_collections(
+                    elements
+                ).items()
+            ],
+            lock_name,
+            token,
+        )
+
+    async def get_all_data(self, user_id: Optional[int] = None) -> Dict[bytes, bytes]:
+        """
+        Returns all data from a cache.
+
+        All collections are read in one lua script.
+        """
+        async with get_connection() as redis:
+            return await aioredis.util.wait_make_dict(
+                redis.eval(
+                    lua_script_get_all_collections,
+                    keys=[self.get_collections_cache_key()],
+                    args=[self.get_collection_cache_key_prefix(user_id)],
+                )
+            )
+
+    async def get_collection_data(
+        self, collection_string: str, user_id: Optional[int] = None
+    ) -> Dict[bytes, bytes]:
+        """
+        Returns all elements of one collection from a cache.
+        """
+        async with get_connection() as redis:
+            return await redis.hgetall(
+                f"{self.get_collection_cache_key_prefix(user_id)}{collection_string}"
+            )
+
+    async def get_element(
+        self, element_id: str, user_id: Optional[int] = None
+    ) -> Optional[bytes]:
+        """
+        Returns one element from the cache.
+        """
+        collection_string, __ = split_element_id(element_id)
+        async with get_connection() as redis:
+            return await redis.hget(
+                f"{self.get_collection_cache_key_prefix(user_id)}{collection_string}",
+                element_id,
+            )
+
+    async def get_elements(
+        self, element_ids: List[str], user_id: Optional[int] = None
+    ) -> List[Optional[bytes]]:
+        """
+        Returns many elements from the cache with one request.
+        """
+        if not element_ids:
+            return []
+
+        prefix = self.get_collection_cache_key_prefix(user_id)
+        collections = self.get_element_collections(element_ids)
+        async with get_connection() as redis:
+            tr = redis.multi_exec()
+            for collection_string, collection_element_ids in collections.items():
+                tr.hmget(f"{prefix}{collection_string}", *collection_element_ids)
+            results = await tr.execute()
+
+        elements: Dict[str, Optional[bytes]] = {}
+        for collection_element_ids, values in zip(collections.values(), results):
+            elements.update(zip(collection_element_ids, values))
+        return [elements[element_id] for element_id in element_ids]
+
+    async def get_elements_since(
+        self, change_id: int, max_change_id: str, user_id: Optional[int] = None
+    ) -> Dict[bytes, Optional[bytes]]:
+        """
+        Like RedisCacheProvider.get_elements_since but reads the elements from
+        the hashes of the collections.
+        """
+        async with get_connection() as redis:
+            return await aioredis.util.wait_make_dict(
+                redis.eval(
+                    lua_script_collection_elements_since,
+                    keys=[self.get_change_id_cache_key()],
+                    args=[
+                        change_id,
+                        max_change_id,
+                        self.get_collection_cache_key_prefix(user_id),
+                    ],
+                )
+            )
+
+    async def del_restricted_data(
+        self, user_id: int, lock_name: str = "", token: int = 0
+    ) -> None:
+        """
+        Deletes all restricted_data for an user.
+        """
+        await self.eval_fenced(
+            lua_script_del_collections,
+            [
+                self.get_collections_cache_key(),
+                self.get_restricted_data_cache_key(user_id),
+            ],
+            [self.get_collection_cache_key_prefix(user_id)],
+            lock_name,
+            token,
+        )
+
+    async def update_restricted_data(
+        self, user_id: int, data: Dict[str, str], lock_name: str = "", token: int = 0
+    ) -> None:
+        """
+        Updates the restricted_data for an user.
+
+        The elements are written to the hashes of their collections and the
+        change_id to the hash of the user in one step.
+        """
+        prefix = self.get_collection_cache_key_prefix(user_id)
+        config: List[str] = []
+        collections: Dict[str, List[str]] = defaultdict(list)
+        for element_id, element in data.items():
+            if element_id.startswith("_config:"):
+                config.extend((element_id, element))
+                continue
+            collection_string, __ = split_element_id(element_id)
+            collections[collection_string].extend((element_id, element))
+
+        commands = [
+            ("hmset", f"{prefix}{collection_string}", elements)
+            for collection_string, elements in collections.items()
+        ]
+        if config:
+            commands.append(
+                ("hmset", self.get_restricted_data_cache_key(user_id), config)
+            )
+        await self.write_fenced(commands, lock_name, token)
+
+
 class MemmoryCacheProvider:
     """
     CacheProvider for the ElementCache that uses only the memory.
@@ -370,9 +1034,32 @@ class MemmoryCacheProvider:
 
     def set_data_dicts(self) -> None:
         self.full_data: Dict[str, str] = {}
+        self.tmp_full_data: Dict[str, str] = {}
         self.restricted_data: Dict[int, Dict[str, str]] = {}
-        self.change_id_data: Dict[int, Set[str]] = {}
-        self.locks: Dict[str, str] = {}
+        change_id_data: Dict[int, Set[str]] = {}
+        self.change_id_data = change_id_data
+        self.locks: Dict[str, Tuple[int, float]] = {}
+        self.lock_token = 0
+
+    @property
+    def change_id_data(self) -> Dict[int, Set[str]]:
+        """
+        The element_ids for each change_id.
+
+        The change_ids are also saved in the sorted list change_ids, so the
+        changes since a change_id can be found with a binary search.
+        """
+        return self._change_id_data
+
+    @change_id_data.setter
+    def change_id_data(self, change_id_data: Dict[int, Set[str]]) -> None:
+        self._change_id_data = change_id_data
+        self.change_ids: List[int] = sorted(change_id_data.keys())
+        self.element_change_ids: Dict[str, int] = {}
+        for change_id in self.change_ids:
+            for element_id in change_id_data[change_id]:
+                self.element_change_ids[element_id] = change_id
+        self.lowest_change_id = self.change_ids[0] if self.change_ids else None
 
     async def clear_cache(self) -> None:
         self.set_data_dicts()
@@ -380,6 +1067,34 @@ class MemmoryCacheProvider:
     async def reset_full_cache(self, data: Dict[str, str]) -> None:
         self.full_data = data
 
+    def check_lock(self, lock_name: str, token: int) -> None:
+        """
+        Raises LockLostError, if a token is given and the lock lock_name is not
+        hold with it.
+        """
+        if not token:
+            return
+        lock = self.locks.get(lock_name)
+        if lock is None or lock[0] != token or lock[1] <= monotonic():
+            raise LockLostError(f"The lock {lock_name} is not hold anymore.")
+
+    async def begin_full_cache_reset(self, lock_name: str = "", token: int = 0) -> None:
+        self.check_lock(lock_name, token)
+        self.tmp_full_data = {}
+
+    async def add_full_cache_chunk(
+        self, data: Dict[str, str], lock_name: str = "", token: int = 0
+    ) -> None:
+        self.check_lock(lock_name, token)
+        self.tmp_full_data.update(data)
+
+    async def finish_full_cache_reset(
+        self, lock_name: str = "", token: int = 0
+    ) -> None:
+        self.check_lock(lock_name, token)
+        self.full_data = self.tmp_full_data
+        self.tmp_full_data = {}
+
     async def data_exists(self, user_id: Optional[int] = None) -> bool:
         if user_id is None:
             cache_dict = self.full_data
@@ -398,8 +1113,13 @@ class MemmoryCacheProvider:
             self.full_data[elements[i]] = elements[i + 1]
 
     async def del_elements(
-        self, elements: List[str], user_id: Optional[int] = None
+        self,
+        elements: List[str],
+        user_id: Optional[int] = None,
+        lock_name: str = "",
+        token: int = 0,
     ) -> None:
+        self.check_lock(lock_name, token)
         if user_id is None:
             cache_dict = self.full_data
         else:
@@ -412,20 +1132,71 @@ class MemmoryCacheProvider:
                 pass
 
     async def add_changed_elements(
-        self, default_change_id: int, element_ids: Iterable[str]
-    ) -> int:
+        self,
+        default_change_id: int,
+        element_ids: Iterable[str],
+        max_changed_elements: int = 0,
+        patched_change_ids: Optional[Dict[str, int]] = None,
+    ) -> Tuple[int, List[str]]:
         element_ids = list(element_ids)
         try:
             change_id = (await self.get_current_change_id())[0][1] + 1
         except IndexError:
             change_id = default_change_id
 
+        conflicts = []
+        for element_id, patched_change_id in (patched_change_ids or {}).items():
+            if self.element_change_ids.get(element_id, 0) > patched_change_id or (
+                self.lowest_change_id is not None
+                and self.lowest_change_id > patched_change_id + 1
+            ):
+                conflicts.append(element_id)
+
         for element_id in element_ids:
-            if change_id in self.change_id_data:
-                self.change_id_data[change_id].add(element_id)
-            else:
-                self.change_id_data[change_id] = {element_id}
-        return change_id
+            # Like in redis, only the last change_id of an element is saved.
+            old_change_id = self.element_change_ids.get(element_id)
+            if old_change_id is not None and old_change_id != change_id:
+                self.remove_changed_element(old_change_id, element_id)
+            self.element_change_ids[element_id] = change_id
+            if change_id not in self.change_id_data:
+                self.change_id_data[change_id] = set()
+                insort(self.change_ids, change_id)
+            self.change_id_data[change_id].add(element_id)
+
+        if element_ids and self.lowest_change_id is None:
+            self.lowest_change_id = change_id
+
+        if max_changed_elements > 0:
+            self.trim_changed_elements(max_changed_elements, change_id)
+        return change_id, conflicts
+
+    def remove_changed_element(self, change_id: int, element_id: str) -> None:
+        change_element_ids = self.change_id_data[change_id]
+        change_element_ids.discard(element_id)
+        if not change_element_ids:
+            del self.change_id_data[change_id]
+            del self.change_ids[bisect_left(self.change_ids, change_id)]
+
+    def trim_changed_elements(self, max_changed_elements: int, change_id: int) -> None:
+        """
+        Removes the oldest change_ids until there are at most
+        max_changed_elements elements. Never removes change_id.
+        """
+        excess = len(self.element_change_ids) - max_changed_elements
+        removed = 0
+        while (
+            excess > 0
+            and removed < len(self.change_ids)
+            and self.change_ids[removed] < change_id
+        ):
+            old_change_id = self.change_ids[removed]
+            for element_id in self.change_id_data.pop(old_change_id):
+                del self.element_change_ids[element_id]
+                excess -= 1
+            removed += 1
+        if removed:
+            self.lowest_change_id = self.change_ids[removed - 1] + 1
+            del self.change_ids[:removed]
 
     async def get_all_data(self, user_id: Optional[int] = None) -> Dict[bytes, bytes]:
         if user_id is None:
@@ -435,6 +1206,23 @@ class MemmoryCacheProvider:
 
         return str_dict_to_bytes(cache_dict)
 
+    async def get_collection_data(
+        self, collection_string: str, user_id: Optional[int] = None
+    ) -> Dict[bytes, bytes]:
+        if user_id is None:
+            cache_dict = self.full_data
+        else:
+            cache_dict = self.restricted_data.get(user_id, {})
+
+        prefix = f"{collection_string}:"
+        return str_dict_to_bytes(
+            {
+                element_id: element
+                for element_id, element in cache_dict.items()
+                if element_id.startswith(prefix)
+            }
+        )
+
     async def get_element(
         self, element_id: str, user_id: Optional[int] = None
     ) -> Optional[bytes]:
@@ -446,6 +1234,20 @@ class MemmoryCacheProvider:
         value = cache_dict.get(element_id, None)
         return value.encode() if value is not None else None
 
+    async def get_elements(
+        self, element_ids: List[str], user_id: Optional[int] = None
+    ) -> List[Optional[bytes]]:
+        if user_id is None:
+            cache_dict = self.full_data
+        else:
+            cache_dict = self.restricted_data.get(user_id, {})
+
+        out: List[Optional[bytes]] = []
+        for element_id in element_ids:
+            value = cache_dict.get(element_id, None)
+            out.append(value.encode() if value is not None else None)
+        return out
+
     async def get_data_since(
         self, change_id: int, user_id: Optional[int] = None, max_change_id: int = -1
     ) -> Tuple[Dict[str, List[bytes]], List[str]]:
@@ -456,12 +1258,15 @@ class MemmoryCacheProvider:
         else:
             cache_dict = self.restricted_data.get(user_id, {})
 
+        start = bisect_left(self.change_ids, change_id)
+        end = (
+            len(self.change_ids)
+            if max_change_id == -1
+            else bisect_right(self.change_ids, max_change_id)
+        )
         all_element_ids: Set[str] = set()
-        for data_change_id, element_ids in self.change_id_data.items():
-            if data_change_id >= change_id and (
-                max_change_id == -1 or data_change_id <= max_change_id
-            ):
-                all_element_ids.update(element_ids)
+        for data_change_id in self.change_ids[start:end]:
+            all_element_ids.update(self.change_id_data[data_change_id])
 
         for element_id in all_element_ids:
             element_json = cache_dict.get(element_id, None)
@@ -472,47 +1277,78 @@ class MemmoryCacheProvider:
                 changed_elements[collection_string].append(element_json.encode())
         return changed_elements, deleted_elements
 
-    async def del_restricted_data(self, user_id: int) -> None:
+    async def get_changed_element_ids(
+        self, change_id: int
+    ) -> Tuple[Optional[int], Optional[int], List[str]]:
+        element_ids: Set[str] = set()
+        start = bisect_right(self.change_ids, change_id)
+        for data_change_id in self.change_ids[start:]:
+            element_ids.update(self.change_id_data[data_change_id])
+        return (
+            self.change_ids[-1] if self.change_ids else None,
+            await self.get_lowest_change_id(),
+            list(element_ids),
+        )
+
+    async def del_restricted_data(
+        self, user_id: int, lock_name: str = "", token: int = 0
+    ) -> None:
+        self.check_lock(lock_name, token)
         try:
             del self.restricted_data[user_id]
         except KeyError:
             pass
 
-    async def set_lock(self, lock_name: str) -> bool:
-        if lock_name in self.locks:
-            return False
-        self.locks[lock_name] = "1"
-        return True
+    async def set_lock(self, lock_name: str, ttl: float = 30) -> int:
+        if await self.get_lock(lock_name):
+            return 0
+        self.lock_token += 1
+        self.locks[lock_name] = (self.lock_token, monotonic() + ttl)
+        return self.lock_token
 
     async def get_lock(self, lock_name: str) -> bool:
-        return lock_name in self.locks
+        lock = self.locks.get(lock_name)
+        if lock is not None and lock[1] <= monotonic():
+            # The lock is expired.
+            del self.locks[lock_name]
+            return False
+        return lock is not None
 
-    async def del_lock(self, lock_name: str) -> None:
-        try:
+    async def renew_lock(self, lock_name: str, token: int, ttl: float = 30) -> bool:
+        if not await self.get_lock(lock_name) or self.locks[lock_name][0] != token:
+            return False
+        self.locks[lock_name] = (token, monotonic() + ttl)
+        return True
+
+    async def del_lock(self, lock_name: str, token: int = 0) -> None:
+        lock = self.locks.get(lock_name)
+        if lock is not None and (not token or lock[0] == token):
             del self.locks[lock_name]
-        except KeyError:
-            pass
+
+    async def wait_for_lock(self, lock_name: str) -> None:
+        # All waiters are in this process. So polling the dict is cheap.
+        while await self.get_lock(lock_name):
+            await asyncio.sleep(0.01)
 
     async def get_change_id_user(self, user_id: int) -> Optional[int]:
         data = self.restricted_data.get(user_id, {})
         change_id = data.get("_config:change_id", None)
         return int(change_id) if change_id is not None else None
 
-    async def update_restricted_data(self, user_id: int, data: Dict[str, str]) -> None:
+    async def update_restricted_data(
+        self, user_id: int, data: Dict[str, str], lock_name: str = "", token: int = 0
+    ) -> None:
+        self.check_lock(lock_name, token)
         redis_data = self.restricted_data.setdefault(user_id, {})
         redis_data.update(data)
 
     async def get_current_change_id(self) -> List[Tuple[str, int]]:
-        change_data = self.change_id_data
-        if change_data:
-            return [("no_usefull_value", max(change_data.keys()))]
+        if self.change_ids:
+            return [("no_usefull_value", self.change_ids[-1])]
         return []
 
     async def get_lowest_change_id(self) -> Optional[int]:
-        change_data = self.change_id_data
-        if change_data:
-            return min(change_data.keys())
-        return None
+        return self.lowest_change_id
 
 
 class Cachable(Protocol):
@@ -542,6 +1378,14 @@ class Cachable(Protocol):
         elements of the cachable.
         """
 
+    # A cachable can also have the method has_user_specific_restricted_data().
+    # It has to return False, if the restricted data only depends on the groups
+    # of the user.
+
+    # A cachable can also have the method get_elements_chunked(chunk_size). It
+    # has to return an iterator of lists with up to chunk_size elements. It is
+    # used to build the cache without loading all elements at once.
+
 
 def get_all_cachables() -> List[Cachable]:
     """
@@ -560,6 +1404,89 @@ def get_all_cachables() -> List[Cachable]:
     return out
 
 
+# Listeners for released locks. The keys are the prefixes of the providers.
+lock_listeners: Dict[str, "ChannelListener"] = {}
+
+
+lua_script_set_lock = """
+-- Sets the lock KEYS[1] with the expiry ARGV[1] in milliseconds. The value of
+-- the lock is a new token from the counter KEYS[2]. Returns the token or 0, if
+-- the lock is already set.
+if redis.call('exists', KEYS[1]) == 1 then
+    return 0
+end
+local token = redis.call('incr', KEYS[2])
+redis.call('set', KEYS[1], token, 'px', ARGV[1])
+return token
+"""
+
+
+lua_script_renew_lock = """
+-- Sets the expiry of the lock KEYS[1] to ARGV[2] milliseconds, if it is hold
+-- with the token ARGV[1].
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+lua_script_del_lock = """
+-- Deletes the lock KEYS[1], if it is hold with the token ARGV[1] or if the
+-- token is 0. Publishes the lock name ARGV[3] on the channel ARGV[2].
+if ARGV[1] == '0' or redis.call('get', KEYS[1]) == ARGV[1] then
+    if redis.call('del', KEYS[1]) == 1 then
+        redis.call('publish', ARGV[2], ARGV[3])
+    end
+end
+"""
+
+
+lua_fence = """
+-- The last key is a lock and the last argument a token. If the token is not 0
+-- and the lock is not hold with it, nothing is written and 0 is returned.
+if ARGV[#ARGV] ~= '0' and redis.call('get', KEYS[#KEYS]) ~= ARGV[#ARGV] then
+    return 0
+end
+"""
+
+
+lua_script_fenced_write = (
+    lua_fence
+    + """
+-- The other arguments are groups of a command, a key, the number n of the
+-- arguments of the command and the n arguments. Long lists of arguments are
+-- passed to the command in parts.
+local i = 1
+while i < #ARGV do
+    local first = i + 3
+    local last = i + 2 + tonumber(ARGV[i + 2])
+    if last < first then
+        redis.call(ARGV[i], ARGV[i + 1])
+    end
+    for j = first, last, 1000 do
+        redis.call(ARGV[i], ARGV[i + 1], unpack(ARGV, j, math.min(j + 999, last)))
+    end
+    i = last + 1
+end
+return 1
+"""
+)
+
+
+lua_script_begin_full_cache_reset = (
+    lua_fence
+    + """
+-- Deletes all keys that match the pattern ARGV[1].
+local keys = redis.call('keys', ARGV[1])
+for i = 1, #keys, 1000 do
+    redis.call('del', unpack(keys, i, math.min(i + 999, #keys)))
+end
+return 1
+"""
+)
+
+
 lua_script_change_data = """
 -- Generate a new change_id
 local tmp = redis.call('zrevrangebyscore', KEYS[1], '+inf', '-inf', 'WITHSCORES', 'LIMIT', 0, 1)
@@ -571,8 +1498,22 @@ else
     change_id = tmp[2] + 1
 end
 
+-- ARGV[3] is the number of the pairs of patched element_ids and the change_ids
+-- they were patched on. Find the elements that were changed after this
+-- change_id or maybe were, because the change_ids are removed.
+local conflicts = {}
+local patched_end = 3 + 2 * tonumber(ARGV[3])
+local lowest_change_id = redis.call('zscore', KEYS[1], '_config:lowest_change_id')
+for i = 4, patched_end, 2 do
+    local score = redis.call('zscore', KEYS[1], ARGV[i])
+    if (score and tonumber(score) > tonumber(ARGV[i + 1])) or
+       (lowest_change_id and tonumber(lowest_change_id) > ARGV[i + 1] + 1) then
+        table.insert(conflicts, ARGV[i])
+    end
+end
+
 -- Add elements to sorted set
-local count = 2
+local count = patched_end + 1
 while ARGV[count] do
     redis.call('zadd', KEYS[1], change_id, ARGV[count])
     count = count + 1
@@ -581,5 +1522,150 @@ end
 -- Set lowest_change_id if it does not exist
 redis.call('zadd', KEYS[1], 'NX', change_id, '_config:lowest_change_id')
 
-return change_id
+-- Remove the oldest elements, if there are more then ARGV[2]. The config value
+-- is also a member of the sorted set.
+local max_count = tonumber(ARGV[2])
+local excess = redis.call('zcard', KEYS[1]) - 1 - max_count
+if max_count > 0 and excess > 0 then
+    -- Remove all elements with the change_id of the last element that has to be
+    -- removed, but never the elements of the new change_id.
+    local last = redis.call('zrange', KEYS[1], excess, excess, 'WITHSCORES')
+    local cutoff = math.min(tonumber(last[2]), change_id - 1)
+    local lowest = tonumber(redis.call('zscore', KEYS[1], '_config:lowest_change_id'))
+    if cutoff >= lowest then
+        redis.call('zremrangebyscore', KEYS[1], '-inf', cutoff)
+        -- Clients with a lower change_id than cutoff + 1 could miss changes.
+        redis.call('zadd', KEYS[1], cutoff + 1, '_config:lowest_change_id')
+    end
+end
+
+return {change_id, conflicts}
+"""
+
+
+lua_script_changed_element_ids = """
+-- Returns the current change_id, the lowest change_id and all element_ids
+-- that were changed after the change_id ARGV[1].
+local current = redis.call('zrevrangebyscore', KEYS[1], '+inf', '-inf', 'WITHSCORES', 'LIMIT', 0, 1)
+local lowest = redis.call('zscore', KEYS[1], '_config:lowest_change_id')
+local element_ids = redis.call('zrangebyscore', KEYS[1], '(' .. ARGV[1], '+inf')
+return {current[2] or false, lowest, element_ids}
+"""
+
+
+lua_script_migrate_to_collections = """
+-- Returns 1 if the collection registry KEYS[1] exists. If only the full_data
+-- hash KEYS[2] exists, its elements are moved to one hash for each collection.
+-- ARGV[1] is the prefix of the hashes of the collections. The restricted_data
+-- (ARGV[2]) is deleted, so it is written again in the new layout.
+if redis.call('exists', KEYS[1]) == 1 then
+    return 1
+end
+if redis.call('exists', KEYS[2]) == 0 then
+    return 0
+end
+
+local keys = redis.call('keys', ARGV[2])
+for i = 1, #keys, 1000 do
+    redis.call('del', unpack(keys, i, math.min(i + 999, #keys)))
+end
+
+redis.call('sadd', KEYS[1], '')
+local data = redis.call('hgetall', KEYS[2])
+for i = 1, #data, 2 do
+    local collection_string = string.match(data[i], '^(.*):')
+    redis.call('hset', ARGV[1] .. collection_string, data[i], data[i + 1])
+    redis.call('sadd', KEYS[1], collection_string)
+end
+redis.call('del', KEYS[2])
+return 1
+"""
+
+
+lua_script_get_all_collections = """
+-- Returns the elements of all collections in the registry KEYS[1]. ARGV[1] is
+-- the prefix of the hashes of the collections.
+local elements = {}
+for _, collection_string in ipairs(redis.call('smembers', KEYS[1])) do
+    local data = redis.call('hgetall', ARGV[1] .. collection_string)
+    for i = 1, #data do
+        table.insert(elements, data[i])
+    end
+end
+return elements
+"""
+
+
+lua_script_collection_elements_since = """
+-- Like the script in RedisCacheProvider.get_elements_since but reads each
+-- element from the hash of its collection. ARGV[3] is the prefix of the hashes
+-- of the collections.
+local element_ids = redis.call('zrangebyscore', KEYS[1], ARGV[1], ARGV[2])
+
+local elements = {}
+for _, element_id in pairs(element_ids) do
+    local collection_string = string.match(element_id, '^(.*):')
+    table.insert(elements, element_id)
+    table.insert(elements, redis.call('hget', ARGV[3] .. collection_string, element_id))
+end
+return elements
+"""
+
+
+lua_script_del_collections = (
+    lua_fence
+    + """
+-- Deletes the key KEYS[2] and the hashes of all collections in the registry
+-- KEYS[1] with the prefix ARGV[1].
+redis.call('del', KEYS[2])
+for _, collection_string in ipairs(redis.call('smembers', KEYS[1])) do
+    redis.call('del', ARGV[1] .. collection_string)
+end
+return 1
+"""
+)
+
+
+lua_script_finish_full_cache_reset = (
+    lua_fence
+    + """
+-- Deletes the restricted_data (ARGV[1]), all full_data (ARGV[2]) and the
+-- change_ids (KEYS[3]). Then renames the new full_data KEYS[1] to KEYS[2].
+for _, pattern in ipairs({ARGV[1], ARGV[2]}) do
+    local keys = redis.call('keys', pattern)
+    for i = 1, #keys, 1000 do
+        redis.call('del', unpack(keys, i, math.min(i + 999, #keys)))
+    end
+end
+redis.call('del', KEYS[3])
+if redis.call('exists', KEYS[1]) == 1 then
+    redis.call('rename', KEYS[1], KEYS[2])
+end
+return 1
+"""
+)
+
+
+lua_script_finish_collection_cache_reset = (
+    lua_fence
+    + """
+-- Like lua_script_finish_full_cache_reset for the collection layout. Renames
+-- the new hashes of all collections in the registry KEYS[1] from the prefix
+-- ARGV[3] to the prefix ARGV[4] and the registry to KEYS[2].
+for _, pattern in ipairs({ARGV[1], ARGV[2]}) do
+    local keys = redis.call('keys', pattern)
+    for i = 1, #keys, 1000 do
+        redis.call('del', unpack(keys, i, math.min(i + 999, #keys)))
+    end
+end
+redis.call('del', KEYS[3])
+redis.call('sadd', KEYS[1], '')
+for _, collection_string in ipairs(redis.call('smembers', KEYS[1])) do
+    if redis.call('exists', ARGV[3] .. collection_string) == 1 then
+        redis.call('rename', ARGV[3] .. collection_string, ARGV[4] .. collection_string)
+    end
+end
+redis.call('rename', KEYS[1], KEYS[2])
+return 1
 """
+)
@@ -1,11 +1,180 @@
-from collections import defaultdict
-from typing import Any, Dict, List
+import asyncio
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
 from urllib.parse import parse_qs
 
-from .auth import async_anonymous_is_enabled
+from .auth import async_anonymous_is_enabled, get_permission_fingerprint
 from .autoupdate import AutoupdateFormat
-from .cache import element_cache, split_element_id
-from .websocket import ProtocollAsyncJsonWebsocketConsumer, get_element_data
+from .cache import element_cache, has_user_specific_restricted_data, split_element_id
+from .projector import get_projector_payload
+from .websocket import (
+    ProtocollAsyncJsonWebsocketConsumer,
+    get_element_data,
+    get_user_group_name,
+)
+
+
+class AutoupdateFanout:
+    """
+    Builds the autoupdate messages for all consumers of this process.
+
+    The changed elements of a change_id are loaded from the cache and decoded
+    only once. Then they are restricted for each user. Users with the same
+    groups share the restricted data of collections, that are not user
+    specific. If no user specific collection has changed, they also share the
+    encoded message.
+
+    Elements, that the user can not see, are sent as deleted elements.
+
+    Only the data for the last change_ids is kept. It is also dropped, when
+    the event loop changes.
+    """
+
+    def __init__(self, max_change_ids: int = 10) -> None:
+        self.max_change_ids = max_change_ids
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.clear()
+
+    def clear(self) -> None:
+        self.full_data: "OrderedDict[Tuple[int, int], asyncio.Future]" = OrderedDict()
+        self.restricted_data: Dict[
+            Tuple[int, int, str, str], Tuple[List[Dict[str, Any]], List[int]]
+        ] = {}
+        self.messages: Dict[Tuple[int, int, str], asyncio.Future] = {}
+
+    async def get_message(
+        self, user_id: int, from_change_id: int, to_change_id: int
+    ) -> str:
+        """
+        Returns the encoded autoupdate message for an user with all changes
+        from from_change_id to to_change_id (including).
+        """
+        loop = asyncio.get_event_loop()
+        if loop is not self.loop:
+            self.clear()
+            self.loop = loop
+
+        change_ids = (from_change_id, to_change_id)
+        future = self.full_data.get(change_ids)
+        if future is None:
+            future = asyncio.ensure_future(
+                element_cache.get_full_data(from_change_id, to_change_id)
+            )
+            self.full_data[change_ids] = future
+            while len(self.full_data) > self.max_change_ids:
+                old_change_ids, __ = self.full_data.popitem(last=False)
+                self.forget(old_change_ids)
+
+        try:
+            changed_elements, deleted_element_ids = await asyncio.shield(future)
+        except Exception:
+            self.full_data.pop(change_ids, None)
+            raise
+
+        if any(
+            has_user_specific_restricted_data(
+                element_cache.cachables[collection_string]
+            )
+            for collection_string in changed_elements.keys()
+        ):
+            return await self.build_message(user_id, from_change_id, to_change_id, None)
+
+        fingerprint = await get_permission_fingerprint(user_id)
+        key = (from_change_id, to_change_id, fingerprint)
+        future = self.messages.get(key)
+        if future is None:
+            future = asyncio.ensure_future(
+                self.build_message(user_id, from_change_id, to_change_id, fingerprint)
+            )
+            self.messages[key] = future
+        try:
+            return await asyncio.shield(future)
+        except Exception:
+            self.messages.pop(key, None)
+            raise
+
+    async def build_message(
+        self,
+        user_id: int,
+        from_change_id: int,
+        to_change_id: int,
+        fingerprint: Optional[str],
+    ) -> str:
+        """
+        Restricts the changed elements for an user and encodes the message.
+        """
+        changed_elements, deleted_element_ids = await self.full_data[
+            (from_change_id, to_change_id)
+        ]
+
+        deleted_elements: Dict[str, List[int]] = defaultdict(list)
+        for element_id in deleted_element_ids:
+            collection_string, id = split_element_id(element_id)
+            deleted_elements[collection_string].append(id)
+
+        restricted_elements: Dict[str, List[Dict[str, Any]]] = {}
+        for collection_string, full_data in changed_elements.items():
+            cachable = element_cache.cachables[collection_string]
+            if has_user_specific_restricted_data(cachable):
+                elements, hidden_ids = await self.restrict_elements(
+                    user_id, collection_string, full_data
+                )
+            else:
+                if fingerprint is None:
+                    fingerprint = await get_permission_fingerprint(user_id)
+                key = (from_change_id, to_change_id, fingerprint, collection_string)
+                try:
+                    elements, hidden_ids = self.restricted_data[key]
+                except KeyError:
+                    elements, hidden_ids = await self.restrict_elements(
+                        user_id, collection_string, full_data
+                    )
+                    self.restricted_data[key] = (elements, hidden_ids)
+            restricted_elements[collection_string] = elements
+            if hidden_ids:
+                deleted_elements[collection_string].extend(hidden_ids)
+
+        return await ProtocollAsyncJsonWebsocketConsumer.encode_json(
+            {
+                "type": "autoupdate",
+                "content": AutoupdateFormat(
+                    changed=restricted_elements,
+                    deleted=deleted_elements,
+                    from_change_id=from_change_id,
+                    to_change_id=to_change_id,
+                    all_data=False,
+                ),
+            }
+        )
+
+    async def restrict_elements(
+        self, user_id: int, collection_string: str, full_data: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], List[int]]:
+        """
+        Returns the restricted elements and the ids of the elements, the user
+        can not see.
+        """
+        restricter = element_cache.cachables[collection_string].restrict_elements
+        elements = await restricter(user_id, full_data)
+        visible_ids = set(element["id"] for element in elements)
+        hidden_ids = [
+            element["id"] for element in full_data if element["id"] not in visible_ids
+        ]
+        return elements, hidden_ids
+
+    def forget(self, change_ids: Tuple[int, int]) -> None:
+        """
+        Removes all restricted data and messages for the change_ids.
+        """
+        for key in [key for key in self.restricted_data if key[:2] == change_ids]:
+            del self.restricted_data[key]
+        for message_key in [key for key in self.messages if key[:2] == change_ids]:
+            del self.messages[message_key]
+
+
+autoupdate_fanout = AutoupdateFanout()
+
+empty_projector_payload = get_projector_payload([])
 
 
 class SiteConsumer(ProtocollAsyncJsonWebsocketConsumer):
@@ -16,7 +185,7 @@ class SiteConsumer(ProtocollAsyncJsonWebsocketConsumer):
     groups = ["site"]
 
     def __init__(self, *args: Any, **kwargs: Any) -> None:
-        self.projector_hash: Dict[int, int] = {}
+        self.projector_hash: Dict[int, str] = {}
         super().__init__(*args, **kwargs)
 
     async def connect(self) -> None:
@@ -50,6 +219,11 @@ class SiteConsumer(ProtocollAsyncJsonWebsocketConsumer):
             # a positive value in autoupdate. Start autoupdate
             await self.channel_layer.group_add("autoupdate", self.channel_name)
 
+        # Join the group of the user to get notify messages.
+        await self.channel_layer.group_add(
+            get_user_group_name(self.scope["user"]["id"]), self.channel_name
+        )
+
         await self.accept()
 
         if change_id is not None:
@@ -66,64 +240,54 @@ class SiteConsumer(ProtocollAsyncJsonWebsocketConsumer):
         A user disconnects. Remove it from autoupdate.
         """
         await self.channel_layer.group_discard("autoupdate", self.channel_name)
+        await self.channel_layer.group_discard(
+            get_user_group_name(self.scope["user"]["id"]), self.channel_name
+        )
 
     async def send_notify(self, event: Dict[str, Any]) -> None:
         """
         Send a notify message to the user.
+
+        The message is only sent to the recipients. See
+        NotifyWebsocketClientMessage.
         """
-        user_id = self.scope["user"]["id"]
-        item = event["incomming"]
+        if self.scope["user"]["id"] in event.get("skipUsers", []):
+            # The message was also sent to the group of the user.
+            return
 
-        users = item.get("users")
-        reply_channels = item.get("replyChannels")
-        if (
-            (isinstance(users, bool) and users)
-            or (isinstance(users, list) and user_id in users)
-            or (
-                isinstance(reply_channels, list) and self.channel_name in reply_channels
-            )
-            or (users is None and reply_channels is None)
-        ):
-            item["senderChannelName"] = event["senderChannelName"]
-            item["senderUserId"] = event["senderUserId"]
-            await self.send_json(type="notify", content=item)
+        item = event["incomming"]
+        item["senderChannelName"] = event["senderChannelName"]
+        item["senderUserId"] = event["senderUserId"]
+        await self.send_json(type="notify", content=item)
 
     async def send_data(self, event: Dict[str, Any]) -> None:
         """
         Send changed or deleted elements to the user.
         """
         change_id = event["change_id"]
-        changed_elements, deleted_elements_ids = await element_cache.get_restricted_data(
-            self.scope["user"]["id"], change_id, max_change_id=change_id
-        )
-
-        deleted_elements: Dict[str, List[int]] = defaultdict(list)
-        for element_id in deleted_elements_ids:
-            collection_string, id = split_element_id(element_id)
-            deleted_elements[collection_string].append(id)
-        await self.send_json(
-            type="autoupdate",
-            content=AutoupdateFormat(
-                changed=changed_elements,
-                deleted=deleted_elements,
-                from_change_id=change_id,
-                to_change_id=change_id,
-                all_data=False,
-            ),
+        from_change_id = event.get("from_change_id", change_id)
+        message = await autoupdate_fanout.get_message(
+            self.scope["user"]["id"], from_change_id, change_id
         )
+        await self.send(text_data=message)
 
     async def projector_changed(self, event: Dict[str, Any]) -> None:
         """
         The projector has changed.
         """
-        all_projector_data = event["data"]
-        projector_data: Dict[int, Dict[str, Any]] = {}
+        payloads = event["data"]
+        projector_data: List[str] = []
         for projector_id in self.listen_projector_ids:
-            data = all_projector_data.get(projector_id, [])
-            new_hash = hash(str(data))
-            if new_hash != self.projector_hash.get(projector_id):
-                projector_data[projector_id] = data
-                self.projector_hash[projector_id] = new_hash
+            payload = payloads.get(projector_id, empty_projector_payload)
+            if payload["hash"] != self.projector_hash.get(projector_id):
+                projector_data.append(f'"{projector_id}": {payload["json"]}')
+                self.projector_hash[projector_id] = payload["hash"]
 
         if projector_data:
-            await self.send_json(type="projector", content=projector_data)
+            # The payloads are already encoded. Build the message as text to
+            # not decode and encode them again.
+            await self.send(
+                text_data='{"type": "projector", "content": {'
+                + ", ".join(projector_data)
+                + "}}"
+            )
@@ -0,0 +1,72 @@
+"""
+Encoding and decoding of json data.
+
+Uses orjson or ujson if one of them is installed. Otherwise the json module
+of the standard library is used. The backend can be set with the setting
+JSON_BACKEND.
+"""
+
+import json
+from typing import Any, Callable, Dict, Tuple, Union
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+
+Dumps = Callable[[Any], str]
+Loads = Callable[[Union[str, bytes]], Any]
+
+# All available backends. The keys are the names of the backends.
+backends: Dict[str, Tuple[Dumps, Loads]] = {"json": (json.dumps, json.loads)}
+
+try:
+    import orjson
+except ImportError:
+    pass
+else:
+    # Integer keys need OPT_NON_STR_KEYS, that exists since orjson 3.3. Older
+    # versions are not used.
+    if hasattr(orjson, "OPT_NON_STR_KEYS"):
+
+        def orjson_dumps(data: Any) -> str:
+            return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS).decode()
+
+        backends["orjson"] = (orjson_dumps, orjson.loads)
+
+try:
+    import ujson
+except ImportError:
+    pass
+else:
+
+    def ujson_dumps(data: Any) -> str:
+        return ujson.dumps(data, ensure_ascii=False, escape_forward_slashes=False)
+
+    def ujson_loads(data: Union[str, bytes]) -> Any:
+        return ujson.loads(data)  # type: ignore
+
+    backends["ujson"] = (ujson_dumps, ujson_loads)
+
+
+def get_backend_name() -> str:
+    """
+    Returns the name of the backend from the settings or the fastest
+    available backend.
+    """
+    backend = getattr(settings, "JSON_BACKEND", "")
+    if backend:
+        if backend not in backends:
+            raise ImproperlyConfigured(
+                f"The json backend {backend} is not installed. "
+                f"Available backends: {', '.join(backends.keys())}"
+            )
+        return backend
+
+    for backend in ("orjson", "ujson"):
+        if backend in backends:
+            return backend
+    return "json"
+
+
+backend_name = get_backend_name()
+json_dumps, json_loads = backends[backend_name]
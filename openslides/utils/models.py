@@ -1,7 +1,8 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 
 from django.core.exceptions import ImproperlyConfigured
-from django.db import models
+from django.db import connections, models
+from django.db.models.functions import Cast
 
 from .access_permissions import BaseAccessPermissions
 from .autoupdate import Element, inform_changed_data, inform_changed_elements
@@ -131,6 +132,27 @@ class RESTModelMixin:
         # Build a dict from the instance id to the full_data
         return [instance.get_full_data() for instance in query.all()]
 
+    @classmethod
+    def get_elements_chunked(cls, chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Returns all elements as full_data in lists of up to chunk_size
+        elements.
+
+        The instances of each chunk are loaded with one query, so the
+        prefetched data of the full queryset is only loaded for this chunk.
+        """
+        try:
+            query = cls.objects.get_full_queryset()  # type: ignore
+        except AttributeError:
+            query = cls.objects  # type: ignore
+
+        pks = list(query.order_by("pk").values_list("pk", flat=True))
+        for index in range(0, len(pks), chunk_size):
+            chunk_pks = pks[index : index + chunk_size]  # noqa: E203
+            yield [
+                instance.get_full_data() for instance in query.filter(pk__in=chunk_pks)
+            ]
+
     @classmethod
     async def restrict_elements(
         cls, user_id: int, elements: List[Dict[str, Any]]
@@ -140,20 +162,50 @@ class RESTModelMixin:
         """
         return await cls.get_access_permissions().get_restricted_data(elements, user_id)
 
-    def get_full_data(self) -> Dict[str, Any]:
+    @classmethod
+    def has_user_specific_restricted_data(cls) -> bool:
         """
-        Returns the full_data of the instance.
+        Returns True, if two users with the same groups can get different
+        restricted data.
+        """
+        return cls.get_access_permissions().has_user_specific_data()
+
+    def get_serializer_class(self) -> Any:
+        """
+        Returns the serializer class of the model.
         """
         try:
-            serializer_class = model_serializer_classes[type(self)]
+            return model_serializer_classes[type(self)]
         except KeyError:
             # Because of the order of imports, it can happen, that the serializer
             # for a model is not imported yet. Try to guess the name of the
             # module and import it.
             module_name = type(self).__module__.rsplit(".", 1)[0] + ".serializers"
             __import__(module_name)
-            serializer_class = model_serializer_classes[type(self)]
-        return serializer_class(self).data
+            return model_serializer_classes[type(self)]
+
+    def get_full_data(self) -> Dict[str, Any]:
+        """
+        Returns the full_data of the instance.
+        """
+        return self.get_serializer_class()(self).data
+
+    def get_full_data_fields(self, field_names: Iterable[str]) -> Dict[str, Any]:
+        """
+        Returns only some fields of the full_data of the instance. The related
+        objects of the other fields are not queried.
+
+        The field names are the keys in the full_data.
+        """
+        fields = self.get_serializer_class()(self).fields
+        full_data = {}
+        for field_name in field_names:
+            field = fields[field_name]
+            attribute = field.get_attribute(self)
+            full_data[field_name] = (
+                None if attribute is None else field.to_representation(attribute)
+            )
+        return full_data
 
 
 def SET_NULL_AND_AUTOUPDATE(
@@ -191,3 +243,43 @@ def CASCADE_AND_AUTOUODATE(
         )
     inform_changed_elements(elements)
     models.CASCADE(collector, field, sub_objs, using)
+
+
+def bulk_update(
+    instances: Iterable[models.Model], fields: List[str], batch_size: int = 100
+) -> None:
+    """
+    Saves the given fields of many instances of one model with one query per
+    batch.
+
+    Works like QuerySet.bulk_update() of Django 2.2. The save() method of the
+    instances is not called, so the autoupdate system is not informed.
+    """
+    instances = list(instances)
+    if not instances:
+        return
+    model = type(instances[0])
+    manager = model._default_manager  # type: ignore
+    model_fields = [model._meta.get_field(name) for name in fields]  # type: ignore
+    requires_casting = connections[manager.db].vendor == "postgresql"
+
+    for index in range(0, len(instances), batch_size):
+        batch = instances[index : index + batch_size]  # noqa: E203
+        updates = {}
+        for field in model_fields:
+            case = models.Case(
+                *(
+                    models.When(
+                        pk=instance.pk,
+                        then=models.Value(
+                            getattr(instance, field.attname), output_field=field
+                        ),
+                    )
+                    for instance in batch
+                ),
+                output_field=field,
+            )
+            updates[field.attname] = (
+                Cast(case, output_field=field) if requires_casting else case
+            )
+        manager.filter(pk__in=[instance.pk for instance in batch]).update(**updates)
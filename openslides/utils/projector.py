@@ -5,17 +5,45 @@ Functions  that handel the registration of projector elements and the rendering
 of the data to present it on the projector.
 """
 
-from typing import Any, Callable, Dict, List
+import hashlib
+import json
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+)
 
-from .cache import element_cache
+from mypy_extensions import TypedDict
+
+from .cache import LocalElementCache, element_cache
+from .json_codec import json_dumps
+from .utils import split_element_id
 
 
 AllData = Dict[str, Dict[int, Dict[str, Any]]]
 ProjectorSlide = Callable[[AllData, Dict[str, Any], int], Dict[str, Any]]
+ProjectorPayload = TypedDict("ProjectorPayload", {"hash": str, "json": str})
+T = TypeVar("T")
 
 
 projector_slides: Dict[str, ProjectorSlide] = {}
 
+# The collections, that each slide reads. None means, that the slide can read
+# any collection.
+projector_slide_dependencies: Dict[str, Optional[FrozenSet[str]]] = {}
+
+
+# The indexes that were built by get_collection_index(). The values are the
+# collection, that the index was built from, and the index.
+collection_indexes: Dict[Tuple[str, Callable], Tuple[Dict[int, Any], Any]] = {}
+
 
 class ProjectorElementException(Exception):
     """
@@ -23,13 +51,196 @@ class ProjectorElementException(Exception):
     """
 
 
-def register_projector_slide(name: str, slide: ProjectorSlide) -> None:
+def register_projector_slide(
+    name: str, slide: ProjectorSlide, dependencies: Optional[Iterable[str]] = None
+) -> None:
     """
     Registers a projector slide.
 
+    dependencies are the collection_strings of all collections, that the slide
+    reads. The data of the slide is only calculated again, when one of these
+    collections changes. If dependencies is None, the slide is calculated
+    every time.
+
     Has to be called in the app.ready method.
     """
     projector_slides[name] = slide
+    projector_slide_dependencies[name] = (
+        None if dependencies is None else frozenset(dependencies)
+    )
+
+
+class ProjectorCache:
+    """
+    Process local cache for the data of the projectors.
+
+    Keeps a decoded copy of all elements. After a change, only the changed
+    elements are loaded from the element cache.
+
+    The calculated data of each projector element is saved. It is removed,
+    when a collection changes, that the slide depends on.
+
+    The listeners of the local element cache are used to find the changed
+    elements. If the local element cache is disabled, all data is loaded and
+    calculated on every call.
+    """
+
+    def __init__(self) -> None:
+        self.local_cache: Optional[LocalElementCache] = None
+
+        # The generation is increased every time elements change.
+        self.generation = 0
+        self.clear()
+
+    def clear(self) -> None:
+        self.all_data: Optional[AllData] = None
+        self.changed_element_ids: Set[str] = set()
+        self.slide_data: Dict[Tuple[int, str], Dict[str, Any]] = {}
+        self.generation += 1
+
+    def elements_changed(self, element_ids: Optional[List[str]]) -> None:
+        """
+        Listener for the local element cache.
+        """
+        if element_ids is None:
+            self.clear()
+            return
+
+        self.generation += 1
+        self.changed_element_ids.update(element_ids)
+        collection_strings = set(
+            split_element_id(element_id)[0] for element_id in element_ids
+        )
+        for key in list(self.slide_data.keys()):
+            dependencies = projector_slide_dependencies.get(
+                self.slide_data[key]["element"]["name"]
+            )
+            if dependencies is None or not dependencies.isdisjoint(collection_strings):
+                del self.slide_data[key]
+
+    async def get_all_data(self) -> Tuple[AllData, Optional[int]]:
+        """
+        Returns all elements ordered by collection_string and id.
+
+        The second value is the generation of the data. It is None, if the
+        data is not up to date and the calculated slides must not be saved.
+
+        The returned data must not be changed.
+        """
+        local_cache = element_cache.local_cache
+        if local_cache is not self.local_cache:
+            # This is the first call or the local element cache was replaced.
+            self.clear()
+            self.local_cache = local_cache
+            if local_cache.max_size:
+                local_cache.add_listener(self.elements_changed)
+
+        if not local_cache.max_size:
+            return (await element_cache.get_all_full_data_ordered(), None)
+
+        await element_cache.update_local_cache()
+        generation = self.generation
+        if self.all_data is None:
+            self.changed_element_ids = set()
+            all_data = await element_cache.get_all_full_data_ordered()
+            if generation != self.generation:
+                return (all_data, None)
+            self.all_data = all_data
+            return (all_data, generation)
+
+        if not self.changed_element_ids:
+            return (self.all_data, generation)
+
+        element_ids = list(self.changed_element_ids)
+        self.changed_element_ids = set()
+        try:
+            elements = await element_cache.get_elements_full_data(element_ids)
+        except Exception:
+            self.changed_element_ids.update(element_ids)
+            raise
+
+        # Copy all changed collections, because the old data could still be
+        # used by other calls.
+        all_data = dict(self.all_data)
+        copied: Set[str] = set()
+        for element_id, element in elements.items():
+            collection_string, id = split_element_id(element_id)
+            if collection_string not in copied:
+                all_data[collection_string] = dict(all_data.get(collection_string, {}))
+                copied.add(collection_string)
+            if element is None:
+                all_data[collection_string].pop(id, None)
+            else:
+                all_data[collection_string][id] = element
+
+        if generation != self.generation:
+            # Some elements changed while the data was loaded.
+            self.changed_element_ids.update(element_ids)
+            return (all_data, None)
+        self.all_data = all_data
+        return (all_data, generation)
+
+    def get_slide_data(
+        self,
+        all_data: AllData,
+        generation: Optional[int],
+        element: Dict[str, Any],
+        projector_id: int,
+    ) -> Dict[str, Any]:
+        """
+        Returns the data for one projector element.
+
+        all_data and generation have to be the values from get_all_data().
+        """
+        key = (projector_id, json.dumps(element, sort_keys=True))
+        try:
+            return self.slide_data[key]
+        except KeyError:
+            pass
+
+        projector_slide = projector_slides[element["name"]]
+        try:
+            data = projector_slide(all_data, element, projector_id)
+        except ProjectorElementException as err:
+            data = {"error": str(err)}
+        slide_data = {"data": data, "element": element}
+
+        if (
+            generation == self.generation
+            and projector_slide_dependencies.get(element["name"]) is not None
+        ):
+            self.slide_data[key] = slide_data
+        return slide_data
+
+
+projector_cache = ProjectorCache()
+
+
+def get_collection_index(
+    all_data: AllData,
+    collection_string: str,
+    build_index: Callable[[Dict[int, Dict[str, Any]]], T],
+) -> T:
+    """
+    Returns an index over one collection of all_data, for example a dict from
+    a parent id to all children.
+
+    build_index is called with all elements of the collection and has to
+    return the index. The index is saved until the collection changes. The
+    ProjectorCache replaces the dict of a collection, when an element in it
+    changes, so each index is only built once per change.
+
+    The elements in all_data and the returned index must not be changed.
+    """
+    collection = all_data.get(collection_string, {})
+    key = (collection_string, build_index)
+    saved = collection_indexes.get(key)
+    if saved is not None and saved[0] is collection:
+        return saved[1]
+
+    index = build_index(collection)
+    collection_indexes[key] = (collection, index)
+    return index
 
 
 async def get_projector_data(
@@ -67,7 +278,7 @@ async def get_projector_data(
     if projector_ids is None:
         projector_ids = []
 
-    all_data = await element_cache.get_all_full_data_ordered()
+    all_data, generation = await projector_cache.get_all_data()
     projector_data: Dict[int, List[Dict[str, Any]]] = {}
 
     for projector_id, projector in all_data.get("core/projector", {}).items():
@@ -81,16 +292,39 @@ async def get_projector_data(
 
         projector_data[projector_id] = []
         for element in projector["elements"]:
-            projector_slide = projector_slides[element["name"]]
-            try:
-                data = projector_slide(all_data, element, projector_id)
-            except ProjectorElementException as err:
-                data = {"error": str(err)}
-            projector_data[projector_id].append({"data": data, "element": element})
+            projector_data[projector_id].append(
+                projector_cache.get_slide_data(
+                    all_data, generation, element, projector_id
+                )
+            )
 
     return projector_data
 
 
+def get_projector_payload(data: List[Dict[str, Any]]) -> ProjectorPayload:
+    """
+    Returns the data of one projector as json together with a hash of the
+    json.
+    """
+    text = json_dumps(data)
+    return {"hash": hashlib.sha1(text.encode()).hexdigest(), "json": text}
+
+
+def get_projector_payloads(
+    projector_data: Dict[int, List[Dict[str, Any]]]
+) -> Dict[int, ProjectorPayload]:
+    """
+    Returns the payloads for the data from get_projector_data().
+
+    The payloads are calculated once per change and sent to all consumers, so
+    they do not have to encode and hash the data themselves.
+    """
+    return {
+        projector_id: get_projector_payload(data)
+        for projector_id, data in projector_data.items()
+    }
+
+
 def get_config(all_data: AllData, key: str) -> Any:
     """
     Returns a config value from all_data.
@@ -1,4 +1,9 @@
-from typing import Any
+import asyncio
+import threading
+import time
+from collections import defaultdict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Set
+from weakref import WeakKeyDictionary
 
 from django.conf import settings
 
@@ -12,27 +17,302 @@ else:
     redis_address = getattr(settings, "REDIS_ADDRESS", "")
     use_redis = bool(redis_address)
 
+    # Size of the connection pool that is created for each event loop.
+    redis_pool_minsize = getattr(settings, "REDIS_POOL_MINSIZE", 1)
+    redis_pool_maxsize = getattr(settings, "REDIS_POOL_MAXSIZE", 10)
+
+    # Seconds a pool can be idle, before it is checked with a ping on the next
+    # use. 0 means that the pool is checked every time.
+    redis_pool_health_check_interval = getattr(
+        settings, "REDIS_POOL_HEALTH_CHECK_INTERVAL", 30
+    )
+
+    class CountingConnectionsPool(aioredis.ConnectionsPool):
+        """
+        Connection pool that counts the connections it opens.
+
+        The counter is global for all pools. It can be used to verify that the
+        connections are reused.
+        """
+
+        connections_opened = 0
+
+        def _create_new_connection(self, address: Any) -> Any:
+            CountingConnectionsPool.connections_opened += 1
+            return super()._create_new_connection(address)
+
+
+class RedisPoolHolder:
+    """
+    Holds one connection pool for each event loop.
+
+    Connections can not be shared between event loops. Because async_to_sync()
+    can create new event loops, there has to be one pool per loop. A pool is
+    closed, when its loop shuts down its async generators, like
+    async_to_sync() and asyncio.run() do before they close the loop. The
+    pools of loops that were closed without this are removed, when the next
+    pool is requested.
+
+    The loops can run in different threads, so the pools are only changed
+    while the lock is held.
+    """
+
+    def __init__(self) -> None:
+        self.pools: "WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Future]" = (
+            WeakKeyDictionary()
+        )
+        # The async generators, that close the pools. See close_on_shutdown().
+        self.closers: "WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncIterator[None]]" = (
+            WeakKeyDictionary()
+        )
+        self.last_used: Dict[int, float] = {}
+        self.lock = threading.Lock()
+
+    async def get_pool(self) -> "aioredis.Redis":
+        """
+        Returns the pool for the current event loop. Creates it, if it does not
+        exist or if it was closed.
+        """
+        loop = asyncio.get_event_loop()
+        self.close_orphaned_pools()
+
+        with self.lock:
+            future = self.pools.get(loop)
+            if future is None:
+                future = asyncio.ensure_future(self.create_pool())
+                self.pools[loop] = future
+
+        try:
+            redis = await future
+        except Exception:
+            # Do not save a pool that could not be created.
+            with self.lock:
+                self.pools.pop(loop, None)
+            raise
+
+        if redis.closed:
+            with self.lock:
+                self.pools.pop(loop, None)
+            return await self.get_pool()
+
+        if not await self.is_healthy(redis):
+            self.drop_pool(loop)
+            return await self.get_pool()
+        return redis
+
+    async def create_pool(self) -> "aioredis.Redis":
+        redis = await aioredis.create_redis_pool(
+            redis_address,
+            minsize=redis_pool_minsize,
+            maxsize=redis_pool_maxsize,
+            pool_cls=CountingConnectionsPool,
+        )
+        closer = self.close_on_shutdown(redis)
+        # Start the generator, so the loop knows it.
+        await closer.__anext__()
+        with self.lock:
+            self.closers[asyncio.get_event_loop()] = closer
+        return redis
+
+    async def close_on_shutdown(self, redis: "aioredis.Redis") -> AsyncIterator[None]:
+        """
+        Async generator, that closes the pool when it is finalized.
+
+        The event loop finalizes all started async generators in
+        loop.shutdown_asyncgens(), while it is still running. So the
+        connections are closed before the loop is closed.
+        """
+        try:
+            yield
+        finally:
+            self.last_used.pop(id(redis), None)
+            redis.close()
+            await redis.wait_closed()
+
+    async def is_healthy(self, redis: "aioredis.Redis") -> bool:
+        """
+        Sends a ping, if the pool was not used for some time.
+        """
+        now = time.monotonic()
+        last_used = self.last_used.get(id(redis), now)
+        self.last_used[id(redis)] = now
+        if now - last_used < redis_pool_health_check_interval:
+            return True
+        try:
+            await redis.ping()
+        except (aioredis.RedisError, OSError):
+            return False
+        return True
+
+    def drop_pool(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """
+        Closes and removes the pool of a loop. The next call of get_pool() will
+        create a new one.
+        """
+        if loop is None:
+            loop = asyncio.get_event_loop()
+        with self.lock:
+            future = self.pools.pop(loop, None)
+            # Without a reference, the loop finalizes the generator.
+            self.closers.pop(loop, None)
+        if future is not None and future.done() and not future.exception():
+            redis = future.result()
+            self.last_used.pop(id(redis), None)
+            redis.close()
+
+    def close_orphaned_pools(self) -> None:
+        """
+        Removes the pools of event loops, that were closed without shutting
+        down their async generators.
+
+        Their connections can not be closed anymore, because this needs the
+        loop. Without a reference, the transports close their sockets when
+        they are garbage collected.
+        """
+        with self.lock:
+            for loop in list(self.pools.keys()):
+                if loop.is_closed():
+                    future = self.pools.pop(loop)
+                    self.closers.pop(loop, None)
+                    if future.done() and not future.cancelled():
+                        if not future.exception():
+                            self.last_used.pop(id(future.result()), None)
+
+
+pool_holder = RedisPoolHolder()
+
 
 class RedisConnectionContextManager:
     """
     Async context manager for connections
+
+    Returns the connection pool of the current event loop. If an connection
+    error occures, the pool is dropped, so the next access reconnects.
     """
 
     # TODO: contextlib.asynccontextmanager can be used in python 3.7
 
-    def __init__(self, redis_address: str) -> None:
-        self.redis_address = redis_address
-
-    async def __aenter__(self) -> "aioredis.RedisConnection":
-        self.conn = await aioredis.create_redis(self.redis_address)
-        return self.conn
+    async def __aenter__(self) -> "aioredis.Redis":
+        return await pool_holder.get_pool()
 
     async def __aexit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
-        self.conn.close()
+        if exc_type is not None and issubclass(
+            exc_type, (aioredis.ConnectionClosedError, ConnectionError)
+        ):
+            pool_holder.drop_pool()
+
+
+class Subscription:
+    """
+    Subscription to a redis channel in one event loop.
+
+    Uses its own connection, because a subscribed connection can not send other
+    commands. Resolves the futures in waiters, when their message is published.
+    """
+
+    def __init__(self, channel_name: str) -> None:
+        self.channel_name = channel_name
+        self.waiters: Dict[str, Set[asyncio.Future]] = defaultdict(set)
+        self.users = 0
+        self.conn: Optional["aioredis.Redis"] = None
+        self.reader: Optional[asyncio.Future] = None
+        self.ready = asyncio.ensure_future(self.subscribe())
+
+    async def subscribe(self) -> None:
+        self.conn = await aioredis.create_redis(redis_address)
+        CountingConnectionsPool.connections_opened += 1
+        channel, = await self.conn.subscribe(self.channel_name)
+        self.reader = asyncio.ensure_future(self.read_messages(channel))
+
+    async def read_messages(self, channel: "aioredis.Channel") -> None:
+        try:
+            while await channel.wait_message():
+                message = (await channel.get()).decode()
+                for future in self.waiters.pop(message, ()):
+                    if not future.done():
+                        future.set_result(None)
+        finally:
+            # Wake up all waiters, so they check their condition again.
+            for futures in self.waiters.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_result(None)
+
+    def close(self) -> None:
+        self.ready.cancel()
+        if self.reader is not None:
+            self.reader.cancel()
+        if self.conn is not None:
+            self.conn.close()
+
+
+class ChannelListener:
+    """
+    Lets coroutines wait for messages on a redis channel.
+
+    All waiters of one event loop share one subscription. It is created with
+    the first waiter and closed, when the last waiter is done. So any number of
+    coroutines can wait with only one connection.
+    """
+
+    def __init__(self, channel_name: str) -> None:
+        self.channel_name = channel_name
+        self.subscriptions: "WeakKeyDictionary[asyncio.AbstractEventLoop, Subscription]" = (
+            WeakKeyDictionary()
+        )
+
+    async def wait(self, message: str, check: Callable[[], Awaitable[float]]) -> None:
+        """
+        Waits until check() returns 0.
+
+        check() is called first after the channel is subscribed and then each
+        time message is published. It returns the number of seconds to wait at
+        most, before it is called again. So messages that get lost (for
+        example on connection errors) only delay the waiter.
+        """
+        loop = asyncio.get_event_loop()
+        subscription = self.subscriptions.get(loop)
+        if subscription is None:
+            subscription = Subscription(self.channel_name)
+            self.subscriptions[loop] = subscription
+        subscription.users += 1
+        try:
+            try:
+                await asyncio.shield(subscription.ready)
+            except (aioredis.RedisError, OSError):
+                # Without subscription, check() is called after each timeout.
+                pass
+
+            while True:
+                # Register the future before checking, so no message is missed.
+                future = loop.create_future()
+                subscription.waiters[message].add(future)
+                try:
+                    timeout = await check()
+                    if not timeout:
+                        return
+                    await asyncio.wait_for(future, timeout)
+                except asyncio.TimeoutError:
+                    pass
+                finally:
+                    subscription.waiters.get(message, set()).discard(future)
+        finally:
+            subscription.users -= 1
+            if not subscription.users:
+                if self.subscriptions.get(loop) is subscription:
+                    del self.subscriptions[loop]
+                subscription.close()
 
 
 def get_connection() -> RedisConnectionContextManager:
     """
     Returns contextmanager for a redis connection.
     """
-    return RedisConnectionContextManager(redis_address)
+    return RedisConnectionContextManager()
+
+
+def get_opened_connections() -> int:
+    """
+    Returns the number of redis connections, that were opened by this process.
+    """
+    return CountingConnectionsPool.connections_opened
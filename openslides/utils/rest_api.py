@@ -196,9 +196,12 @@ class ModelSerializerRegisterer(SerializerMetaclass):
         Detects the corresponding model from the ModelSerializer by
         looking into the Meta-class.
 
-        Does nothing, if the Meta-class does not have the model attribute.
+        Does nothing, if the Meta-class does not have the model attribute or
+        if the class sets the attribute register_serializer to False.
         """
         serializer_class = super().__new__(cls, name, bases, attrs)
+        if not attrs.get("register_serializer", True):
+            return serializer_class
         try:
             model = serializer_class.Meta.model
         except AttributeError:
@@ -244,10 +247,10 @@ class ListModelMixin(_ListModelMixin):
             # The corresponding queryset does not support caching.
             response = super().list(request, *args, **kwargs)
         else:
-            all_restricted_data = async_to_sync(element_cache.get_all_restricted_data)(
-                request.user.pk or 0
-            )
-            response = Response(all_restricted_data.get(collection_string, []))
+            restricted_data = async_to_sync(
+                element_cache.get_collection_restricted_data
+            )(request.user.pk or 0, collection_string)
+            response = Response(restricted_data)
         return response
 
 
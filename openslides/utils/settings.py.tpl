@@ -75,6 +75,40 @@ DATABASES = {
 }
 
 
+# Number of elements, that every worker keeps decoded in its memory. The
+# elements are removed when they are changed. Set it to 0 to disable the
+# local cache.
+LOCAL_ELEMENT_CACHE_SIZE = 10000
+
+# Number of threads, that load the collections from the database when the
+# cache is built. Each thread uses its own database connection. 0 loads one
+# collection after another.
+ELEMENT_CACHE_BUILD_THREADS = 0
+
+# Number of changed elements, that are saved with their change_id. Only the
+# last change of each element is saved. When there are more, the oldest
+# changes are removed. Clients, that know only removed changes, have to load
+# all data. 0 saves all changes.
+ELEMENT_CACHE_MAX_CHANGED_ELEMENTS = 100000
+
+
+# Milliseconds, that a worker waits before it sends an autoupdate. All changes
+# within this time are sent as one autoupdate. A value between 50 and 200 can
+# reduce the load when there are many changes. 0 sends each change directly.
+AUTOUPDATE_DELAY = 0
+
+
+# Number of processes, that hash the passwords when many users are imported.
+# 0 hashes them in the worker itself. A value like 4 makes big imports faster
+# on servers with many cores.
+USER_IMPORT_PROCESSES = 0
+
+
+# Library to encode and decode json. Can be 'orjson', 'ujson' or 'json'. If it
+# is empty, orjson or ujson is used, if it is installed.
+JSON_BACKEND = ''
+
+
 # Set use_redis to True to activate redis as cache-, asgi- and session backend.
 use_redis = False
 
@@ -99,6 +133,18 @@ if use_redis:
     # or a unix domain socket path string — "/path/to/redis.sock".
     REDIS_ADDRESS = "redis://127.0.0.1"
 
+    # Each worker keeps a pool of connections to redis. The minimum and maximum
+    # number of connections can be set here. A pool, that was unused for
+    # REDIS_POOL_HEALTH_CHECK_INTERVAL seconds, is checked before it is used.
+    REDIS_POOL_MINSIZE = 1
+    REDIS_POOL_MAXSIZE = 10
+    REDIS_POOL_HEALTH_CHECK_INTERVAL = 30
+
+    # Save the data of each collection in its own redis hash. Then a collection
+    # can be read without loading all other collections. An existing cache is
+    # converted on the next start. False uses one hash for all collections.
+    REDIS_CACHE_PER_COLLECTION = True
+
     # When use_redis is True, the restricted data cache caches the data individuel
     # for each user. This requires a lot of memory if there are a lot of active
     # users.
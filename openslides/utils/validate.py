@@ -1,3 +1,7 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
 import bleach
 
 
@@ -51,13 +55,40 @@ allowed_styles = [
 ]
 
 
+# Number of validated html strings, that are saved. Motion texts can be large,
+# so the number is kept small.
+validated_html_max_size = 128
+
+# The last results of validate_html(). The keys are the sha1 hashes of the
+# html.
+validated_html: "OrderedDict[bytes, str]" = OrderedDict()
+validated_html_lock = threading.Lock()
+
+
 def validate_html(html: str) -> str:
     """
     This method takes a string and escapes all non-whitelisted html entries.
     Every field of a model that is loaded trusted in the DOM should be validated.
     During copy and paste from Word maybe some tabs are spread over the html. Remove them.
+
+    The last results are saved, because clients send the same large texts
+    again, when other fields of an element change.
     """
-    html = html.replace("\t", "")
-    return bleach.clean(
-        html, tags=allowed_tags, attributes=allowed_attributes, styles=allowed_styles
+    # Lone surrogates can not be encoded as utf-8 otherwise.
+    key = hashlib.sha1(html.encode("utf-8", "surrogatepass")).digest()
+    with validated_html_lock:
+        if key in validated_html:
+            validated_html.move_to_end(key)
+            return validated_html[key]
+
+    result = bleach.clean(
+        html.replace("\t", ""),
+        tags=allowed_tags,
+        attributes=allowed_attributes,
+        styles=allowed_styles,
     )
+    with validated_html_lock:
+        validated_html[key] = result
+        while len(validated_html) > validated_html_max_size:
+            validated_html.popitem(last=False)
+    return result
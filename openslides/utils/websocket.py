@@ -3,9 +3,11 @@ from typing import Any, Dict, List, Optional
 
 import jsonschema
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from channels.layers import get_channel_layer
 
 from .autoupdate import AutoupdateFormat
 from .cache import element_cache
+from .json_codec import json_dumps, json_loads
 from .utils import split_element_id
 
 
@@ -31,12 +33,20 @@ class ProtocollAsyncJsonWebsocketConsumer(AsyncJsonWebsocketConsumer):
             out["in_response"] = in_response
         await super().send_json(out)
 
+    @classmethod
+    async def decode_json(cls, text_data: str) -> Any:
+        return json_loads(text_data)
+
+    @classmethod
+    async def encode_json(cls, content: Any) -> str:
+        return json_dumps(content)
+
     async def receive_json(self, content: Any) -> None:
         """
         Receives the json data, parses it and calls receive_content.
         """
         try:
-            jsonschema.validate(content, schema)
+            validate_message(content)
         except jsonschema.ValidationError as err:
             try:
                 in_response = content["id"]
@@ -75,6 +85,38 @@ schema: Dict[str, Any] = {
     "anyOf": [],  # This will be filled in register_client_message()
 }
 
+envelope_validator = jsonschema.Draft7Validator(
+    {key: value for key, value in schema.items() if key != "anyOf"}
+)
+"""
+Validator for the properties, that all messages have.
+"""
+
+message_validators: Dict[str, jsonschema.Draft7Validator] = {}
+"""
+Validators for the messages ordered by there identifier. They are created in
+register_client_message().
+"""
+
+
+def validate_message(content: Any) -> None:
+    """
+    Validates a message from a client against the schema.
+
+    Does the same as jsonschema.validate(content, schema), but uses the
+    validators, that were created once. Only the schema of the type of the
+    message is used.
+
+    Raises jsonschema.ValidationError, if the message is invalid.
+    """
+    envelope_validator.validate(content)
+    message_validator = message_validators.get(content["type"])
+    if message_validator is None:
+        raise jsonschema.ValidationError(
+            f"{content['type']!r} is not a known message type"
+        )
+    message_validator.validate(content)
+
 
 class BaseWebsocketClientMessage:
     schema: Dict[str, object] = {}
@@ -138,6 +180,37 @@ def register_client_message(
 
     schema["anyOf"].append(message_schema)
 
+    jsonschema.Draft7Validator.check_schema(message_schema)
+    message_validators[
+        websocket_client_message.identifier
+    ] = jsonschema.Draft7Validator(message_schema)
+
+
+def get_user_group_name(user_id: int) -> str:
+    """
+    Returns the name of the channel group with all connections of an user. 0
+    is for the anonymous users.
+    """
+    return f"user-{user_id}"
+
+
+async def notify_user(user_id: int, name: str, content: Any) -> None:
+    """
+    Sends a notify message from the server to all connections of an user.
+
+    The message looks like a notify message of a client with the user as
+    sender, but without a senderChannelName.
+    """
+    await get_channel_layer().group_send(
+        get_user_group_name(user_id),
+        {
+            "type": "send_notify",
+            "incomming": {"name": name, "content": content},
+            "senderChannelName": "",
+            "senderUserId": user_id,
+        },
+    )
+
 
 async def get_element_data(user_id: int, change_id: int = 0) -> AutoupdateFormat:
     """
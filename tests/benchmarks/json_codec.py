@@ -0,0 +1,153 @@
+"""
+Benchmark for the json backends of openslides.utils.json_codec.
+
+Encodes and decodes the elements of a generated meeting element by element,
+like the element cache does, and prints the throughput of each installed
+backend.
+
+Run it with:
+
+    python -m tests.benchmarks.json_codec
+"""
+
+import os
+import random
+import time
+from typing import Any, Dict, List
+
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tests.settings")
+
+from openslides.utils.json_codec import backends  # noqa: E402 isort:skip
+
+
+def get_text(words: int) -> str:
+    return " ".join(
+        "".join(random.choice("abcdefghijklmnopqrstuvwxyzäöü") for _ in range(8))
+        for _ in range(words)
+    )
+
+
+def get_meeting(
+    users: int = 1000, motions: int = 500, items: int = 300
+) -> List[Dict[str, Any]]:
+    """
+    Returns the elements of a meeting with the given number of users, motions
+    and agenda items.
+    """
+    elements: List[Dict[str, Any]] = []
+    for id in range(1, users + 1):
+        elements.append(
+            {
+                "id": id,
+                "username": f"user{id}",
+                "title": "",
+                "first_name": get_text(1),
+                "last_name": get_text(1),
+                "structure_level": get_text(2),
+                "number": str(id),
+                "about_me": get_text(20),
+                "groups_id": [2, 3],
+                "is_present": bool(id % 2),
+                "is_committee": False,
+                "email": f"user{id}@example.com",
+                "last_email_send": None,
+                "comment": "",
+                "is_active": True,
+                "default_password": "",
+            }
+        )
+    for id in range(1, motions + 1):
+        elements.append(
+            {
+                "id": id,
+                "identifier": str(id),
+                "title": get_text(6),
+                "text": "<p>" + get_text(300) + "</p>",
+                "reason": "<p>" + get_text(100) + "</p>",
+                "modified_final_version": "",
+                "parent_id": None,
+                "amendment_paragraphs": None,
+                "category_id": 1,
+                "motion_block_id": None,
+                "origin": "",
+                "submitters": [
+                    {"id": id, "user_id": id % users + 1, "motion_id": id, "weight": 1}
+                ],
+                "supporters_id": list(range(1, 20)),
+                "comments": [],
+                "state_id": 1,
+                "state_extension": None,
+                "workflow_id": 1,
+                "recommendation_id": None,
+                "recommendation_extension": None,
+                "tags_id": [],
+                "attachments_id": [],
+                "polls": [],
+                "agenda_item_id": id,
+                "log_messages": [
+                    {"message_list": ["Motion created"], "time": "2019-01-01"}
+                ],
+                "sort_parent_id": None,
+                "weight": id,
+                "created": "2019-01-01T10:00:00+01:00",
+                "last_modified": "2019-01-01T10:00:00+01:00",
+                "change_recommendations_id": [],
+            }
+        )
+    for id in range(1, items + 1):
+        elements.append(
+            {
+                "id": id,
+                "item_number": str(id),
+                "title_information": {"title": get_text(6), "identifier": str(id)},
+                "comment": None,
+                "closed": False,
+                "type": 1,
+                "is_internal": False,
+                "is_hidden": False,
+                "duration": None,
+                "speakers": [
+                    {
+                        "id": id * 100 + speaker,
+                        "user_id": speaker,
+                        "begin_time": None,
+                        "end_time": None,
+                        "weight": speaker,
+                        "marked": False,
+                        "item_id": id,
+                    }
+                    for speaker in range(1, 11)
+                ],
+                "speaker_list_closed": False,
+                "content_object": {"collection": "motions/motion", "id": id},
+                "weight": id,
+                "parent_id": None,
+            }
+        )
+    return elements
+
+
+def main() -> None:
+    random.seed(0)
+    elements = get_meeting()
+    for name, (dumps, loads) in backends.items():
+        start = time.perf_counter()
+        encoded = [dumps(element).encode() for element in elements]
+        encode_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for data in encoded:
+            loads(data)
+        decode_time = time.perf_counter() - start
+
+        size = sum(len(data) for data in encoded)
+        print(
+            f"{name:8} {len(elements)} elements, {size / 1e6:.1f} MB: "
+            f"encode {size / encode_time / 1e6:.1f} MB/s, "
+            f"decode {size / decode_time / 1e6:.1f} MB/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
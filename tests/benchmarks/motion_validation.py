@@ -0,0 +1,83 @@
+"""
+Benchmark for the validation of motion texts on updates.
+
+Validates the data of a motion update like the MotionSerializer does and
+prints the time per update for different text sizes:
+
+* new: the text was never validated before.
+* memo: the text was validated before, for example by another motion.
+* unchanged: the text is the same as the stored text of the motion.
+
+The database is not used, so the time of the whole request is larger.
+
+Run it with:
+
+    python -m tests.benchmarks.motion_validation
+"""
+
+import os
+import time
+from typing import Any, Callable, Dict
+from unittest.mock import MagicMock
+
+import django
+
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tests.settings")
+django.setup()
+
+from openslides.motions.serializers import MotionSerializer  # noqa: E402 isort:skip
+from openslides.utils.validate import validated_html  # noqa: E402 isort:skip
+
+
+paragraph = (
+    '<p style="text-align: left;">Lorem ipsum <strong>dolor</strong> sit amet, '
+    '<a href="https://example.com">consetetur</a> sadipscing elitr.</p>\n'
+)
+
+
+def get_text(size: int) -> str:
+    """
+    Returns a html text with about size kilobytes.
+    """
+    return paragraph * (size * 1024 // len(paragraph) + 1)
+
+
+def measure(validate: Callable[[], Any], seconds: float) -> float:
+    """
+    Returns the milliseconds of one call of validate.
+    """
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        validate()
+        count += 1
+    return (time.perf_counter() - start) / count * 1000
+
+
+def main() -> None:
+    for size in (1, 10, 50, 200):
+        text = get_text(size)
+        data: Dict[str, Any] = {"title": "title", "text": text, "reason": text}
+
+        def validate_new() -> None:
+            validated_html.clear()
+            MotionSerializer(MagicMock(text="", reason="")).validate(dict(data))
+
+        def validate_memo() -> None:
+            MotionSerializer(MagicMock(text="", reason="")).validate(dict(data))
+
+        def validate_unchanged() -> None:
+            MotionSerializer(MagicMock(text=text, reason=text)).validate(dict(data))
+
+        new = measure(validate_new, 1)
+        memo = measure(validate_memo, 1)
+        unchanged = measure(validate_unchanged, 1)
+        print(
+            f"{size:4} KB text and reason: new {new:8.3f} ms, "
+            f"memo {memo:8.3f} ms, unchanged {unchanged:8.3f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark for the validation of websocket messages from the clients.
+
+Validates notify and listenToProjectors messages like a consumer does and
+prints the messages per second. For comparison, the messages are also
+validated with jsonschema.validate() against the whole schema.
+
+Run it with:
+
+    python -m tests.benchmarks.websocket_validation
+"""
+
+import os
+import time
+from typing import Any, Callable, Dict
+
+import django
+import jsonschema
+
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tests.settings")
+django.setup()
+
+from openslides.utils.websocket import schema, validate_message  # noqa: E402 isort:skip
+
+
+messages: Dict[str, Any] = {
+    "notify": {
+        "type": "notify",
+        "content": {
+            "name": "message",
+            "content": {"text": "Hello"},
+            "users": [1, 2, 3],
+            "replyChannels": ["some_channel"],
+        },
+        "id": "ab12cd34",
+    },
+    "listenToProjectors": {
+        "type": "listenToProjectors",
+        "content": {"projector_ids": [1, 2]},
+        "id": "ef56gh78",
+    },
+}
+
+
+def measure(validate: Callable[[Any], None], message: Any, seconds: float) -> float:
+    """
+    Returns the number of messages, that can be validated in one second.
+    """
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for _ in range(100):
+            validate(message)
+        count += 100
+    return count / (time.perf_counter() - start)
+
+
+def main() -> None:
+    for name, message in messages.items():
+        whole_schema = measure(
+            lambda message: jsonschema.validate(message, schema), message, 1
+        )
+        compiled = measure(validate_message, message, 1)
+        print(
+            f"{name:20} jsonschema.validate: {whole_schema:8.0f} messages/s, "
+            f"validate_message: {compiled:8.0f} messages/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -13,3 +13,14 @@ class TestItemManager(TestCase):
 
         with self.assertNumQueries(1):
             Item.objects.get_root_and_children()
+
+
+class TestItemElements(TestCase):
+    def test_get_elements_chunked(self):
+        for i in range(5):
+            Topic.objects.create(title=f"item{i}")
+
+        chunks = list(Item.get_elements_chunked(2))
+
+        assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+        assert sum(chunks, []) == Item.get_elements()
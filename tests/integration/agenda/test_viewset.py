@@ -1,3 +1,5 @@
+from unittest.mock import patch
+
 import pytest
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Permission
@@ -8,7 +10,7 @@ from rest_framework.test import APIClient
 from openslides.agenda.models import Item, Speaker
 from openslides.assignments.models import Assignment
 from openslides.core.config import config
-from openslides.core.models import Countdown
+from openslides.core.models import Countdown, History
 from openslides.motions.models import Motion
 from openslides.topics.models import Topic
 from openslides.users.models import Group
@@ -163,6 +165,124 @@ def test_agenda_item_db_queries():
     assert count_queries(Item.get_elements) == 6
 
 
+@pytest.mark.django_db(transaction=False)
+def test_number_all_db_queries():
+    """
+    Tests that the number of db queries does not depend on the number of
+    agenda items.
+
+    The history is not saved, because sqlite needs one query per element.
+    """
+    for index in range(5):
+        Topic.objects.create(title=f"topic{index}")
+    Item.objects.update(type=Item.AGENDA_ITEM)
+    with patch("openslides.utils.autoupdate.save_history"):
+        queries = count_queries(Item.objects.number_all)
+
+    for index in range(5, 30):
+        Topic.objects.create(title=f"topic{index}")
+    Item.objects.update(type=Item.AGENDA_ITEM, item_number="")
+
+    with patch("openslides.utils.autoupdate.save_history"):
+        assert count_queries(Item.objects.number_all) == queries
+
+
+class Sort(TestCase):
+    """
+    Tests view to sort the agenda
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.login(username="admin", password="admin")
+        self.items = [
+            Topic.objects.create(title=f"topic{index}").agenda_item
+            for index in range(3)
+        ]
+
+    def test_sort(self):
+        response = self.client.post(
+            reverse("item-sort"),
+            {
+                "nodes": [{"id": self.items[2].pk}, {"id": self.items[1].pk}],
+                "parent_id": self.items[0].pk,
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        item_1 = Item.objects.get(pk=self.items[1].pk)
+        item_2 = Item.objects.get(pk=self.items[2].pk)
+        self.assertEqual(item_1.parent_id, self.items[0].pk)
+        self.assertEqual(item_1.weight, 1)
+        self.assertEqual(item_2.parent_id, self.items[0].pk)
+        self.assertEqual(item_2.weight, 0)
+
+    def test_sort_history(self):
+        History.objects.all().delete()
+
+        response = self.client.post(
+            reverse("item-sort"),
+            {
+                "nodes": [{"id": self.items[2].pk}, {"id": self.items[1].pk}],
+                "parent_id": self.items[0].pk,
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        entries = History.objects.filter(element_id__startswith="agenda/item:")
+        self.assertEqual(
+            set(entry.element_id for entry in entries),
+            {f"agenda/item:{self.items[1].pk}", f"agenda/item:{self.items[2].pk}"},
+        )
+        self.assertEqual(set(entry.now for entry in entries), {entries[0].now})
+        for entry in entries:
+            self.assertEqual(entry.information, ["Agenda sorted"])
+            self.assertEqual(entry.user.username, "admin")
+
+    def test_sort_hierarchical_loop(self):
+        self.items[1].parent = self.items[0]
+        self.items[1].save()
+
+        response = self.client.post(
+            reverse("item-sort"),
+            {"nodes": [{"id": self.items[0].pk}], "parent_id": self.items[1].pk},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIsNone(Item.objects.get(pk=self.items[0].pk).parent_id)
+
+    def test_sort_hierarchical_loop_above_item(self):
+        self.items[1].parent = self.items[0]
+        self.items[1].save()
+
+        # The loop between the items 0 and 1 is above item 2.
+        response = self.client.post(
+            reverse("item-sort"),
+            {
+                "nodes": [{"id": self.items[2].pk}, {"id": self.items[0].pk}],
+                "parent_id": self.items[1].pk,
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIsNone(Item.objects.get(pk=self.items[0].pk).parent_id)
+        self.assertIsNone(Item.objects.get(pk=self.items[2].pk).parent_id)
+
+    def test_sort_unknown_parent(self):
+        response = self.client.post(
+            reverse("item-sort"),
+            {"nodes": [{"id": self.items[0].pk}], "parent_id": 0},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIsNone(Item.objects.get(pk=self.items[0].pk).parent_id)
+
+
 class ManageSpeaker(TestCase):
     """
     Tests managing speakers.
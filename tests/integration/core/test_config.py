@@ -0,0 +1,61 @@
+import json
+from unittest.mock import patch
+
+import pytest
+from asgiref.sync import async_to_sync
+
+from openslides.core.config import config
+from openslides.utils.cache import element_cache
+
+
+@pytest.mark.django_db(transaction=False)
+def test_config_values_are_loaded_once():
+    config["general_event_name"]
+
+    with patch.object(
+        element_cache,
+        "get_collection_full_data",
+        wraps=element_cache.get_collection_full_data,
+    ) as get_collection_full_data, patch.object(
+        element_cache, "update_local_cache", wraps=element_cache.update_local_cache
+    ) as update_local_cache:
+        config["general_event_name"]
+        config["agenda_number_prefix"]
+        async_to_sync(config.async_get)("motions_identifier")
+
+    assert not get_collection_full_data.called
+    # Each access checks for changes of other processes.
+    assert update_local_cache.call_count == 3
+
+
+@pytest.mark.django_db(transaction=False)
+def test_config_changed_in_other_process():
+    config["general_event_name"]
+    config_id = config.key_to_id["general_event_name"]  # type: ignore
+    element_id = f"{config.get_collection_string()}:{config_id}"
+
+    # Change the element like another process, without informing the local
+    # cache of this process.
+    async_to_sync(element_cache.cache_provider.add_elements)(
+        [
+            element_id,
+            json.dumps(
+                {"id": config_id, "key": "general_event_name", "value": "Other"}
+            ),
+        ]
+    )
+    async_to_sync(element_cache.cache_provider.add_changed_elements)(
+        element_cache.start_time + 1, [element_id]
+    )
+
+    assert config["general_event_name"] == "Other"
+
+
+@pytest.mark.django_db(transaction=False)
+def test_config_changed_value():
+    config["general_event_name"]
+
+    config["general_event_name"] = "Test Event"
+
+    assert config["general_event_name"] == "Test Event"
+    assert async_to_sync(config.async_get)("general_event_name") == "Test Event"
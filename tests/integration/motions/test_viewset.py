@@ -1,6 +1,8 @@
 import json
+from unittest.mock import patch
 
 import pytest
+from asgiref.sync import async_to_sync
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from rest_framework import status
@@ -10,6 +12,7 @@ from openslides.core.config import config
 from openslides.core.models import Tag
 from openslides.motions.models import (
     Category,
+    IdentifierAllocator,
     Motion,
     MotionBlock,
     MotionChangeRecommendation,
@@ -23,6 +26,7 @@ from openslides.motions.models import (
 )
 from openslides.utils.auth import get_group_model
 from openslides.utils.autoupdate import inform_changed_data
+from openslides.utils.cache import element_cache
 from openslides.utils.test import TestCase
 
 from ..helpers import count_queries
@@ -1500,6 +1504,50 @@ class SupportMotion(TestCase):
             response.data, {"detail": "You have supported this motion successfully."}
         )
 
+    def test_support_full_data(self):
+        config["motions_min_supporters"] = 1
+        self.motion.write_log(["Motion created"])
+
+        self.client.post(reverse("motion-support", args=[self.motion.pk]))
+
+        full_data = async_to_sync(element_cache.get_element_full_data)(
+            "motions/motion", self.motion.pk
+        )
+        motion = Motion.objects.get(pk=self.motion.pk)
+        self.assertEqual(full_data, motion.get_full_data())
+        self.assertEqual(full_data["supporters_id"], [self.admin.pk])
+        self.assertEqual(len(full_data["log_messages"]), 2)
+
+    def test_support_changed_meanwhile(self):
+        """
+        Tests, that the motion is loaded from the database, if another worker
+        changed it after it was read for the patch.
+        """
+        config["motions_min_supporters"] = 1
+        Motion.objects.filter(pk=self.motion.pk).update(title="changed")
+        get_element_full_data = element_cache.get_element_full_data
+
+        async def changed_meanwhile(collection_string, id):
+            full_data = await get_element_full_data(collection_string, id)
+            if collection_string == "motions/motion":
+                # Another worker changes the motion.
+                await element_cache.change_elements(
+                    {f"motions/motion:{id}": {**full_data, "title": "changed"}}
+                )
+            return full_data
+
+        with patch.object(element_cache, "get_element_full_data", changed_meanwhile):
+            self.client.post(reverse("motion-support", args=[self.motion.pk]))
+
+        full_data = async_to_sync(element_cache.get_element_full_data)(
+            "motions/motion", self.motion.pk
+        )
+        self.assertEqual(
+            full_data, Motion.objects.get(pk=self.motion.pk).get_full_data()
+        )
+        self.assertEqual(full_data["title"], "changed")
+        self.assertEqual(full_data["supporters_id"], [self.admin.pk])
+
     def test_unsupport(self):
         config["motions_min_supporters"] = 1
         self.motion.supporters.add(self.admin)
@@ -1570,6 +1618,124 @@ class SetState(TestCase):
         self.assertEqual(Motion.objects.get(pk=self.motion.pk).state.name, "submitted")
 
 
+class ManageMultipleState(TestCase):
+    """
+    Tests setting the states of many motions.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.login(username="admin", password="admin")
+        self.motions = self.create_motions(2)
+        Motion.objects.create(title="other", text="text", identifier="1")
+        self.state_id_accepted = 2  # This should be the id of the state 'accepted'.
+
+    def create_motions(self, count):
+        """
+        Creates motions without identifiers.
+        """
+        motions = [
+            Motion.objects.create(title=f"motion{index}", text="text")
+            for index in range(count)
+        ]
+        Motion.objects.filter(pk__in=[motion.pk for motion in motions]).update(
+            identifier=None, identifier_number=None
+        )
+        return motions
+
+    def post(self, motions):
+        return self.client.post(
+            reverse("motion-manage-multiple-state"),
+            {
+                "motions": [
+                    {"id": motion.pk, "state": self.state_id_accepted}
+                    for motion in motions
+                ]
+            },
+            format="json",
+        )
+
+    def test_manage_multiple_state(self):
+        response = self.post(self.motions)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        motion0 = Motion.objects.get(pk=self.motions[0].pk)
+        motion1 = Motion.objects.get(pk=self.motions[1].pk)
+        self.assertEqual(motion0.state.name, "accepted")
+        self.assertEqual(motion1.state.name, "accepted")
+        self.assertEqual(motion0.identifier, "2")
+        self.assertEqual(motion1.identifier, "3")
+
+    def test_manage_multiple_state_agenda_items(self):
+        response = self.post(self.motions)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for motion in self.motions:
+            item = async_to_sync(element_cache.get_element_full_data)(
+                "agenda/item", motion.agenda_item.pk
+            )
+            self.assertEqual(
+                item["title_information"]["identifier"],
+                Motion.objects.get(pk=motion.pk).identifier,
+            )
+
+    def test_manage_multiple_state_identifier_used_meanwhile(self):
+        other = Motion.objects.get(identifier="1")
+
+        def identifier_allocator():
+            allocator = IdentifierAllocator()
+            # Another request uses the first new identifier.
+            Motion.objects.filter(pk=other.pk).update(identifier="2")
+            return allocator
+
+        with patch(
+            "openslides.motions.views.IdentifierAllocator", identifier_allocator
+        ):
+            response = self.post(self.motions)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Motion.objects.get(pk=self.motions[0].pk).identifier, "3")
+        self.assertEqual(Motion.objects.get(pk=self.motions[1].pk).identifier, "4")
+
+    def test_manage_multiple_state_invalid_state(self):
+        other_workflow_state = State.objects.exclude(
+            workflow=self.motions[0].state.workflow
+        ).first()
+        response = self.client.post(
+            reverse("motion-manage-multiple-state"),
+            {
+                "motions": [
+                    {"id": self.motions[0].pk, "state": self.state_id_accepted},
+                    {"id": self.motions[1].pk, "state": other_workflow_state.pk},
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            Motion.objects.get(pk=self.motions[0].pk).state.name, "submitted"
+        )
+
+    def test_manage_multiple_state_db_queries(self):
+        """
+        Tests that the number of db queries for the motions and identifiers
+        does not depend on the number of motions. The log messages and the
+        autoupdate still need queries for each motion.
+        """
+        with patch("openslides.utils.autoupdate.save_history"), patch.object(
+            Motion, "write_log"
+        ), patch("openslides.motions.views.inform_changed_data"):
+            queries = count_queries(self.post, self.motions)
+
+        motions = self.create_motions(10)
+
+        with patch("openslides.utils.autoupdate.save_history"), patch.object(
+            Motion, "write_log"
+        ), patch("openslides.motions.views.inform_changed_data"):
+            self.assertEqual(count_queries(self.post, motions), queries)
+
+
 class SetRecommendation(TestCase):
     """
     Tests setting a recommendation.
@@ -1858,6 +2024,65 @@ class NumberMotionsInCategory(TestCase):
             "test_prefix_ahz6tho2mooH8 1",
         )
 
+    def test_numbering_amendments(self):
+        self.motion.identifier = "old_identifier"
+        self.motion.save()
+        amendment = Motion.objects.create(
+            title="test_title_ohsh3ieNgei9uFeiVah6",
+            text="test_text_ieth3Fiupaeh4Eequ7ah",
+            parent=self.motion,
+            identifier="old_identifier - 1",
+        )
+
+        response = self.client.post(
+            reverse("category-numbering", args=[self.category.pk])
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        motion_identifier = Motion.objects.get(pk=self.motion.pk).identifier
+        self.assertTrue(motion_identifier.startswith("test_prefix_ahz6tho2mooH8 "))
+        self.assertEqual(
+            Motion.objects.get(pk=amendment.pk).identifier, f"{motion_identifier} - 1"
+        )
+
+    def test_numbering_identifier_outside_category(self):
+        Motion.objects.create(
+            title="test_title_Yei5aeth9tahnoo8Aiph",
+            text="test_text_ahXoh2ahth0Aich3aeWu",
+            identifier="test_prefix_ahz6tho2mooH8 2",
+        )
+
+        response = self.client.post(
+            reverse("category-numbering", args=[self.category.pk])
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data,
+            {
+                "detail": 'Numbering aborted because the motion identifier "test_prefix_ahz6tho2mooH8 2" already exists outside of this category.'
+            },
+        )
+        self.assertEqual(Motion.objects.get(pk=self.motion.pk).identifier, None)
+
+    def test_numbering_db_queries(self):
+        """
+        Tests that the number of db queries does not depend on the number of
+        motions. The history is not saved, because sqlite needs one query per
+        element.
+        """
+        url = reverse("category-numbering", args=[self.category.pk])
+        with patch("openslides.utils.autoupdate.save_history"):
+            queries = count_queries(self.client.post, url)
+
+        for index in range(10):
+            Motion.objects.create(
+                title=f"motion{index}", text="text", category=self.category
+            )
+
+        with patch("openslides.utils.autoupdate.save_history"):
+            self.assertEqual(count_queries(self.client.post, url), queries)
+
 
 class FollowRecommendationsForMotionBlock(TestCase):
     """
@@ -1,5 +1,8 @@
+from unittest.mock import patch
+
 import pytest
 from django.core import mail
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -310,6 +313,118 @@ class UserMassImport(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(User.objects.count(), 3)
 
+    def test_mass_import_errors(self):
+        users = [
+            {"first_name": "first_name_Ohh2Eiphoo", "groups_id": [3]},
+            {"first_name": "", "importTrackId": 2},
+            {"username": "admin", "importTrackId": 3},
+            {"username": "username_Thae2Boo3u", "groups_id": [42]},
+            {"first_name": "first_name_Ohh2Eiphoo", "importTrackId": 5},
+        ]
+        response = self.client.post(
+            reverse("user-mass-import"), {"users": users}, format="json"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["importedTrackIds"], [5])
+        self.assertEqual(
+            [
+                (error["index"], error["importTrackId"])
+                for error in response.data["errors"]
+            ],
+            [(1, 2), (2, 3), (3, None)],
+        )
+        self.assertEqual(
+            list(
+                User.objects.filter(username__startswith="first_name_Ohh2Eiphoo")
+                .values_list("username", flat=True)
+                .order_by("pk")
+            ),
+            ["first_name_Ohh2Eiphoo", "first_name_Ohh2Eiphoo 1"],
+        )
+        user = User.objects.get(username="first_name_Ohh2Eiphoo")
+        self.assertEqual(list(user.groups.values_list("pk", flat=True)), [3])
+        self.assertTrue(user.check_password(user.default_password))
+
+    @override_settings(USER_IMPORT_PROCESSES=2)
+    def test_mass_import_processes(self):
+        users = [{"username": f"user{index}", "groups_id": [3]} for index in range(5)]
+        with patch("openslides.users.views.user_import_batch_size", 2):
+            response = self.client.post(
+                reverse("user-mass-import"), {"users": users}, format="json"
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["errors"], [])
+        for user in User.objects.filter(username__startswith="user"):
+            self.assertTrue(user.check_password(user.default_password))
+            self.assertEqual(list(user.groups.values_list("pk", flat=True)), [3])
+
+    def test_mass_import_username_created_meanwhile(self):
+        users = [
+            {"username": f"user{index}", "importTrackId": index} for index in range(3)
+        ]
+        bulk_create_users = User.objects.bulk_create_users
+
+        def bulk_create_users_with_race(users_data, executor=None):
+            # Another request creates one of the usernames.
+            if not User.objects.filter(username="user0").exists():
+                User.objects.create(username="user0")
+            return bulk_create_users(users_data, executor)
+
+        with patch("openslides.users.views.user_import_batch_size", 2), patch.object(
+            User.objects, "bulk_create_users", bulk_create_users_with_race
+        ):
+            response = self.client.post(
+                reverse("user-mass-import"), {"users": users}, format="json"
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["importedTrackIds"], [2])
+        self.assertEqual(
+            [
+                (error["index"], error["importTrackId"])
+                for error in response.data["errors"]
+            ],
+            [(0, 0), (1, 1)],
+        )
+        self.assertEqual(
+            set(User.objects.values_list("username", flat=True)),
+            {"admin", "user0", "user2"},
+        )
+
+    def test_mass_import_progress(self):
+        users = [{"username": f"user{index}"} for index in range(3)] + [{}]
+        progress = []
+
+        async def notify_user(user_id, name, content):
+            progress.append((user_id, name, content))
+
+        with patch("openslides.users.views.user_import_batch_size", 2), patch(
+            "openslides.users.views.notify_user", notify_user
+        ):
+            response = self.client.post(
+                reverse("user-mass-import"), {"users": users}, format="json"
+            )
+
+        self.assertEqual(response.status_code, 200)
+        admin_id = User.objects.get(username="admin").pk
+        self.assertEqual(
+            progress,
+            [
+                (
+                    admin_id,
+                    "userImportProgress",
+                    {"processed": 2, "total": 4, "imported": 2, "errors": 0},
+                ),
+                (
+                    admin_id,
+                    "userImportProgress",
+                    {"processed": 4, "total": 4, "imported": 3, "errors": 1},
+                ),
+            ],
+        )
+
 
 class UserSendIntivationEmail(TestCase):
     """
@@ -16,6 +16,7 @@ from openslides.utils.autoupdate import (
     inform_deleted_data,
 )
 from openslides.utils.cache import element_cache
+from openslides.utils.websocket import notify_user
 
 from ...unit.utils.cache_provider import Collection1, Collection2, get_cachable_provider
 from ..helpers import TConfig, TProjector, TUser
@@ -191,6 +192,27 @@ async def test_changed_data_autoupdate_on(get_communicator, set_config):
     }
 
 
+@pytest.mark.asyncio
+async def test_changed_data_autoupdate_shared(get_communicator, set_config):
+    await set_config("general_system_enable_anonymous", True)
+    communicator1 = WebsocketCommunicator(application, "/ws/?autoupdate=on")
+    communicator2 = WebsocketCommunicator(application, "/ws/?autoupdate=on")
+    await communicator1.connect()
+    await communicator2.connect()
+
+    with patch.object(
+        element_cache, "get_full_data", wraps=element_cache.get_full_data
+    ) as get_full_data:
+        await set_config("general_event_name", "Test Event")
+        response1 = await communicator1.receive_from()
+        response2 = await communicator2.receive_from()
+
+    await communicator1.disconnect()
+    await communicator2.disconnect()
+    assert response1 == response2
+    assert get_full_data.call_count == 1
+
+
 @pytest.mark.xfail  # This will fail until a proper solution in #4009
 @pytest.mark.asyncio
 async def test_anonymous_disabled(communicator):
@@ -262,6 +284,145 @@ async def test_send_notify(communicator, set_config):
     assert content["senderUserId"] == 0
 
 
+@pytest.mark.asyncio
+async def test_send_notify_to_users(communicator, set_config):
+    await set_config("general_system_enable_anonymous", True)
+    await communicator.connect()
+
+    await communicator.send_json_to(
+        {
+            "type": "notify",
+            "content": {"content": "for user 1", "name": "message", "users": [1]},
+            "id": "test1",
+        }
+    )
+    await communicator.send_json_to(
+        {
+            "type": "notify",
+            "content": {"content": "for anonymous", "name": "message", "users": [0]},
+            "id": "test2",
+        }
+    )
+    response = await communicator.receive_json_from()
+
+    # The anonymous user only gets the second message.
+    assert response["content"]["content"] == "for anonymous"
+    assert await communicator.receive_nothing()
+
+
+@pytest.mark.asyncio
+async def test_notify_user_from_server(communicator, set_config):
+    await set_config("general_system_enable_anonymous", True)
+    await communicator.connect()
+
+    await notify_user(1, "message", "for user 1")
+    await notify_user(0, "message", "for anonymous")
+    response = await communicator.receive_json_from()
+
+    assert response["type"] == "notify"
+    assert response["content"] == {
+        "name": "message",
+        "content": "for anonymous",
+        "senderChannelName": "",
+        "senderUserId": 0,
+    }
+    assert await communicator.receive_nothing()
+
+
+@pytest.mark.asyncio
+async def test_send_notify_to_reply_channels(set_config):
+    await set_config("general_system_enable_anonymous", True)
+    communicator1 = WebsocketCommunicator(application, "/ws/")
+    communicator2 = WebsocketCommunicator(application, "/ws/")
+    await communicator1.connect()
+    await communicator2.connect()
+
+    # Get the channel name of the first communicator.
+    await communicator1.send_json_to(
+        {"type": "notify", "content": {"content": "", "name": "hello"}, "id": "t1"}
+    )
+    channel_name = (await communicator2.receive_json_from())["content"][
+        "senderChannelName"
+    ]
+    await communicator1.receive_json_from()
+
+    await communicator2.send_json_to(
+        {
+            "type": "notify",
+            "content": {
+                "content": "reply",
+                "name": "message",
+                "replyChannels": [channel_name],
+            },
+            "id": "t2",
+        }
+    )
+    # The user of communicator1 is a recipient, too.
+    await communicator2.send_json_to(
+        {
+            "type": "notify",
+            "content": {
+                "content": "reply and user",
+                "name": "message",
+                "replyChannels": [channel_name],
+                "users": [1, 0],
+            },
+            "id": "t3",
+        }
+    )
+    response1 = await communicator1.receive_json_from()
+    response2 = await communicator1.receive_json_from()
+    response3 = await communicator2.receive_json_from()
+    nothing1 = await communicator1.receive_nothing()
+    nothing2 = await communicator2.receive_nothing()
+    await communicator1.disconnect()
+    await communicator2.disconnect()
+
+    assert response1["content"]["content"] == "reply"
+    assert response2["content"]["content"] == "reply and user"
+    assert response3["content"]["content"] == "reply and user"
+    assert nothing1 and nothing2
+
+
+@pytest.mark.asyncio
+async def test_send_notify_to_invalid_reply_channels(communicator, set_config):
+    await set_config("general_system_enable_anonymous", True)
+    await communicator.connect()
+
+    await communicator.send_json_to(
+        {
+            "type": "notify",
+            "content": {
+                "content": "reply",
+                "name": "message",
+                "replyChannels": ["invalid channel name"],
+                "users": [0],
+            },
+            "id": "test",
+        }
+    )
+    response = await communicator.receive_json_from()
+
+    assert response["content"]["content"] == "reply"
+
+
+@pytest.mark.asyncio
+async def test_send_notify_with_invalid_reply_channels_type(communicator, set_config):
+    await set_config("general_system_enable_anonymous", True)
+    await communicator.connect()
+
+    await communicator.send_json_to(
+        {
+            "type": "notify",
+            "content": {"content": "reply", "name": "message", "replyChannels": [1]},
+            "id": "test",
+        }
+    )
+    response = await communicator.receive_json_from()
+
+    assert response["type"] == "error"
+
+
 @pytest.mark.asyncio
 async def test_invalid_websocket_message_type(communicator, set_config):
     await set_config("general_system_enable_anonymous", True)
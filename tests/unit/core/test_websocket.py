@@ -1,7 +1,7 @@
 import jsonschema
 import pytest
 
-from openslides.utils.websocket import schema
+from openslides.utils.websocket import schema, validate_message
 
 
 def test_notify_schema_validation():
@@ -42,3 +42,34 @@ def test_notify_schema_invalid_not_a_list():
     }
     with pytest.raises(jsonschema.ValidationError):
         jsonschema.validate(message, schema)
+
+
+def test_validate_message():
+    # This raises a validaten error if it fails
+    validate_message(
+        {
+            "id": "test-message",
+            "type": "notify",
+            "content": {"name": "testname", "content": ["some content"]},
+        }
+    )
+
+
+def test_validate_message_invalid_content():
+    message = {
+        "type": "notify",
+        "content": {"testmessage": "foobar, what else."},
+        "id": "test_validate_message_invalid_content",
+    }
+    with pytest.raises(jsonschema.ValidationError):
+        validate_message(message)
+
+
+def test_validate_message_unknown_type():
+    message = {
+        "type": "unknown",
+        "content": {},
+        "id": "test_validate_message_unknown_type",
+    }
+    with pytest.raises(jsonschema.ValidationError):
+        validate_message(message)
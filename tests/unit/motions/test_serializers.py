@@ -0,0 +1,39 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from openslides.motions.serializers import MotionSerializer
+
+
+@patch("openslides.motions.serializers.validate_html", lambda html: f"valid {html}")
+class MotionSerializerValidate(TestCase):
+    """
+    Tests the validation of the html fields of a motion.
+    """
+
+    def test_create(self):
+        serializer = MotionSerializer()
+
+        data = serializer.validate({"text": "text", "reason": "reason"})
+
+        self.assertEqual(data, {"text": "valid text", "reason": "valid reason"})
+
+    def test_update_skips_unchanged_fields(self):
+        motion = MagicMock(text="text", reason="old reason")
+        serializer = MotionSerializer(motion)
+
+        data = serializer.validate({"text": "text", "reason": "reason"})
+
+        self.assertEqual(data, {"text": "text", "reason": "valid reason"})
+
+    def test_update_amendment_paragraphs(self):
+        motion = MagicMock(amendment_paragraphs=["paragraph", None])
+        serializer = MotionSerializer(motion)
+
+        data = serializer.validate(
+            {"amendment_paragraphs": ["paragraph", "new", "other", None]}
+        )
+
+        self.assertEqual(
+            data["amendment_paragraphs"],
+            ["paragraph", "valid new", "valid other", None],
+        )
@@ -46,6 +46,30 @@ class Collection2:
         return restrict_elements(elements)
 
 
+class SharedCollection:
+    """
+    Collection with restricted data, that only depends on the groups of the user.
+    """
+
+    def __init__(self) -> None:
+        self.restrict_calls = 0
+
+    def get_collection_string(self) -> str:
+        return "app/shared"
+
+    def get_elements(self) -> List[Dict[str, Any]]:
+        return [{"id": 1, "value": "value1"}]
+
+    def has_user_specific_restricted_data(self) -> bool:
+        return False
+
+    async def restrict_elements(
+        self, user_id: int, elements: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        self.restrict_calls += 1
+        return restrict_elements(elements)
+
+
 def get_cachable_provider(
     cachables: List[Cachable] = [Collection1(), Collection2()]
 ) -> Callable[[], List[Cachable]]:
@@ -0,0 +1,131 @@
+from typing import Any, Dict, List
+from unittest.mock import patch
+
+import pytest
+
+from openslides.utils.auth import PermissionCache, UserPermissions, async_has_perm
+from openslides.utils.cache import ElementCache
+
+from .cache_provider import TTestCacheProvider, get_cachable_provider
+
+
+class Users:
+    def get_collection_string(self) -> str:
+        return "users/user"
+
+    def get_elements(self) -> List[Dict[str, Any]]:
+        return [{"id": 1, "groups_id": [3]}, {"id": 2, "groups_id": []}]
+
+    async def restrict_elements(
+        self, user_id: int, elements: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        return elements
+
+
+class Groups:
+    def get_collection_string(self) -> str:
+        return "users/group"
+
+    def get_elements(self) -> List[Dict[str, Any]]:
+        return [
+            {"id": 1, "permissions": ["default.perm"]},
+            {"id": 2, "permissions": []},
+            {"id": 3, "permissions": ["some.perm"]},
+        ]
+
+    async def restrict_elements(
+        self, user_id: int, elements: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        return elements
+
+
+@pytest.fixture(params=[100, 0])
+def element_cache(request):
+    element_cache = ElementCache(
+        cache_provider_class=TTestCacheProvider,
+        cachable_provider=get_cachable_provider([Users(), Groups()]),
+        start_time=0,
+        local_cache_size=request.param,
+    )
+    element_cache.ensure_cache()
+    with patch("openslides.utils.auth.element_cache", element_cache), patch(
+        "openslides.utils.auth.permission_cache", PermissionCache()
+    ):
+        yield element_cache
+
+
+@pytest.mark.asyncio
+async def test_has_perm(element_cache):
+    assert await async_has_perm(1, "some.perm")
+    assert not await async_has_perm(1, "default.perm")
+    assert await async_has_perm(2, "default.perm")
+
+
+@pytest.mark.asyncio
+async def test_has_perm_changed_group(element_cache):
+    assert not await async_has_perm(1, "other.perm")
+
+    await element_cache.change_elements(
+        {"users/group:3": {"id": 3, "permissions": ["other.perm"]}}
+    )
+
+    assert await async_has_perm(1, "other.perm")
+
+
+@pytest.mark.asyncio
+async def test_has_perm_changed_user(element_cache):
+    assert not await async_has_perm(1, "anything")
+
+    await element_cache.change_elements({"users/user:1": {"id": 1, "groups_id": [2]}})
+
+    assert await async_has_perm(1, "anything")
+
+
+@pytest.mark.asyncio
+async def test_has_perm_cached(element_cache):
+    await async_has_perm(1, "some.perm")
+
+    with patch(
+        "openslides.utils.auth.calculate_user_permissions"
+    ) as calculate_user_permissions:
+        assert await async_has_perm(1, "some.perm")
+
+    assert not calculate_user_permissions.called
+
+
+@pytest.mark.asyncio
+async def test_has_perm_changed_in_other_process(element_cache):
+    assert not await async_has_perm(1, "other.perm")
+
+    element_cache.cache_provider.full_data[
+        "users/group:3"
+    ] = '{"id": 3, "permissions": ["other.perm"]}'
+    element_cache.cache_provider.change_id_data = {1: {"users/group:3"}}
+
+    assert await async_has_perm(1, "other.perm")
+
+
+permissions1 = UserPermissions(
+    is_admin=False, permissions=frozenset(["perm1"]), group_ids=frozenset([1])
+)
+permissions2 = UserPermissions(
+    is_admin=False, permissions=frozenset(["perm2"]), group_ids=frozenset([2])
+)
+
+
+def test_permission_cache_elements_changed():
+    permission_cache = PermissionCache()
+    permission_cache.users = {1: permissions1, 2: permissions2}
+
+    permission_cache.elements_changed(["users/user:1", "motions/motion:1"])
+
+    assert permission_cache.users == {2: permissions2}
+
+
+def test_permission_cache_group_changed():
+    permission_cache = PermissionCache()
+    permission_cache.users = {1: permissions1, 2: permissions2}
+
+    permission_cache.elements_changed(["users/group:1"])
+
+    assert permission_cache.users == {}
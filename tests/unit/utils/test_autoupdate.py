@@ -0,0 +1,60 @@
+from unittest.mock import patch
+
+from openslides.utils.autoupdate import AutoupdateCoalescer
+
+
+def test_coalescer_without_delay():
+    coalescer = AutoupdateCoalescer(0)
+
+    assert not coalescer.add(1)
+    assert coalescer.get_statistics()["messages_sent"] == 1
+
+
+def test_coalescer_merges_change_ids():
+    sent = []
+
+    async def send_autoupdate(from_change_id, to_change_id):
+        sent.append((from_change_id, to_change_id))
+
+    coalescer = AutoupdateCoalescer(60)
+    with patch("openslides.utils.autoupdate.send_autoupdate", send_autoupdate):
+        assert coalescer.add(2)
+        assert coalescer.add(4)
+        assert coalescer.add(3)
+        coalescer.flush()
+
+    assert sent == [(2, 4)]
+    statistics = coalescer.get_statistics()
+    assert statistics["messages_sent"] == 1
+    assert statistics["messages_saved"] == 2
+    assert statistics["added_latency"] > 0
+    assert coalescer.timer is None
+
+
+def test_coalescer_flush_with_timer():
+    sent = []
+
+    async def send_autoupdate(from_change_id, to_change_id):
+        sent.append((from_change_id, to_change_id))
+
+    coalescer = AutoupdateCoalescer(0.1)
+    with patch("openslides.utils.autoupdate.send_autoupdate", send_autoupdate):
+        coalescer.add(1)
+        timer = coalescer.timer
+        assert timer is not None
+        timer.join()
+        coalescer.add(2)
+        timer = coalescer.timer
+        assert timer is not None
+        timer.join()
+
+    assert sent == [(1, 1), (2, 2)]
+    assert coalescer.get_statistics()["messages_saved"] == 0
+
+
+def test_coalescer_flush_without_changes():
+    coalescer = AutoupdateCoalescer(60)
+
+    coalescer.flush()
+
+    assert coalescer.get_statistics()["messages_sent"] == 0
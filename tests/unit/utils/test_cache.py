@@ -1,12 +1,20 @@
+import asyncio
 import json
-from typing import Any, Dict, List
+from typing import Any, Dict, List, cast
 from unittest.mock import patch
 
 import pytest
 
-from openslides.utils.cache import ElementCache
+from openslides.utils.cache import ElementCache, LocalElementCache, get_element_chunks
+from openslides.utils.cache_providers import MemmoryCacheProvider
 
-from .cache_provider import TTestCacheProvider, example_data, get_cachable_provider
+from .cache_provider import (
+    Collection1,
+    SharedCollection,
+    TTestCacheProvider,
+    example_data,
+    get_cachable_provider,
+)
 
 
 def decode_dict(encoded_dict: Dict[str, str]) -> Dict[str, Any]:
@@ -38,6 +46,65 @@ def element_cache():
     return element_cache
 
 
+def test_ensure_cache_in_chunks():
+    element_cache = ElementCache(
+        cache_provider_class=TTestCacheProvider,
+        cachable_provider=get_cachable_provider(),
+        start_time=0,
+        chunk_size=1,
+    )
+
+    element_cache.ensure_cache()
+
+    cache_provider = cast(MemmoryCacheProvider, element_cache.cache_provider)
+    assert decode_dict(cache_provider.full_data) == decode_dict(
+        {
+            "app/collection1:1": '{"id": 1, "value": "value1"}',
+            "app/collection1:2": '{"id": 2, "value": "value2"}',
+            "app/collection2:1": '{"id": 1, "key": "value1"}',
+            "app/collection2:2": '{"id": 2, "key": "value2"}',
+        }
+    )
+
+
+def test_ensure_cache_with_threads():
+    element_cache = ElementCache(
+        cache_provider_class=TTestCacheProvider,
+        cachable_provider=get_cachable_provider(),
+        start_time=0,
+        chunk_size=1,
+        build_threads=2,
+    )
+
+    element_cache.ensure_cache()
+
+    cache_provider = cast(MemmoryCacheProvider, element_cache.cache_provider)
+    assert decode_dict(cache_provider.full_data) == decode_dict(
+        {
+            "app/collection1:1": '{"id": 1, "value": "value1"}',
+            "app/collection1:2": '{"id": 2, "value": "value2"}',
+            "app/collection2:1": '{"id": 1, "key": "value1"}',
+            "app/collection2:2": '{"id": 2, "key": "value2"}',
+        }
+    )
+
+
+def test_get_element_chunks():
+    chunks = list(get_element_chunks(Collection1(), 1))
+
+    assert chunks == [[{"id": 1, "value": "value1"}], [{"id": 2, "value": "value2"}]]
+
+
+def test_get_element_chunks_with_get_elements_chunked():
+    class ChunkedCollection(Collection1):
+        def get_elements_chunked(self, chunk_size):
+            yield [{"id": 1}]
+
+    chunks = list(get_element_chunks(ChunkedCollection(), 1))
+
+    assert chunks == [[{"id": 1}]]
+
+
 @pytest.mark.asyncio
 async def test_change_elements(element_cache):
     input_data = {
@@ -55,7 +122,7 @@ async def test_change_elements(element_cache):
 
     result = await element_cache.change_elements(input_data)
 
-    assert result == 1  # first change_id
+    assert result == (1, [])  # first change_id
     assert decode_dict(element_cache.cache_provider.full_data) == decode_dict(
         {
             "app/collection1:1": '{"id": 1, "value": "updated"}',
@@ -84,7 +151,7 @@ async def test_change_elements_with_no_data_in_redis(element_cache):
 
     result = await element_cache.change_elements(input_data)
 
-    assert result == 1  # first change_id
+    assert result == (1, [])  # first change_id
     assert decode_dict(element_cache.cache_provider.full_data) == decode_dict(
         {
             "app/collection1:1": '{"id": 1, "value": "updated"}',
@@ -102,6 +169,74 @@ async def test_change_elements_with_no_data_in_redis(element_cache):
     }
 
 
+@pytest.mark.asyncio
+async def test_change_elements_saves_last_change_id(element_cache):
+    await element_cache.change_elements({"app/collection1:1": {"id": 1}})
+    await element_cache.change_elements(
+        {"app/collection1:1": {"id": 1}, "app/collection1:2": {"id": 2}}
+    )
+
+    assert element_cache.cache_provider.change_id_data == {
+        2: {"app/collection1:1", "app/collection1:2"}
+    }
+    assert await element_cache.get_lowest_change_id() == 1
+
+
+@pytest.mark.asyncio
+async def test_change_elements_patched(element_cache):
+    await element_cache.change_elements({"app/collection1:1": {"id": 1}})
+    await element_cache.change_elements({"app/collection1:1": {"id": 1}})
+
+    # The element was changed after the change_id 1.
+    assert await element_cache.change_elements(
+        {"app/collection1:1": {"id": 1}, "app/collection1:2": {"id": 2}},
+        {"app/collection1:1": 1, "app/collection1:2": 1},
+    ) == (3, ["app/collection1:1"])
+    # The data is written anyway.
+    assert element_cache.cache_provider.change_id_data == {
+        3: {"app/collection1:1", "app/collection1:2"}
+    }
+    assert await element_cache.change_elements(
+        {"app/collection1:1": {"id": 1}}, {"app/collection1:1": 3}
+    ) == (4, [])
+
+
+@pytest.mark.asyncio
+async def test_change_elements_patched_unknown_changes(element_cache):
+    element_cache.max_changed_elements = 1
+    await element_cache.change_elements({"app/collection1:1": {"id": 1}})
+    await element_cache.change_elements({"app/collection1:2": {"id": 2}})
+    await element_cache.change_elements({"app/collection1:3": {"id": 3}})
+
+    # The changes of the change_id 2 are not known anymore.
+    assert await element_cache.change_elements(
+        {"app/collection1:2": {"id": 2}}, {"app/collection1:2": 1}
+    ) == (4, ["app/collection1:2"])
+
+
+@pytest.mark.asyncio
+async def test_change_elements_max_changed_elements(element_cache):
+    element_cache.max_changed_elements = 2
+    await element_cache.change_elements({"app/collection1:1": {"id": 1}})
+    await element_cache.change_elements({"app/collection1:2": {"id": 2}})
+    await element_cache.change_elements(
+        {"app/collection2:1": {"id": 1}, "app/collection2:2": {"id": 2}}
+    )
+
+    # The elements of the newest change_id are never removed.
+    assert element_cache.cache_provider.change_id_data == {
+        3: {"app/collection2:1", "app/collection2:2"}
+    }
+    assert await element_cache.get_lowest_change_id() == 3
+    with pytest.raises(RuntimeError):
+        await element_cache.get_full_data(2)
+    changed_elements, deleted_elements = await element_cache.get_full_data(3)
+    assert sorted(changed_elements["app/collection2"], key=lambda e: e["id"]) == [
+        {"id": 1},
+        {"id": 2},
+    ]
+
+
 @pytest.mark.asyncio
 async def test_get_all_full_data_from_db(element_cache):
     result = await element_cache.get_all_full_data()
@@ -228,6 +363,113 @@ async def test_get_element_full_data_full_redis(element_cache):
     assert result == {"id": 1, "value": "value1"}
 
 
+@pytest.mark.asyncio
+async def test_get_elements_full_data(element_cache):
+    result = await element_cache.get_elements_full_data(
+        ["app/collection1:1", "app/collection2:2", "app/collection1:3"]
+    )
+
+    assert result == {
+        "app/collection1:1": {"id": 1, "value": "value1"},
+        "app/collection2:2": {"id": 2, "key": "value2"},
+        "app/collection1:3": None,
+    }
+
+
+@pytest.mark.asyncio
+async def test_get_elements_full_data_empty(element_cache):
+    result = await element_cache.get_elements_full_data([])
+
+    assert result == {}
+
+
+@pytest.mark.asyncio
+async def test_get_element_full_data_local_cache(element_cache):
+    element_cache.local_cache = LocalElementCache(100)
+
+    first = await element_cache.get_element_full_data("app/collection1", 1)
+    second = await element_cache.get_element_full_data("app/collection1", 1)
+
+    assert first == second == {"id": 1, "value": "value1"}
+    assert element_cache.local_cache.misses == 1
+    assert element_cache.local_cache.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_get_element_full_data_local_cache_changed_element(element_cache):
+    element_cache.local_cache = LocalElementCache(100)
+    await element_cache.get_elements_full_data(
+        ["app/collection1:1", "app/collection1:2"]
+    )
+
+    await element_cache.change_elements(
+        {"app/collection1:1": {"id": 1, "value": "updated"}, "app/collection1:2": None}
+    )
+    result = await element_cache.get_elements_full_data(
+        ["app/collection1:1", "app/collection1:2"]
+    )
+
+    assert result == {
+        "app/collection1:1": {"id": 1, "value": "updated"},
+        "app/collection1:2": None,
+    }
+    assert element_cache.local_cache.hits == 0
+
+
+@pytest.mark.asyncio
+async def test_get_element_full_data_local_cache_unknown_changes(element_cache):
+    element_cache.local_cache = LocalElementCache(100)
+    await element_cache.get_element_full_data("app/collection1", 1)
+    element_cache.cache_provider.full_data[
+        "app/collection1:1"
+    ] = '{"id": 1, "value": "updated"}'
+    # The change_ids until 5 are unknown.
+    element_cache.cache_provider.change_id_data = {6: {"app/collection1:2"}}
+
+    result = await element_cache.get_element_full_data("app/collection1", 1)
+
+    assert result == {"id": 1, "value": "updated"}
+
+
+@pytest.mark.asyncio
+async def test_get_element_full_data_local_cache_checks_every_access(element_cache):
+    element_cache.local_cache = LocalElementCache(100)
+    await element_cache.get_element_full_data("app/collection1", 1)
+    element_cache.cache_provider.full_data[
+        "app/collection1:1"
+    ] = '{"id": 1, "value": "updated"}'
+    element_cache.cache_provider.change_id_data = {1: {"app/collection1:1"}}
+
+    with patch.object(
+        element_cache.cache_provider,
+        "get_changed_element_ids",
+        wraps=element_cache.cache_provider.get_changed_element_ids,
+    ) as get_changed_element_ids:
+        # The change of another process is seen at the next access.
+        result = await element_cache.get_element_full_data("app/collection1", 1)
+
+    assert result == {"id": 1, "value": "updated"}
+    assert get_changed_element_ids.call_count == 1
+
+
+def test_local_element_cache_max_size():
+    local_cache = LocalElementCache(2)
+    local_cache.set_many({"a:1": {"id": 1}, "a:2": {"id": 2}}, local_cache.generation)
+    local_cache.get_many(["a:1"])
+    local_cache.set_many({"a:3": {"id": 3}}, local_cache.generation)
+
+    assert list(local_cache.elements.keys()) == ["a:1", "a:3"]
+
+
+def test_local_element_cache_set_after_invalidate():
+    local_cache = LocalElementCache(2)
+    generation = local_cache.generation
+    local_cache.invalidate(["a:1"])
+    local_cache.set_many({"a:1": {"id": 1}}, generation)
+
+    assert local_cache.get_many(["a:1"]) == ({}, ["a:1"])
+
+
 @pytest.mark.asyncio
 async def test_exists_restricted_data(element_cache):
     element_cache.use_restricted_data_cache = True
@@ -386,7 +628,8 @@ async def test_update_restricted_data_with_deleted_elements(element_cache):
 @pytest.mark.asyncio
 async def test_update_restricted_data_second_worker(element_cache):
     """
-    Test, that if another worker is updating the data, noting is done.
+    Test, that if another worker is updating the data, the data is written
+    after it is done.
 
     This tests makes use of the redis key as it would on different daphne servers.
     """
@@ -397,8 +640,143 @@ async def test_update_restricted_data_second_worker(element_cache):
 
     await element_cache.update_restricted_data(0)
 
-    # Restricted_data_should not be set on second worker
-    assert element_cache.cache_provider.restricted_data == {0: {}}
+    # The other worker did not write the data, so it is written afterwards.
+    assert decode_dict(element_cache.cache_provider.restricted_data[0]) == {
+        "_config:change_id": 0,
+        "app/collection1:1": {"id": 1, "value": "restricted_value1"},
+        "app/collection1:2": {"id": 2, "value": "restricted_value2"},
+        "app/collection2:1": {"id": 1, "key": "restricted_value1"},
+        "app/collection2:2": {"id": 2, "key": "restricted_value2"},
+    }
+
+
+@pytest.mark.asyncio
+async def test_update_restricted_data_second_worker_done(element_cache):
+    """
+    Test, that nothing is written again, if another worker has written the
+    data.
+    """
+    element_cache.use_restricted_data_cache = True
+    element_cache.cache_provider.restricted_data = {0: {"_config:change_id": "1"}}
+    element_cache.cache_provider.change_id_data = {1: {"app/collection1:1"}}
+    await element_cache.cache_provider.set_lock("restricted_data_0")
+    await element_cache.cache_provider.del_lock_after_wait("restricted_data_0")
+
+    await element_cache.update_restricted_data(0)
+
+    assert element_cache.cache_provider.restricted_data == {
+        0: {"_config:change_id": "1"}
+    }
+
+
+@pytest.mark.asyncio
+async def test_update_restricted_data_expired_lock(element_cache):
+    """
+    Test, that a lock of a crashed worker expires.
+    """
+    element_cache.use_restricted_data_cache = True
+    await element_cache.cache_provider.set_lock("restricted_data_0", ttl=0.05)
+
+    # Waits until the lock expires.
+    await element_cache.update_restricted_data(0)
+
+    assert decode_dict(element_cache.cache_provider.restricted_data[0]) == {
+        "_config:change_id": 0,
+        "app/collection1:1": {"id": 1, "value": "restricted_value1"},
+        "app/collection1:2": {"id": 2, "value": "restricted_value2"},
+        "app/collection2:1": {"id": 1, "key": "restricted_value1"},
+        "app/collection2:2": {"id": 2, "key": "restricted_value2"},
+    }
+
+
+@pytest.mark.asyncio
+async def test_del_lock_with_token(element_cache):
+    provider = element_cache.cache_provider
+    token = await provider.set_lock("test_lock")
+    assert not await provider.set_lock("test_lock")
+
+    await provider.del_lock("test_lock", token + 1)
+    assert await provider.get_lock("test_lock")
+    assert not await provider.renew_lock("test_lock", token + 1)
+
+    await provider.del_lock("test_lock", token)
+    assert not await provider.get_lock("test_lock")
+    assert await provider.set_lock("test_lock") > token
+
+
+@pytest.mark.asyncio
+async def test_run_locked_renews_lock(element_cache):
+    element_cache.lock_ttl = 0.06
+
+    async def func(token):
+        await asyncio.sleep(0.1)
+        assert await element_cache.cache_provider.get_lock("test_lock")
+
+    assert await element_cache.run_locked("test_lock", func)
+    assert not await element_cache.cache_provider.get_lock("test_lock")
+
+
+@pytest.mark.asyncio
+async def test_run_locked_lock_lost(element_cache):
+    """
+    Test, that nothing is written with the token of a lost lock.
+    """
+    provider = element_cache.cache_provider
+
+    async def func(token):
+        # The lock expires and another worker sets it.
+        await provider.del_lock("restricted_data_0")
+        other_token = await provider.set_lock("restricted_data_0")
+        await provider.update_restricted_data(
+            0, {"_config:change_id": "1"}, "restricted_data_0", other_token
+        )
+        await provider.update_restricted_data(
+            0, {"_config:change_id": "2"}, "restricted_data_0", token
+        )
+
+    assert not await element_cache.run_locked("restricted_data_0", func)
+    assert provider.restricted_data == {0: {"_config:change_id": "1"}}
+    # The lock of the other worker is not deleted.
+    assert await provider.get_lock("restricted_data_0")
+
+
+@pytest.fixture
+def shared_element_cache():
+    element_cache = ElementCache(
+        cache_provider_class=TTestCacheProvider,
+        cachable_provider=get_cachable_provider([SharedCollection()]),
+        start_time=0,
+        use_restricted_data_cache=True,
+    )
+    element_cache.ensure_cache()
+    return element_cache
+
+
+@pytest.mark.asyncio
+async def test_update_restricted_data_shared_between_users(shared_element_cache):
+    element_cache = shared_element_cache
+    shared_collection = element_cache.cachables["app/shared"]
+
+    async def get_permission_fingerprint(user_id):
+        return "admin" if user_id == 3 else "groups:1"
+
+    with patch(
+        "openslides.utils.auth.get_permission_fingerprint", get_permission_fingerprint
+    ):
+        for user_id in (1, 2, 3):
+            await element_cache.update_restricted_data(user_id)
+
+    # User 1 and 2 share the restricted data.
+    assert shared_collection.restrict_calls == 2
+    for user_id in (1, 2, 3):
+        assert decode_dict(
+            element_cache.cache_provider.restricted_data[user_id]
+        ) == decode_dict(
+            {
+                "app/shared:1": '{"id": 1, "value": "restricted_value1"}',
+                "_config:change_id": "0",
+            }
+        )
 
 
 @pytest.mark.asyncio
@@ -440,6 +818,42 @@ async def test_get_all_restricted_data_disabled_restricted_data_cache(element_ca
     )
 
 
+@pytest.mark.asyncio
+async def test_get_collection_full_data(element_cache):
+    result = await element_cache.get_collection_full_data("app/collection1")
+
+    assert sorted(result, key=lambda element: element["id"]) == [
+        {"id": 1, "value": "value1"},
+        {"id": 2, "value": "value2"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_get_collection_restricted_data(element_cache):
+    element_cache.use_restricted_data_cache = True
+
+    result = await element_cache.get_collection_restricted_data(0, "app/collection2")
+
+    assert sorted(result, key=lambda element: element["id"]) == [
+        {"id": 1, "key": "restricted_value1"},
+        {"id": 2, "key": "restricted_value2"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_get_collection_restricted_data_disabled_restricted_data_cache(
+    element_cache
+):
+    element_cache.use_restricted_data_cache = False
+
+    result = await element_cache.get_collection_restricted_data(0, "app/collection2")
+
+    assert sorted(result, key=lambda element: element["id"]) == [
+        {"id": 1, "key": "restricted_value1"},
+        {"id": 2, "key": "restricted_value2"},
+    ]
+
+
 @pytest.mark.asyncio
 async def test_get_restricted_data_change_id_0(element_cache):
     element_cache.use_restricted_data_cache = True
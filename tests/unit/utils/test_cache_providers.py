@@ -0,0 +1,303 @@
+import pytest
+
+from openslides.utils.cache_providers import LockLostError, RedisCollectionCacheProvider
+from openslides.utils.redis import get_connection, use_redis
+
+
+pytestmark = pytest.mark.skipif(not use_redis, reason="Redis is not configured")
+
+
+class TRedisCollectionCacheProvider(RedisCollectionCacheProvider):
+    prefix = "test_collection_cache_"
+
+
+@pytest.fixture
+async def cache_provider():
+    cache_provider = TRedisCollectionCacheProvider()
+    await cache_provider.clear_cache()
+    yield cache_provider
+    await cache_provider.clear_cache()
+
+
+async def get_keys():
+    async with get_connection() as redis:
+        keys = await redis.keys("test_collection_cache_*")
+    return sorted(key.decode() for key in keys)
+
+
+async def get_hash(key):
+    async with get_connection() as redis:
+        data = await redis.hgetall(key)
+    return {key.decode(): value.decode() for key, value in data.items()}
+
+
+async def get_set(key):
+    async with get_connection() as redis:
+        members = await redis.smembers(key)
+    return set(member.decode() for member in members)
+
+
+example_data = {
+    "app/collection1:1": '{"id": 1}',
+    "app/collection1:2": '{"id": 2}',
+    "app/collection2:1": '{"id": 1}',
+}
+
+
+@pytest.mark.asyncio
+async def test_key_layout(cache_provider):
+    await cache_provider.reset_full_cache(example_data)
+
+    assert await get_keys() == [
+        "test_collection_cache_full_data:app/collection1",
+        "test_collection_cache_full_data:app/collection2",
+        "test_collection_cache_full_data_collections",
+    ]
+    assert await get_hash("test_collection_cache_full_data:app/collection1") == {
+        "app/collection1:1": '{"id": 1}',
+        "app/collection1:2": '{"id": 2}',
+    }
+    assert await get_set("test_collection_cache_full_data_collections") == {
+        "",
+        "app/collection1",
+        "app/collection2",
+    }
+
+
+@pytest.mark.asyncio
+async def test_reset_replaces_old_data(cache_provider):
+    await cache_provider.reset_full_cache({"app/old:1": '{"id": 1}'})
+    await cache_provider.add_changed_elements(1, ["app/old:1"])
+
+    await cache_provider.reset_full_cache(example_data)
+
+    keys = await get_keys()
+    assert "test_collection_cache_full_data:app/old" not in keys
+    assert "test_collection_cache_change_id" not in keys
+    assert not [key for key in keys if "tmp_" in key]
+    assert "app/old" not in await get_set("test_collection_cache_full_data_collections")
+
+
+@pytest.mark.asyncio
+async def test_read_elements(cache_provider):
+    await cache_provider.reset_full_cache(example_data)
+
+    all_data = await cache_provider.get_all_data()
+    collection_data = await cache_provider.get_collection_data("app/collection1")
+    element = await cache_provider.get_element("app/collection2:1")
+    elements = await cache_provider.get_elements(
+        ["app/collection2:1", "app/collection1:1", "app/collection1:3"]
+    )
+
+    assert {key.decode(): value.decode() for key, value in all_data.items()} == (
+        example_data
+    )
+    assert set(collection_data.keys()) == {b"app/collection1:1", b"app/collection1:2"}
+    assert element == b'{"id": 1}'
+    assert elements == [b'{"id": 1}', b'{"id": 1}', None]
+
+
+@pytest.mark.asyncio
+async def test_change_elements(cache_provider):
+    await cache_provider.reset_full_cache(example_data)
+
+    await cache_provider.add_elements(
+        ["app/collection1:1", '{"id": 1, "changed": true}', "app/new:1", '{"id": 1}']
+    )
+    await cache_provider.del_elements(["app/collection1:2", "app/collection2:1"])
+
+    assert await get_hash("test_collection_cache_full_data:app/collection1") == {
+        "app/collection1:1": '{"id": 1, "changed": true}'
+    }
+    assert await get_hash("test_collection_cache_full_data:app/collection2") == {}
+    assert await get_hash("test_collection_cache_full_data:app/new") == {
+        "app/new:1": '{"id": 1}'
+    }
+    assert "app/new" in await get_set("test_collection_cache_full_data_collections")
+
+
+@pytest.mark.asyncio
+async def test_get_data_since(cache_provider):
+    await cache_provider.reset_full_cache(example_data)
+    change_id, __ = await cache_provider.add_changed_elements(
+        1, ["app/collection1:1", "app/collection1:3"]
+    )
+
+    changed, deleted = await cache_provider.get_data_since(change_id)
+
+    assert changed == {"app/collection1": [b'{"id": 1}']}
+    assert deleted == ["app/collection1:3"]
+
+
+@pytest.mark.asyncio
+async def test_add_changed_elements_patched(cache_provider):
+    await cache_provider.add_changed_elements(1, ["app/collection1:1"])
+    await cache_provider.add_changed_elements(1, ["app/collection1:1"])
+
+    assert await cache_provider.add_changed_elements(
+        1,
+        ["app/collection1:1", "app/collection1:2"],
+        patched_change_ids={"app/collection1:1": 1, "app/collection1:2": 1},
+    ) == (3, ["app/collection1:1"])
+    assert await cache_provider.add_changed_elements(
+        1, ["app/collection1:1"], patched_change_ids={"app/collection1:1": 3}
+    ) == (4, [])
+
+
+@pytest.mark.asyncio
+async def test_data_exists_empty(cache_provider):
+    assert not await cache_provider.data_exists()
+    assert await get_keys() == []
+
+
+@pytest.mark.asyncio
+async def test_migrate_from_one_hash(cache_provider):
+    async with get_connection() as redis:
+        await redis.hmset_dict("test_collection_cache_full_data", example_data)
+
+    assert await cache_provider.data_exists()
+
+    assert await get_keys() == [
+        "test_collection_cache_full_data:app/collection1",
+        "test_collection_cache_full_data:app/collection2",
+        "test_collection_cache_full_data_collections",
+    ]
+    assert await get_hash("test_collection_cache_full_data:app/collection2") == {
+        "app/collection2:1": '{"id": 1}'
+    }
+    all_data = await cache_provider.get_all_data()
+    assert {key.decode(): value.decode() for key, value in all_data.items()} == (
+        example_data
+    )
+
+
+@pytest.mark.asyncio
+async def test_migrate_keeps_collection_layout(cache_provider):
+    await cache_provider.reset_full_cache(example_data)
+    async with get_connection() as redis:
+        await redis.hmset_dict(
+            "test_collection_cache_full_data", {"app/other:1": '{"id": 1}'}
+        )
+
+    assert await cache_provider.data_exists()
+
+    # The old hash is ignored, if the collection registry exists.
+    assert "test_collection_cache_full_data:app/other" not in await get_keys()
+
+
+@pytest.mark.asyncio
+async def test_restricted_data_key_layout(cache_provider):
+    await cache_provider.reset_full_cache(example_data)
+
+    await cache_provider.update_restricted_data(
+        5,
+        {
+            "app/collection1:1": '{"id": 1}',
+            "app/collection2:1": '{"id": 1}',
+            "_config:change_id": "1",
+        },
+    )
+
+    assert await get_hash("test_collection_cache_restricted_data:5") == {
+        "_config:change_id": "1"
+    }
+    assert await get_hash(
+        "test_collection_cache_restricted_data:5:app/collection1"
+    ) == {"app/collection1:1": '{"id": 1}'}
+    assert await cache_provider.get_change_id_user(5) == b"1"
+    assert await cache_provider.data_exists(5)
+
+
+@pytest.mark.asyncio
+async def test_read_restricted_data(cache_provider):
+    await cache_provider.reset_full_cache(example_data)
+    await cache_provider.update_restricted_data(
+        5,
+        {
+            "app/collection1:1": '{"id": 1}',
+            "app/collection2:1": '{"id": 1}',
+            "_config:change_id": "1",
+        },
+    )
+    change_id, __ = await cache_provider.add_changed_elements(1, ["app/collection2:1"])
+
+    all_data = await cache_provider.get_all_data(5)
+    collection_data = await cache_provider.get_collection_data("app/collection1", 5)
+    element = await cache_provider.get_element("app/collection2:1", 5)
+    elements = await cache_provider.get_elements(
+        ["app/collection2:1", "app/collection1:2"], 5
+    )
+    changed, deleted = await cache_provider.get_data_since(change_id, 5)
+
+    assert set(all_data.keys()) == {b"app/collection1:1", b"app/collection2:1"}
+    assert collection_data == {b"app/collection1:1": b'{"id": 1}'}
+    assert element == b'{"id": 1}'
+    assert elements == [b'{"id": 1}', None]
+    assert changed == {"app/collection2": [b'{"id": 1}']}
+    assert deleted == []
+
+
+@pytest.mark.asyncio
+async def test_delete_restricted_data(cache_provider):
+    await cache_provider.reset_full_cache(example_data)
+    for user_id in (5, 50):
+        await cache_provider.update_restricted_data(
+            user_id, {"app/collection1:1": '{"id": 1}', "_config:change_id": "1"}
+        )
+
+    await cache_provider.del_elements(["app/collection1:1"], 50)
+    await cache_provider.del_restricted_data(5)
+
+    assert [key for key in await get_keys() if "restricted_data" in key] == [
+        "test_collection_cache_restricted_data:50"
+    ]
+    assert await cache_provider.data_exists(50)
+    assert await cache_provider.get_collection_data("app/collection1", 50) == {}
+
+
+@pytest.mark.asyncio
+async def test_write_with_lost_lock(cache_provider):
+    await cache_provider.reset_full_cache(example_data)
+    old_token = await cache_provider.set_lock("test_lock")
+    await cache_provider.del_lock("test_lock")
+    token = await cache_provider.set_lock("test_lock")
+
+    with pytest.raises(LockLostError):
+        await cache_provider.update_restricted_data(
+            5, {"_config:change_id": "1"}, "test_lock", old_token
+        )
+    with pytest.raises(LockLostError):
+        await cache_provider.begin_full_cache_reset("test_lock", old_token)
+    with pytest.raises(LockLostError):
+        await cache_provider.add_full_cache_chunk(
+            {"app/collection3:1": '{"id": 1}'}, "test_lock", old_token
+        )
+    with pytest.raises(LockLostError):
+        await cache_provider.finish_full_cache_reset("test_lock", old_token)
+    await cache_provider.update_restricted_data(
+        6, {"app/collection1:1": '{"id": 1}'}, "test_lock", token
+    )
+
+    assert not await cache_provider.data_exists(5)
+    assert await get_set("test_collection_cache_full_data_collections") == {
+        "",
+        "app/collection1",
+        "app/collection2",
+    }
+    assert await cache_provider.get_collection_data("app/collection1", 6) == {
+        b"app/collection1:1": b'{"id": 1}'
+    }
+
+
+@pytest.mark.asyncio
+async def test_migrate_deletes_restricted_data(cache_provider):
+    async with get_connection() as redis:
+        await redis.hmset_dict("test_collection_cache_full_data", example_data)
+        await redis.hmset_dict(
+            "test_collection_cache_restricted_data:5",
+            {"app/collection1:1": '{"id": 1}', "_config:change_id": "1"},
+        )
+
+    assert await cache_provider.data_exists()
+
+    assert not await cache_provider.data_exists(5)
@@ -0,0 +1,75 @@
+import json
+from typing import Any, Dict, List
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from openslides.assignments.access_permissions import AssignmentAccessPermissions
+from openslides.utils.consumers import AutoupdateFanout
+
+
+class Assignments:
+    def get_collection_string(self) -> str:
+        return "assignments/assignment"
+
+    def has_user_specific_restricted_data(self) -> bool:
+        return False
+
+    async def restrict_elements(
+        self, user_id: int, elements: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        return await AssignmentAccessPermissions().get_restricted_data(
+            elements, user_id
+        )
+
+
+def get_assignment() -> Dict[str, Any]:
+    return {
+        "id": 1,
+        "polls": [
+            {
+                "id": 1,
+                "published": False,
+                "has_votes": True,
+                "options": [{"id": 1, "votes": [{"value": "Yes", "weight": "1"}]}],
+            }
+        ],
+    }
+
+
+@pytest.mark.asyncio
+async def test_fanout_does_not_change_shared_data():
+    full_data = {"assignments/assignment": [get_assignment()]}
+
+    async def get_full_data(from_change_id, to_change_id):
+        return full_data, []
+
+    async def get_permission_fingerprint(user_id):
+        return f"user{user_id}"
+
+    async def async_has_perm(user_id, perm):
+        # User 1 is a manager, user 2 can only see the assignments.
+        return user_id == 1 or perm == "assignments.can_see"
+
+    element_cache = MagicMock(
+        cachables={"assignments/assignment": Assignments()}, get_full_data=get_full_data
+    )
+    with patch("openslides.utils.consumers.element_cache", element_cache), patch(
+        "openslides.utils.consumers.get_permission_fingerprint",
+        get_permission_fingerprint,
+    ), patch(
+        "openslides.assignments.access_permissions.async_has_perm", async_has_perm
+    ):
+        fanout = AutoupdateFanout()
+        user_message = json.loads(await fanout.get_message(2, 1, 1))
+        manager_message = json.loads(await fanout.get_message(1, 1, 1))
+
+    assert full_data == {"assignments/assignment": [get_assignment()]}
+    user_poll = user_message["content"]["changed"]["assignments/assignment"][0][
+        "polls"
+    ][0]
+    assert not user_poll["has_votes"]
+    assert user_poll["options"][0]["votes"] == []
+    assert manager_message["content"]["changed"]["assignments/assignment"] == [
+        get_assignment()
+    ]
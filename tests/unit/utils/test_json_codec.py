@@ -0,0 +1,19 @@
+import pytest
+
+from openslides.utils.json_codec import backends
+
+
+@pytest.mark.parametrize("backend", backends.keys())
+def test_encode_decode(backend):
+    dumps, loads = backends[backend]
+    data = {"id": 1, "text": "<p>Änderung</p>", "list": [1.5, None, True]}
+
+    assert loads(dumps(data)) == data
+    assert loads(dumps(data).encode()) == data
+
+
+@pytest.mark.parametrize("backend", backends.keys())
+def test_encode_int_keys(backend):
+    dumps, loads = backends[backend]
+
+    assert loads(dumps({1: []})) == {"1": []}
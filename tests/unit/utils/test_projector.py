@@ -0,0 +1,151 @@
+from typing import Any, Dict, List
+from unittest.mock import patch
+
+import pytest
+
+from openslides.utils.cache import ElementCache
+from openslides.utils.json_codec import json_loads
+from openslides.utils.projector import (
+    ProjectorCache,
+    get_collection_index,
+    get_projector_data,
+    get_projector_payloads,
+    register_projector_slide,
+)
+
+from .cache_provider import TTestCacheProvider, get_cachable_provider
+
+
+class Projectors:
+    def get_collection_string(self) -> str:
+        return "core/projector"
+
+    def get_elements(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "id": 1,
+                "elements": [
+                    {"name": "test/counter", "id": 1},
+                    {"name": "test/other", "id": 1},
+                ],
+            }
+        ]
+
+    async def restrict_elements(
+        self, user_id: int, elements: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        return elements
+
+
+class Counters:
+    def get_collection_string(self) -> str:
+        return "test/counter"
+
+    def get_elements(self) -> List[Dict[str, Any]]:
+        return [{"id": 1, "value": 1}]
+
+    async def restrict_elements(
+        self, user_id: int, elements: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        return elements
+
+
+calls: Dict[str, int] = {}
+
+
+def counter_slide(all_data, element, projector_id):
+    calls["test/counter"] = calls.get("test/counter", 0) + 1
+    return {"value": all_data["test/counter"][element["id"]]["value"]}
+
+
+def other_slide(all_data, element, projector_id):
+    calls["test/other"] = calls.get("test/other", 0) + 1
+    return {}
+
+
+@pytest.fixture
+def element_cache():
+    element_cache = ElementCache(
+        cache_provider_class=TTestCacheProvider,
+        cachable_provider=get_cachable_provider([Projectors(), Counters()]),
+        start_time=0,
+        local_cache_size=100,
+    )
+    element_cache.ensure_cache()
+    calls.clear()
+    with patch("openslides.utils.projector.element_cache", element_cache), patch(
+        "openslides.utils.projector.projector_cache", ProjectorCache()
+    ), patch("openslides.utils.projector.projector_slides", {}), patch(
+        "openslides.utils.projector.projector_slide_dependencies", {}
+    ):
+        register_projector_slide("test/counter", counter_slide, ["test/counter"])
+        register_projector_slide("test/other", other_slide, ["test/other"])
+        yield element_cache
+
+
+@pytest.mark.asyncio
+async def test_get_projector_data(element_cache):
+    data = await get_projector_data()
+
+    assert data == {
+        1: [
+            {"data": {"value": 1}, "element": {"name": "test/counter", "id": 1}},
+            {"data": {}, "element": {"name": "test/other", "id": 1}},
+        ]
+    }
+
+
+@pytest.mark.asyncio
+async def test_get_projector_data_cached(element_cache):
+    await get_projector_data()
+    await get_projector_data()
+
+    assert calls == {"test/counter": 1, "test/other": 1}
+
+
+@pytest.mark.asyncio
+async def test_get_projector_data_changed_dependency(element_cache):
+    await get_projector_data()
+
+    await element_cache.change_elements({"test/counter:1": {"id": 1, "value": 2}})
+    data = await get_projector_data()
+
+    assert data[1][0]["data"] == {"value": 2}
+    assert calls == {"test/counter": 2, "test/other": 1}
+
+
+@pytest.mark.asyncio
+async def test_get_projector_data_without_dependencies(element_cache):
+    register_projector_slide("test/other", other_slide)
+
+    await get_projector_data()
+    await get_projector_data()
+
+    assert calls == {"test/counter": 1, "test/other": 2}
+
+
+def test_get_projector_payloads():
+    payloads = get_projector_payloads({1: [{"data": {}}], 2: [{"data": {}}], 3: []})
+
+    assert json_loads(payloads[1]["json"]) == [{"data": {}}]
+    assert payloads[1]["hash"] == payloads[2]["hash"]
+    assert payloads[1]["hash"] != payloads[3]["hash"]
+
+
+def test_get_collection_index():
+    builds = []
+
+    def build_index(elements):
+        builds.append(elements)
+        return {element["value"]: element["id"] for element in elements.values()}
+
+    all_data = {"test/counter": {1: {"id": 1, "value": 5}}}
+    with patch("openslides.utils.projector.collection_indexes", {}):
+        assert get_collection_index(all_data, "test/counter", build_index) == {5: 1}
+        assert get_collection_index(all_data, "test/counter", build_index) == {5: 1}
+
+        # A changed collection is a new dict.
+        all_data = {"test/counter": {1: {"id": 1, "value": 6}}}
+        assert get_collection_index(all_data, "test/counter", build_index) == {6: 1}
+
+    assert len(builds) == 2
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+
+import pytest
+
+from openslides.utils.redis import (
+    get_connection,
+    get_opened_connections,
+    pool_holder,
+    use_redis,
+)
+
+
+pytestmark = pytest.mark.skipif(not use_redis, reason="Redis is not configured")
+
+
+async def use_connection():
+    async with get_connection() as redis:
+        await redis.ping()
+        return redis
+
+
+def run_in_new_loop(coroutine, shutdown=True):
+    """
+    Runs the coroutine in a new event loop like async_to_sync() does.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        if shutdown:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+
+def test_pool_is_reused():
+    async def use_twice():
+        first = await use_connection()
+        opened = get_opened_connections()
+        second = await use_connection()
+        return first, second, opened
+
+    first, second, opened = run_in_new_loop(use_twice())
+
+    assert first is second
+    assert get_opened_connections() == opened
+
+
+def test_pool_is_closed_with_loop():
+    redis = run_in_new_loop(use_connection())
+
+    assert redis.closed
+
+
+def test_pool_of_loop_closed_without_shutdown_is_removed():
+    redis = run_in_new_loop(use_connection(), shutdown=False)
+
+    run_in_new_loop(use_connection())
+
+    assert redis not in [
+        future.result() for future in pool_holder.pools.values() if future.done()
+    ]
+
+
+def test_pool_in_other_thread():
+    result = []
+    thread = threading.Thread(
+        target=lambda: result.append(run_in_new_loop(use_connection()))
+    )
+    thread.start()
+    thread.join()
+
+    assert result[0].closed
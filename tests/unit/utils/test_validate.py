@@ -1,4 +1,6 @@
+from collections import OrderedDict
 from unittest import TestCase
+from unittest.mock import patch
 
 from openslides.utils.validate import validate_html
 
@@ -10,3 +12,34 @@ class ValidatorTest(TestCase):
             validate_html(data),
             "tuveegi2Ho<a><p>tuveegi2Ho&lt;script&gt;kekj9(djwk&lt;/script&gt;</p>Boovai7esu</a>ee4Yaiw0ei",
         )
+
+    def test_saved_result(self):
+        data = "<p>Oofah5ahgh<script>ieGh0eiwai</script></p>"
+        validate_html(data)
+
+        with patch("openslides.utils.validate.bleach.clean") as clean:
+            result = validate_html(data)
+
+        clean.assert_not_called()
+        self.assertEqual(
+            result, "<p>Oofah5ahgh&lt;script&gt;ieGh0eiwai&lt;/script&gt;</p>"
+        )
+
+    def test_saved_results_max_size(self):
+        validated_html: OrderedDict = OrderedDict()
+        with patch("openslides.utils.validate.validated_html", validated_html), patch(
+            "openslides.utils.validate.validated_html_max_size", 2
+        ):
+            for index in range(5):
+                validate_html(f"<p>{index}</p>")
+
+            self.assertEqual(len(validated_html), 2)
+            self.assertEqual(list(validated_html.values()), ["<p>3</p>", "<p>4</p>"])
+
+    def test_lone_surrogate(self):
+        data = "<p>Iuyai2ae\ud800</p>"
+
+        result = validate_html(data)
+
+        self.assertIn("Iuyai2ae", result)
+        self.assertEqual(validate_html(data), result)